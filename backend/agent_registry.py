@@ -0,0 +1,150 @@
+"""
+Versioned prompts and shared agent definitions.
+
+The business travel system prompt used to be pasted into three Assistant
+classes. It is now registered here once per version, dedented and hashed at
+import time. ``AgentDefinition`` bundles the prompt with the STT/LLM/TTS
+settings so the API's text backend, ``voice_agent.BusinessTravelAssistant``
+and the ``RUN_AGENT`` entrypoint in ``main.py`` all build from the same
+definition.
+
+``TRAVEL_PROMPT_VERSION`` pins a registered version, otherwise the latest
+one is used. Only the standard library is imported so the API cold start is
+unaffected.
+"""
+
+import hashlib
+import os
+import textwrap
+from typing import Dict, List, Optional
+
+TRAVEL_ASSISTANT = "business_travel_assistant"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting and logs"""
+    return (len(text) + 3) // 4
+
+
+class PromptVersion:
+    """One immutable version of a named prompt"""
+
+    __slots__ = ("name", "version", "text", "digest", "tokens")
+
+    def __init__(self, name: str, version: str, text: str) -> None:
+        self.name = name
+        self.version = version
+        # Indentation from triple-quoted source would be re-sent on every turn
+        self.text = textwrap.dedent(text).strip()
+        self.digest = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:16]
+        self.tokens = estimate_tokens(self.text)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"name": self.name, "version": self.version, "digest": self.digest, "tokens": self.tokens}
+
+
+class AgentDefinition:
+    """Prompt plus provider settings for one agent, built once per process"""
+
+    __slots__ = ("name", "prompt", "stt_model", "stt_language", "llm_model", "tts_model", "tts_voice")
+
+    def __init__(self, name: str, prompt: PromptVersion, stt_model: str, stt_language: str,
+                 llm_model: str, tts_model: str, tts_voice: str) -> None:
+        self.name = name
+        self.prompt = prompt
+        self.stt_model = stt_model
+        self.stt_language = stt_language
+        self.llm_model = llm_model
+        self.tts_model = tts_model
+        self.tts_voice = tts_voice
+
+    @property
+    def instructions(self) -> str:
+        return self.prompt.text
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "prompt": self.prompt.to_dict(),
+            "stt": {"model": self.stt_model, "language": self.stt_language},
+            "llm": {"model": self.llm_model},
+            "tts": {"model": self.tts_model, "voice": self.tts_voice},
+        }
+
+
+class PromptRegistry:
+    """Registered prompt versions and the agent definitions built from them"""
+
+    def __init__(self) -> None:
+        self._prompts: Dict[str, Dict[str, PromptVersion]] = {}
+        self._settings: Dict[str, Dict[str, str]] = {}
+        self._agents: Dict[str, AgentDefinition] = {}
+
+    def register(self, name: str, version: str, text: str) -> PromptVersion:
+        versions = self._prompts.setdefault(name, {})
+        if version in versions:
+            raise ValueError(f"Prompt {name} version {version} is already registered")
+        prompt = versions[version] = PromptVersion(name, version, text)
+        return prompt
+
+    def versions(self, name: str) -> List[str]:
+        return list(self._prompts.get(name, {}))
+
+    def get(self, name: str, version: Optional[str] = None) -> PromptVersion:
+        versions = self._prompts.get(name)
+        if not versions:
+            raise KeyError(f"Unknown prompt: {name}")
+        if version is None:
+            # Versions are registered in order; the last one is current
+            return versions[list(versions)[-1]]
+        if version not in versions:
+            raise KeyError(f"Unknown version {version} of prompt {name}")
+        return versions[version]
+
+    def define(self, name: str, **settings: str) -> None:
+        self._settings[name] = settings
+        self._agents.pop(name, None)
+
+    def agent(self, name: str, version: Optional[str] = None) -> AgentDefinition:
+        """Return the agent definition, building it on first use"""
+        definition = self._agents.get(name)
+        if definition is None or (version is not None and definition.prompt.version != version):
+            definition = AgentDefinition(name, self.get(name, version), **self._settings[name])
+            self._agents[name] = definition
+        return definition
+
+
+registry = PromptRegistry()
+
+registry.register(TRAVEL_ASSISTANT, "1", """
+    You are a professional business travel assistant.
+    Your role is to help business travelers with:
+    1. Flight bookings and itinerary management
+    2. Hotel reservations and recommendations
+    3. Transportation arrangements (taxis, rideshares, car rentals)
+    4. Travel expense tracking and reporting
+    5. Visa and documentation guidance
+    6. Weather updates for destinations
+    7. Currency conversion and payment methods
+    8. Business meeting scheduling across time zones
+    9. Local business services and facilities
+    10. Emergency assistance during travel
+
+    Always be concise, professional, and helpful.
+    Ask clarifying questions when needed.
+    Focus on business travel needs specifically.
+""")
+
+registry.define(
+    TRAVEL_ASSISTANT,
+    stt_model="nova-3",
+    stt_language="multi",
+    llm_model="gemini-2.0-flash-exp",
+    tts_model="sonic-2",
+    tts_voice="f786b574-daa5-4673-aa0c-cbe3e8534c02",
+)
+
+
+def travel_assistant() -> AgentDefinition:
+    """The business travel agent at the pinned or latest prompt version"""
+    return registry.agent(TRAVEL_ASSISTANT, os.getenv("TRAVEL_PROMPT_VERSION") or None)
@@ -0,0 +1,291 @@
+"""
+Caller audio ingest for agent sessions.
+
+LiveKit delivers the caller's track as 24 kHz int16 frames. Silero VAD and
+Deepgram both want 16 kHz, so each ran its own resampler and format
+conversion on every frame. ``AudioIngest`` does that work once per frame for
+a session:
+
+- one vectorized resample (and downmix) to ``AUDIO_INGEST_RATE`` into
+  preallocated NumPy buffers
+- the resulting int16 frame is handed to both the VAD and the STT; whichever
+  asks second gets the same frame back without recomputing it
+- float32 samples in [-1, 1) are appended to a preallocated ``SampleRing``
+  that in-process inference reads as slices instead of copies
+
+The resampling filter is a windowed-sinc polyphase filter precomputed per
+(input rate, output rate, frame size) as tap indices and weights. Applying it
+is one ``np.take`` into a scratch buffer and one ``np.einsum``, and the
+filters are shared by every session in the process.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from fractions import Fraction
+from types import SimpleNamespace
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from livekit import rtc
+    RTC_AVAILABLE = True
+except ImportError:
+    RTC_AVAILABLE = False
+
+# Input samples on each side of an output sample the filter looks at
+FILTER_HALF_WIDTH = 16
+
+_filters: Dict[Tuple[int, int, int], Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def resample_filter(in_rate: int, out_rate: int, frame_samples: int,
+                    half_width: int = FILTER_HALF_WIDTH) -> Tuple[np.ndarray, np.ndarray]:
+    """Tap indices and weights, one row per output sample of a frame
+
+    Indices address ``2 * half_width`` samples of history followed by the
+    frame. Output samples are delayed by ``half_width`` input samples so each
+    one only needs input the session has already received.
+    """
+    key = (in_rate, out_rate, frame_samples)
+    cached = _filters.get(key)
+    if cached is not None:
+        return cached
+
+    out_samples = frame_samples * Fraction(out_rate, in_rate)
+    if out_samples.denominator != 1:
+        raise ValueError(f"{frame_samples} samples at {in_rate} Hz is not a whole number of "
+                         f"samples at {out_rate} Hz")
+    step = in_rate / out_rate
+    # Low-pass at the lower Nyquist frequency, with a little room for the transition band
+    cutoff = 0.9 * min(1.0, out_rate / in_rate)
+    taps = np.arange(-half_width, half_width + 1)
+    centers = half_width + np.arange(int(out_samples)) * step
+    indices = np.floor(centers).astype(np.intp)[:, None] + taps
+    distance = centers[:, None] - indices
+    window = 0.5 + 0.5 * np.cos(np.pi * np.clip(distance / (half_width + 1), -1.0, 1.0))
+    weights = cutoff * np.sinc(cutoff * distance) * window
+    # Unity gain at DC
+    weights /= weights.sum(axis=1, keepdims=True)
+    # The last taps of the last rows can point one past the frame; they carry no weight
+    limit = 2 * half_width + frame_samples - 1
+    weights[indices > limit] = 0.0
+    np.minimum(indices, limit, out=indices)
+    cached = _filters[key] = (indices, weights.astype(np.float32))
+    return cached
+
+
+class SampleRing:
+    """Preallocated ring of samples; reads are views unless they wrap"""
+
+    def __init__(self, capacity: int, dtype=np.float32) -> None:
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.written = 0
+        self._scratch = np.zeros(capacity, dtype=dtype)
+
+    def write(self, samples: np.ndarray, scale: float = 1.0) -> None:
+        """Append samples (multiplied by ``scale``) without allocating"""
+        count = len(samples)
+        if count > self.capacity:
+            samples, count = samples[-self.capacity:], self.capacity
+        start = self.written % self.capacity
+        first = min(count, self.capacity - start)
+        np.multiply(samples[:first], scale, out=self.buffer[start:start + first],
+                    dtype=self.buffer.dtype, casting="unsafe")
+        if first < count:
+            np.multiply(samples[first:], scale, out=self.buffer[:count - first],
+                        dtype=self.buffer.dtype, casting="unsafe")
+        self.written += count
+
+    def latest(self, count: int) -> np.ndarray:
+        """The most recent ``count`` samples, oldest first
+
+        Returns a view into the ring when the samples are contiguous, else a
+        view of an internal scratch buffer that the next wrapped read reuses.
+        """
+        count = min(count, self.capacity, self.written)
+        end = self.written % self.capacity or (self.capacity if self.written else 0)
+        if count <= end:
+            return self.buffer[end - count:end]
+        head = count - end
+        scratch = self._scratch[:count]
+        scratch[:head] = self.buffer[self.capacity - head:]
+        scratch[head:] = self.buffer[:end]
+        return scratch
+
+
+def _frame(samples: np.ndarray, sample_rate: int):
+    if RTC_AVAILABLE:
+        # rtc.AudioFrame copies the samples into its own buffer
+        return rtc.AudioFrame(data=memoryview(samples).cast("B"), sample_rate=sample_rate,
+                              num_channels=1, samples_per_channel=len(samples))
+    # Offline (benchmarks): same attributes as rtc.AudioFrame
+    return SimpleNamespace(data=bytearray(memoryview(samples).cast("B")), sample_rate=sample_rate,
+                           num_channels=1, samples_per_channel=len(samples))
+
+
+class AudioIngest:
+    """Per-session resample / convert stage shared by the VAD and the STT"""
+
+    def __init__(self, sample_rate: int = 16000, ring_seconds: float = 2.0,
+                 consumers: int = 2, max_pending: int = 64) -> None:
+        self.sample_rate = sample_rate
+        self.consumers = consumers
+        self.max_pending = max_pending
+        self.ring = SampleRing(int(sample_rate * ring_seconds))
+        self._history = 2 * FILTER_HALF_WIDTH
+        self._input: Optional[np.ndarray] = None
+        self._output: Optional[np.ndarray] = None
+        self._pcm: Optional[np.ndarray] = None
+        self._format: Optional[Tuple[int, int, int]] = None
+        # id(input frame) -> [input frame, output frame, consumers still to serve]
+        self._pending: "OrderedDict[int, list]" = OrderedDict()
+        self.frames = 0
+        self.shared = 0
+        self.passthrough = 0
+        self.unshared = 0
+        self.process_s = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AudioIngest":
+        return cls(
+            sample_rate=int(os.getenv("AUDIO_INGEST_RATE", "16000")),
+            ring_seconds=float(os.getenv("AUDIO_INGEST_RING_SECONDS", "2.0")),
+        )
+
+    def _prepare(self, in_rate: int, num_channels: int, samples: int) -> None:
+        """(Re)allocate buffers when the input format changes"""
+        fmt = (in_rate, num_channels, samples)
+        if fmt == self._format:
+            return
+        previous = self._format
+        self._format = fmt
+        if in_rate == self.sample_rate:
+            self._input = self._output = np.zeros(samples, dtype=np.float32)
+            self._pcm = np.zeros(samples, dtype=np.int16)
+            return
+        self._indices, self._weights = resample_filter(in_rate, self.sample_rate, samples)
+        self._taps = np.zeros(self._weights.shape, dtype=np.float32)
+        history = self._input[-self._history:].copy() if previous and previous[0] == in_rate else None
+        self._input = np.zeros(self._history + samples, dtype=np.float32)
+        if history is not None:
+            # Same rate, new frame size: keep the filter's history continuous
+            self._input[:self._history] = history
+        self._output = np.zeros(self._weights.shape[0], dtype=np.float32)
+        self._pcm = np.zeros(self._weights.shape[0], dtype=np.int16)
+
+    def _convert(self, frame):
+        start = time.perf_counter()
+        channels = frame.num_channels
+        samples = frame.samples_per_channel
+        pcm = np.frombuffer(frame.data, dtype=np.int16, count=samples * channels)
+        self._prepare(frame.sample_rate, channels, samples)
+
+        if frame.sample_rate == self.sample_rate:
+            if channels == 1:
+                # Already in the target format: no new frame, only the float copy
+                self.ring.write(pcm, 1 / 32768)
+                self.passthrough += 1
+                self.process_s += time.perf_counter() - start
+                return frame
+            out = self._output
+            np.mean(pcm.reshape(samples, channels), axis=1, dtype=np.float32, out=out)
+        else:
+            history = self._history
+            buf = self._input
+            buf[:history] = buf[-history:]
+            if channels == 1:
+                np.copyto(buf[history:], pcm, casting="unsafe")
+            else:
+                np.mean(pcm.reshape(samples, channels), axis=1, dtype=np.float32, out=buf[history:])
+            out = self._output
+            # mode="clip" lets take write straight into ``out`` without a bounds-check copy
+            np.take(buf, self._indices, out=self._taps, mode="clip")
+            np.einsum("ij,ij->i", self._taps, self._weights, out=out)
+
+        self.ring.write(out, 1 / 32768)
+        np.rint(out, out=out)
+        np.minimum(out, 32767, out=out)
+        np.maximum(out, -32768, out=out)
+        np.copyto(self._pcm, out, casting="unsafe")
+        converted = _frame(self._pcm, self.sample_rate)
+        self.process_s += time.perf_counter() - start
+        return converted
+
+    def process(self, frame):
+        """The session-rate mono frame for ``frame``, converting it at most once"""
+        key = id(frame)
+        entry = self._pending.get(key)
+        if entry is not None and entry[0] is frame:
+            self.shared += 1
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del self._pending[key]
+            return entry[1]
+
+        self.frames += 1
+        converted = self._convert(frame)
+        if self.consumers > 1:
+            self._pending[key] = [frame, converted, self.consumers - 1]
+            if len(self._pending) > self.max_pending:
+                # A consumer stopped reading; its frames are converted again if it resumes
+                self._pending.popitem(last=False)
+                self.unshared += 1
+        return converted
+
+    async def frames_from(self, audio: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        """Convert an audio stream (the STT's input) frame by frame"""
+        async for frame in audio:
+            yield self.process(frame)
+
+    def wrap_vad(self, vad):
+        return IngestVAD(vad, self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "frames": self.frames,
+            "shared": self.shared,
+            "passthrough": self.passthrough,
+            "unshared": self.unshared,
+            "avg_us_per_frame": round(self.process_s / self.frames * 1e6, 2) if self.frames else 0.0,
+        }
+
+
+class IngestVADStream:
+    """VAD stream that receives frames through the session's ``AudioIngest``"""
+
+    def __init__(self, stream, ingest: AudioIngest) -> None:
+        self._stream = stream
+        self._ingest = ingest
+
+    def push_frame(self, frame) -> None:
+        self._stream.push_frame(self._ingest.process(frame))
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+    def __aiter__(self):
+        return self._stream.__aiter__()
+
+    async def __anext__(self):
+        return await self._stream.__anext__()
+
+
+class IngestVAD:
+    """Wraps the shared VAD so one session's streams go through its ingest"""
+
+    def __init__(self, vad, ingest: AudioIngest) -> None:
+        self._vad = vad
+        self._ingest = ingest
+
+    def stream(self, *args, **kwargs) -> IngestVADStream:
+        return IngestVADStream(self._vad.stream(*args, **kwargs), self._ingest)
+
+    def __getattr__(self, name: str):
+        return getattr(self._vad, name)
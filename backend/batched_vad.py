@@ -0,0 +1,160 @@
+"""
+Voice activity detection through the process-wide batch scheduler.
+
+``BatchedVAD`` is a drop-in ``agents.vad.VAD``: its streams cut 16 kHz audio
+into silero's 512-sample windows, send each window to
+``inference_batcher.get_batch_scheduler()`` and turn the returned speech
+probabilities into START_OF_SPEECH / INFERENCE_DONE / END_OF_SPEECH events
+with the same thresholds as the silero plugin's defaults.
+
+Incoming samples go into a preallocated ``audio_ingest.SampleRing`` and
+windows are read back as views, so a frame costs one scaled copy rather than
+a concatenation of everything still pending. Event timestamps are seconds of
+audio inferred so far, like silero's, so consumers can compare them with the
+audio they pushed (``model_pool.BacklogVADStream``).
+"""
+
+import time
+from collections import deque
+from typing import Deque, List, Sequence, TypeVar
+
+import numpy as np
+
+from audio_ingest import SampleRing
+from inference_batcher import VAD_SAMPLE_RATE, VAD_WINDOW, BatchScheduler, VADState, get_batch_scheduler
+
+try:
+    from livekit import rtc
+    from livekit.agents import vad as agents_vad
+    LIVEKIT_AVAILABLE = True
+except ImportError:
+    LIVEKIT_AVAILABLE = False
+
+T = TypeVar("T")
+
+
+def speech_prefix(history: Sequence[T], run: int, padding: int) -> List[T]:
+    """The ``padding`` windows of ``history`` that precede its last ``run`` (the speech so far)"""
+    end = max(len(history) - run, 0)
+    return list(history)[max(end - padding, 0):end]
+
+
+def pending_window(ring: SampleRing, pending: int) -> np.ndarray:
+    """The oldest unread window when the newest ``pending`` samples of ``ring`` are unread"""
+    return ring.latest(pending)[:VAD_WINDOW]
+
+
+# The VAD subclasses LiveKit types, so it only exists when LiveKit imported
+if LIVEKIT_AVAILABLE:
+    class BatchedVAD(agents_vad.VAD):
+        """Silero VAD whose inference is batched with every other session's"""
+
+        def __init__(self, scheduler: BatchScheduler = None, min_speech_duration: float = 0.05,
+                     min_silence_duration: float = 0.55, prefix_padding_duration: float = 0.5,
+                     activation_threshold: float = 0.5) -> None:
+            super().__init__(capabilities=agents_vad.VADCapabilities(update_interval=VAD_WINDOW / VAD_SAMPLE_RATE))
+            self.scheduler = scheduler or get_batch_scheduler()
+            self.min_speech_duration = min_speech_duration
+            self.min_silence_duration = min_silence_duration
+            self.prefix_padding_duration = prefix_padding_duration
+            self.activation_threshold = activation_threshold
+            # Hysteresis: speech ends only well below the level that started it
+            self.deactivation_threshold = max(activation_threshold - 0.15, 0.01)
+
+        def stream(self) -> "BatchedVADStream":
+            return BatchedVADStream(self)
+
+
+    class BatchedVADStream(agents_vad.VADStream):
+        def __init__(self, vad: BatchedVAD) -> None:
+            self._opts = vad
+            self._state = VADState()
+            super().__init__(vad)
+
+        def _window_frame(self, window: np.ndarray) -> rtc.AudioFrame:
+            pcm = (window * 32767).astype(np.int16)
+            return rtc.AudioFrame(data=pcm.tobytes(), sample_rate=VAD_SAMPLE_RATE,
+                                  num_channels=1, samples_per_channel=len(pcm))
+
+        async def _main_task(self) -> None:
+            opts = self._opts
+            window_s = VAD_WINDOW / VAD_SAMPLE_RATE
+            # One second of headroom: a frame never brings more than that
+            ring = SampleRing(VAD_SAMPLE_RATE + VAD_WINDOW)
+            pending = 0
+            padding = max(1, int(opts.prefix_padding_duration / window_s))
+            # Recent windows, long enough to hold the padding plus the speech that starts a turn
+            history: Deque[rtc.AudioFrame] = deque(maxlen=padding + int(opts.min_speech_duration / window_s) + 1)
+            speech_frames: List[rtc.AudioFrame] = []
+            samples_index = 0
+            speaking = False
+            speech_duration = silence_duration = 0.0
+            resampler = None
+
+            async for frame in self._input_ch:
+                if not isinstance(frame, rtc.AudioFrame):
+                    continue  # flush sentinel
+                if frame.sample_rate != VAD_SAMPLE_RATE or frame.num_channels != 1:
+                    # Frames from AudioIngest are already 16 kHz mono; anything else is converted here
+                    if resampler is None:
+                        resampler = rtc.AudioResampler(frame.sample_rate, VAD_SAMPLE_RATE,
+                                                       num_channels=frame.num_channels)
+                    frames = resampler.push(frame)
+                else:
+                    frames = [frame]
+                for converted in frames:
+                    pcm = np.frombuffer(converted.data, dtype=np.int16)
+                    ring.write(pcm, 1 / 32768)
+                    pending += len(pcm)
+
+                while pending >= VAD_WINDOW:
+                    window = pending_window(ring, pending)
+                    pending -= VAD_WINDOW
+                    started = time.perf_counter()
+                    probability = await opts.scheduler.infer("vad", (self._state, window))
+                    inference_duration = time.perf_counter() - started
+                    samples_index += VAD_WINDOW
+                    # Audio-stream time, as silero reports it, not wall-clock time
+                    stream_time = samples_index / VAD_SAMPLE_RATE
+                    window_frame = self._window_frame(window)
+
+                    if probability >= opts.activation_threshold or (speaking and probability > opts.deactivation_threshold):
+                        speech_duration += window_s
+                        silence_duration = 0.0
+                        speech_frames.append(window_frame)
+                        if not speaking and speech_duration >= opts.min_speech_duration:
+                            speaking = True
+                            # The speech windows so far are already in the history; pad with what came before
+                            speech_frames = speech_prefix(history, len(speech_frames) - 1, padding) + speech_frames
+                            self._event_ch.send_nowait(agents_vad.VADEvent(
+                                type=agents_vad.VADEventType.START_OF_SPEECH,
+                                samples_index=samples_index, timestamp=stream_time,
+                                speech_duration=speech_duration, silence_duration=0.0,
+                                frames=[window_frame], speaking=True,
+                            ))
+                    else:
+                        silence_duration += window_s
+                        if speaking:
+                            speech_frames.append(window_frame)
+                        else:
+                            speech_duration = 0.0
+                            speech_frames = []
+                        if speaking and silence_duration >= opts.min_silence_duration:
+                            speaking = False
+                            self._event_ch.send_nowait(agents_vad.VADEvent(
+                                type=agents_vad.VADEventType.END_OF_SPEECH,
+                                samples_index=samples_index, timestamp=stream_time,
+                                speech_duration=speech_duration, silence_duration=silence_duration,
+                                frames=speech_frames, speaking=False,
+                            ))
+                            speech_duration = 0.0
+                            speech_frames = []
+                    history.append(window_frame)
+
+                    self._event_ch.send_nowait(agents_vad.VADEvent(
+                        type=agents_vad.VADEventType.INFERENCE_DONE,
+                        samples_index=samples_index, timestamp=stream_time,
+                        speech_duration=speech_duration, silence_duration=silence_duration,
+                        frames=[window_frame], probability=probability,
+                        inference_duration=inference_duration, speaking=speaking,
+                    ))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Offline per-route throughput benchmark for the API's response encoding.
+Calls the ASGI app in-process (no server, no sockets) and compares req/s of
+each route against a baseline app that builds the same payloads per request
+and renders them with FastAPI's default JSONResponse, as the API did before
+responses were pre-encoded. Also reports body size per content encoding.
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse
+
+import main
+from agent_registry import travel_assistant
+from catalog import Catalog
+from response_encoding import BROTLI_AVAILABLE, ORJSON_AVAILABLE
+
+
+def baseline_app() -> FastAPI:
+    """The same routes, building and encoding every response per request"""
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/")
+    async def root():
+        return {"message": "Business Travel Assistant API is running"}
+
+    @app.get("/api/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    @app.get("/api/agent/definition")
+    async def get_agent_definition():
+        return travel_assistant().to_dict()
+
+    @app.get("/travel/destinations")
+    async def get_popular_destinations(q: str = None, country: str = None, min_index: float = None,
+                                       max_index: float = None, offset: int = Query(0, ge=0),
+                                       limit: int = Query(50, ge=1, le=500)):
+        ids = main.catalog.find_destinations(q, country, min_index, max_index)
+        return {"destinations": [main.catalog.destinations[i] for i in ids[offset:offset + limit]],
+                "total": len(ids), "offset": offset, "limit": limit}
+
+    @app.get("/travel/services")
+    async def get_travel_services(q: str = None):
+        return {"services": main.catalog.find_services(q)}
+
+    @app.get("/session/stats")
+    async def get_session_stats():
+        return main.session_store.stats()
+
+    @app.post("/travel/query", response_model=main.TravelResponse)
+    async def handle_travel_query(query: main.TravelQuery):
+        answer = await main.response_cache.get_or_generate(
+            query.query, query.context, lambda: main.llm_backend.generate(query.query, query.context))
+        return main.TravelResponse(response=answer, action_required=False)
+
+    return app
+
+
+async def call(app, method: str, path: str, query: str = "", headers=(), body: bytes = b""):
+    """Minimal ASGI HTTP client: returns (status, response headers, body bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    request_sent = False
+    response = {"status": 0, "headers": {}, "body": bytearray()}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Never disconnect; the app only waits on this for streaming responses
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode().lower(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], bytes(response["body"])
+
+
+ROUTES = [
+    ("GET /", "GET", "/", "", b""),
+    ("GET /api/health", "GET", "/api/health", "", b""),
+    ("GET /api/agent/definition", "GET", "/api/agent/definition", "", b""),
+    ("GET /travel/destinations", "GET", "/travel/destinations", "", b""),
+    ("GET /travel/destinations?q=", "GET", "/travel/destinations", "q=sa&limit=100", b""),
+    ("GET /travel/services", "GET", "/travel/services", "", b""),
+    ("GET /session/stats", "GET", "/session/stats", "", b""),
+    ("POST /travel/query", "POST", "/travel/query", "",
+     b'{"query": "What are the visa rules for Frankfurt?", "context": {}}'),
+]
+
+
+async def throughput(app, method, path, query, body, headers, requests):
+    request_headers = list(headers)
+    if body:
+        request_headers.append(("content-type", "application/json"))
+    # Warm caches so both apps are measured in steady state
+    status, response_headers, payload = await call(app, method, path, query, request_headers, body)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, method, path, query, request_headers, body)
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, status, response_headers, payload
+
+
+async def run(args):
+    if args.cities:
+        from bench_catalog import synthetic_destinations
+        main.catalog = Catalog(synthetic_destinations(args.cities), main.catalog.services)
+
+    baseline = baseline_app()
+    accept = [("accept-encoding", args.accept_encoding)] if args.accept_encoding else []
+
+    print(f"API response benchmark ({args.requests} requests per route, in-process ASGI)")
+    print(f"   orjson: {ORJSON_AVAILABLE}, brotli: {BROTLI_AVAILABLE}, "
+          f"Accept-Encoding: {args.accept_encoding or '(none)'}")
+    print("=" * 78)
+    print(f"   {'route':<30} {'before':>10} {'after':>10} {'speedup':>8}   {'bytes':>14}")
+    for label, method, path, query, body in ROUTES:
+        before, _, _, plain = await throughput(baseline, method, path, query, body, [], args.requests)
+        after, status, headers, payload = await throughput(
+            main.app, method, path, query, body, accept, args.requests)
+        if status >= 400:
+            print(f"   {label:<30} HTTP {status}")
+            continue
+        encoding = headers.get("content-encoding", "identity")
+        size = f"{len(plain)}" if encoding == "identity" else f"{len(plain)}->{len(payload)} {encoding}"
+        print(f"   {label:<30} {before:>8.0f}/s {after:>8.0f}/s {after / before:>7.2f}x   {size:>14}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Per-route API response benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--cities", type=int, default=0,
+                        help="Replace the catalog with this many synthetic destinations")
+    parser.add_argument("--accept-encoding", default="br, gzip",
+                        help="Accept-Encoding sent to the optimized app ('' for identity)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the destination catalog indexes.
+Builds a synthetic catalog of tens of thousands of cities and reports index
+build time and lookup latency for country, name-prefix and business_index
+range queries, both uncached and through the pre-serialized response cache.
+"""
+
+import argparse
+import random
+import string
+import time
+
+from catalog import Catalog
+from model_pool import percentile
+
+COUNTRIES = ["USA", "UK", "Japan", "Singapore", "Germany", "France", "India", "Brazil",
+             "Canada", "Australia", "China", "UAE", "Switzerland", "Netherlands", "Korea"]
+
+
+def synthetic_destinations(count):
+    random.seed(11)
+    destinations = []
+    for index in range(count):
+        words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(4, 9))).title()
+                 for _ in range(random.choice((1, 1, 2)))]
+        destinations.append({
+            "name": " ".join(words),
+            "country": random.choice(COUNTRIES),
+            "business_index": round(random.uniform(3.0, 9.9), 1),
+        })
+    return destinations
+
+
+def timed(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label, samples):
+    print(f"   {label:<28} p50 {percentile(samples, 50) * 1e6:8.1f} us   "
+          f"p99 {percentile(samples, 99) * 1e6:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog index benchmark")
+    parser.add_argument("--cities", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    destinations = synthetic_destinations(args.cities)
+    start = time.perf_counter()
+    catalog = Catalog(destinations, [])
+    build = time.perf_counter() - start
+
+    random.seed(5)
+    prefixes = ["".join(random.choices(string.ascii_lowercase, k=3)) for _ in range(args.queries)]
+    countries = [random.choice(COUNTRIES) for _ in range(args.queries)]
+    ranges = [round(random.uniform(8.5, 9.8), 1) for _ in range(args.queries)]
+
+    print(f"Catalog benchmark ({args.cities} destinations)")
+    print("=" * 50)
+    print(f"   index build: {build * 1000:.1f} ms")
+    report("prefix (3 chars)", timed(lambda p: catalog.find_destinations(q=p), prefixes))
+    report("country + prefix", timed(
+        lambda i: catalog.find_destinations(q=prefixes[i], country=countries[i]), range(args.queries)))
+    report("business_index >= x", timed(
+        lambda low: catalog.find_destinations(min_index=low), ranges))
+    report("query page + gzip", timed(
+        lambda i: catalog.destinations_page(q=prefixes[i], limit=20).encoded("gzip"), range(args.queries)))
+    report("unfiltered page, cached", timed(
+        lambda i: catalog.destinations_page().encoded("gzip"), range(args.queries)))
+
+
+if __name__ == "__main__":
+    main()
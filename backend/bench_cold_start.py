@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Cold-start regression benchmark for the API process.
+Imports main.py in fresh interpreters and fails (exit code 1) if the import
+time exceeds the budget or if agent-only / lazily imported modules leak into
+the API import path.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+from startup_report import heavy_imports, loaded_modules, profile_imports, total_import_us
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold-start import benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("COLD_START_BUDGET_MS", "1500")),
+                        help="Maximum median import time of main.py in milliseconds")
+    args = parser.parse_args()
+
+    print("API cold-start benchmark")
+    print("=" * 50)
+
+    samples = []
+    for run in range(args.runs):
+        import_ms = total_import_us(profile_imports("main"), "main") / 1000
+        samples.append(import_ms)
+        print(f"   run {run + 1}: {import_ms:.1f} ms")
+
+    median = statistics.median(samples)
+    print(f"   median: {median:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if median > args.budget_ms:
+        print(f"   ✗ Cold start import time {median:.1f} ms exceeds budget")
+        failed = True
+
+    heavy = heavy_imports(loaded_modules("main"))
+    if heavy:
+        print(f"   ✗ Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    else:
+        print("   ✓ No agent or SDK modules imported at startup")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the conversation context window.
+Replays a long trip-planning call and reports the context size sent to the
+LLM per turn with and without the window, plus the prompt-processing time
+that size implies at a configurable prefill rate.
+"""
+
+import argparse
+import asyncio
+from types import SimpleNamespace
+
+from agent_registry import travel_assistant
+from context_window import ContextWindow
+
+USER_TURNS = [
+    "I need to fly from London to Frankfurt on March 12th in business class.",
+    "My budget is about $2,500 for flights and hotel.",
+    "Can you find a hotel near the trade fair grounds?",
+    "What is the weather like in Frankfurt next week?",
+    "Do I need a visa as a UK citizen?",
+    "Book a taxi from the airport to the hotel.",
+    "Also I have a meeting in Munich on Thursday, how do I get there?",
+    "What is the time difference with New York for a call?",
+    "Add a return flight to London on March 16th.",
+    "Send me a summary of the expenses so far.",
+]
+ASSISTANT_REPLY = ("Certainly. I have noted that and checked the options that fit your schedule and "
+                   "company policy. The best choice is the first one, which keeps you close to your "
+                   "meetings and within budget. Shall I go ahead and book it for you?")
+
+
+def message(role, text):
+    return SimpleNamespace(type="message", role=role, text_content=text)
+
+
+async def fake_summarize(previous, transcript):
+    await asyncio.sleep(0.01)
+    return (previous + " " if previous else "") + f"Discussed {transcript.count('user:')} more requests."
+
+
+async def replay(turns, window):
+    items = [message("system", travel_assistant().instructions)]
+    sizes = []
+    for index in range(turns):
+        items.append(message("user", USER_TURNS[index % len(USER_TURNS)]))
+        sent = window.prepare_items(items) if window else items
+        sizes.append(ContextWindow._tokens(sent))
+        items.append(message("assistant", ASSISTANT_REPLY))
+        # Let the background summary run between turns, as it would in a call
+        await asyncio.sleep(0.02)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Context window benchmark")
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--keep-turns", type=int, default=6)
+    parser.add_argument("--budget", type=int, default=2000, help="Token budget for the context")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=30.0,
+                        help="Assumed LLM prompt processing time per 1k input tokens")
+    args = parser.parse_args()
+
+    full = asyncio.run(replay(args.turns, None))
+    window = ContextWindow(fake_summarize, keep_turns=args.keep_turns, token_budget=args.budget,
+                           make_message=message)
+    trimmed = asyncio.run(replay(args.turns, window))
+
+    print(f"Context window benchmark ({args.turns} turns, keep {args.keep_turns}, budget {args.budget})")
+    print("=" * 50)
+    for turn in sorted({1, 10, 20, 40, args.turns}):
+        if turn > args.turns:
+            continue
+        before, after = full[turn - 1], trimmed[turn - 1]
+        print(f"   turn {turn:>3}: {before:>6} -> {after:>5} tokens, "
+              f"prefill {before * args.prefill_ms_per_1k / 1000:6.1f} -> "
+              f"{after * args.prefill_ms_per_1k / 1000:5.1f} ms")
+    print(f"   total input tokens: {sum(full)} -> {sum(trimmed)} "
+          f"({100 * (1 - sum(trimmed) / sum(full)):.0f}% fewer)")
+    print(f"   window stats: {window.stats()}")
+
+
+if __name__ == "__main__":
+    main()
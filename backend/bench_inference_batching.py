@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for batched VAD inference.
+Runs N simulated sessions in one process, each producing a 32 ms VAD window
+in real time, and reports CPU time per window, how many sessions one core
+could serve, and the latency the scheduler adds per window, comparing one
+model call per window (as before) with ``BatchScheduler`` batching.
+
+Uses the real silero model when ``--model`` points at ``silero_vad.onnx`` and
+onnxruntime is installed, otherwise ``fake_plugins.FakeVADRunner``.
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from fake_plugins import FakeVADRunner
+from inference_batcher import VAD_SAMPLE_RATE, VAD_WINDOW, BatchScheduler, SileroBatchRunner, VADState
+from model_pool import percentile
+
+
+class OnnxRunner(SileroBatchRunner):
+    """Silero straight from a model file, without the LiveKit plugin installed"""
+
+    def load(self):
+        if self._session is None:
+            import onnxruntime
+
+            # Same single-threaded settings the silero plugin uses
+            opts = onnxruntime.SessionOptions()
+            opts.inter_op_num_threads = 1
+            opts.intra_op_num_threads = 1
+            opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+            self._session = onnxruntime.InferenceSession(
+                self.model_path, providers=["CPUExecutionProvider"], sess_options=opts)
+        return self._session
+
+
+def make_runner(model_path):
+    if not model_path:
+        return FakeVADRunner(), "synthetic runner"
+    return OnnxRunner(model_path=model_path), "silero"
+
+
+async def session_loop(scheduler, windows, seconds, latencies, offset):
+    state = VADState()
+    interval = VAD_WINDOW / VAD_SAMPLE_RATE
+    # Sessions start at different points of a window, as real calls do
+    await asyncio.sleep(offset)
+    next_at = time.perf_counter()
+    for k in range(int(seconds / interval)):
+        started = time.perf_counter()
+        await scheduler.infer("vad", (state, windows[k % len(windows)]))
+        latencies.append(time.perf_counter() - started)
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+async def run(runner, sessions, seconds, max_batch, max_delay):
+    scheduler = BatchScheduler({"vad": runner}, max_batch=max_batch, max_delay=max_delay).start()
+    rng = np.random.default_rng(0)
+    windows = (rng.standard_normal((16, VAD_WINDOW)) * 0.1).astype(np.float32)
+    latencies = []
+    interval = VAD_WINDOW / VAD_SAMPLE_RATE
+    cpu = time.process_time()
+    await asyncio.gather(*(session_loop(scheduler, windows, seconds, latencies, interval * i / sessions)
+                           for i in range(sessions)))
+    cpu = time.process_time() - cpu
+    stats = scheduler.stats()
+    scheduler.close()
+    return cpu / len(latencies), latencies, stats["avg_batch"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched VAD inference benchmark")
+    parser.add_argument("--sessions", default="1,8,32,64", help="Comma-separated session counts")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=10.0)
+    parser.add_argument("--model", help="Path to silero_vad.onnx (needs onnxruntime)")
+    args = parser.parse_args()
+
+    runner, label = make_runner(args.model)
+    runner([(VADState(), np.zeros(VAD_WINDOW, dtype=np.float32))])  # warm up
+
+    print(f"Inference batching benchmark ({label}, {VAD_WINDOW}-sample windows every "
+          f"{VAD_WINDOW / VAD_SAMPLE_RATE * 1000:.0f} ms, batch {args.batch}, delay {args.delay_ms:.0f} ms)")
+    print("=" * 70)
+    for sessions in (int(n) for n in args.sessions.split(",")):
+        print(f"{sessions} session(s):")
+        results = {}
+        for name, max_batch, max_delay in (("per-window call", 1, 0.0),
+                                           ("batched", args.batch, args.delay_ms / 1000)):
+            cpu, latencies, avg_batch = asyncio.run(run(runner, sessions, args.seconds, max_batch, max_delay))
+            results[name] = cpu
+            print(f"   {name:<16} {cpu * 1e6:7.1f} us CPU/window   "
+                  f"~{int(VAD_WINDOW / VAD_SAMPLE_RATE / cpu)} sessions/core   "
+                  f"latency p50 {percentile(latencies, 50) * 1000:5.2f} ms  "
+                  f"p95 {percentile(latencies, 95) * 1000:5.2f} ms   avg batch {avg_batch}")
+        print(f"   CPU per window, per-window call / batched: "
+              f"{results['per-window call'] / results['batched']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
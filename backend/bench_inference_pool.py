@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the inference process pool.
+Runs N simulated sessions on one event loop, each producing a 32 ms VAD
+window in real time, next to a probe task that sleeps 5 ms at a time and
+records how late it wakes up. Compares event-loop lag, per-window latency and
+the CPU the job process itself spends per window for inference run on the
+event loop, in the batch scheduler's thread, and in an ``InferencePool``.
+
+Uses the real silero model when ``--model`` points at ``silero_vad.onnx`` and
+onnxruntime is installed, otherwise ``fake_plugins.FakeVADRunner``.
+"""
+
+import argparse
+import asyncio
+import functools
+import time
+
+import numpy as np
+
+from bench_inference_batching import OnnxRunner
+from fake_plugins import FakeVADRunner
+from inference_batcher import VAD_SAMPLE_RATE, VAD_WINDOW, BatchScheduler, VADState
+from inference_pool import InferencePool
+from model_pool import percentile
+
+PROBE_INTERVAL = 0.005
+
+
+class Inline:
+    """Inference called directly from the session's coroutine"""
+
+    def __init__(self, runner):
+        self.runner = runner
+
+    async def infer(self, kind, payload):
+        return self.runner([payload])[0]
+
+    def close(self):
+        pass
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def session_loop(backend, windows, seconds, latencies, offset):
+    state = VADState()
+    interval = VAD_WINDOW / VAD_SAMPLE_RATE
+    await asyncio.sleep(offset)
+    next_at = time.perf_counter()
+    for k in range(int(seconds / interval)):
+        started = time.perf_counter()
+        await backend.infer("vad", (state, windows[k % len(windows)]))
+        latencies.append(time.perf_counter() - started)
+        next_at += interval
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+async def run(backend, sessions, seconds):
+    rng = np.random.default_rng(0)
+    windows = (rng.standard_normal((16, VAD_WINDOW)) * 0.1).astype(np.float32)
+    interval = VAD_WINDOW / VAD_SAMPLE_RATE
+    lags, latencies = [], []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    cpu = time.process_time()
+    await asyncio.gather(*(session_loop(backend, windows, seconds, latencies, interval * i / sessions)
+                           for i in range(sessions)))
+    cpu = time.process_time() - cpu
+    stop.set()
+    await probe_task
+    return lags, latencies, cpu / len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference process pool benchmark")
+    parser.add_argument("--sessions", default="16,64", help="Comma-separated session counts")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=10.0)
+    parser.add_argument("--model", help="Path to silero_vad.onnx (needs onnxruntime)")
+    args = parser.parse_args()
+
+    if args.model:
+        factory, label = functools.partial(OnnxRunner, model_path=args.model), "silero"
+    else:
+        factory, label = FakeVADRunner, "synthetic runner"
+    runner = factory()
+    runner([(VADState(), np.zeros(VAD_WINDOW, dtype=np.float32))])  # warm up
+    pool = InferencePool(processes=args.processes, max_batch=args.batch, runner_factory=factory).load()
+    delay = args.delay_ms / 1000
+
+    print(f"Inference pool benchmark ({label}, {args.processes} worker processes, "
+          f"batch {args.batch}, delay {args.delay_ms:.0f} ms, probe every {PROBE_INTERVAL * 1000:.0f} ms)")
+    print("=" * 70)
+    for sessions in (int(n) for n in args.sessions.split(",")):
+        print(f"{sessions} session(s):")
+        for name, make in (("on event loop", lambda: Inline(runner)),
+                           ("scheduler thread", lambda: BatchScheduler({"vad": runner}, args.batch, delay)),
+                           ("process pool", lambda: BatchScheduler({"vad": pool}, args.batch, delay))):
+            backend = make()
+            lags, latencies, cpu = asyncio.run(run(backend, sessions, args.seconds))
+            backend.close()
+            print(f"   {name:<17} loop lag p50 {percentile(lags, 50) * 1000:5.2f} ms  "
+                  f"p99 {percentile(lags, 99) * 1000:6.2f} ms  max {max(lags) * 1000:6.2f} ms   "
+                  f"window p95 {percentile(latencies, 95) * 1000:6.2f} ms   "
+                  f"job CPU {cpu * 1e6:6.1f} us/window")
+    print(f"   pool: {pool.stats()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
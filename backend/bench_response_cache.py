@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the travel query response cache.
+Replays a repetitive workload against the stub LLM backend with and without
+the cache and reports hit rate and latency.
+"""
+
+import asyncio
+import random
+import time
+
+from llm_backend import StubLLMBackend
+from model_pool import percentile
+from response_cache import HashingEmbedder, ResponseCache
+
+QUERIES = [
+    "What are the visa rules for Frankfurt?",
+    "visa rules for Frankfurt",
+    "What is the time zone in Tokyo?",
+    "Tokyo time zone",
+    "Find business hotels in London",
+    "Business hotels in London please",
+    "Book a flight to New York next week",
+    "What documents do I need for Japan?",
+    "Currency exchange rate for Singapore dollars",
+    "Weather in Frankfurt tomorrow",
+]
+
+async def run(cache, backend, requests):
+    latencies = []
+    for query in requests:
+        start = time.perf_counter()
+        if cache is None:
+            await backend.generate(query, {})
+        else:
+            await cache.get_or_generate(query, {}, lambda: backend.generate(query, {}))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(label, latencies, backend):
+    total = sum(latencies)
+    print(f"{label}:")
+    print(f"   requests: {len(latencies)}, backend calls: {backend.calls}")
+    print(f"   mean {total / len(latencies) * 1000:.2f} ms, "
+          f"p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.2f} ms")
+
+def main():
+    random.seed(7)
+    requests = [random.choice(QUERIES) for _ in range(200)]
+
+    print("Response cache benchmark (stub backend, 20 ms simulated latency)")
+    print("=" * 50)
+
+    backend = StubLLMBackend(latency=0.02)
+    report("No cache", asyncio.run(run(None, backend, requests)), backend)
+
+    backend = StubLLMBackend(latency=0.02)
+    cache = ResponseCache()
+    report("Exact cache", asyncio.run(run(cache, backend, requests)), backend)
+    print(f"   {cache.stats()}")
+
+    backend = StubLLMBackend(latency=0.02)
+    cache = ResponseCache(embedder=HashingEmbedder())
+    report("Semantic cache", asyncio.run(run(cache, backend, requests)), backend)
+    print(f"   {cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the session store at 100k concurrent sessions.
+Reports start/lookup/update throughput, memory per session, idle eviction
+time and log recovery time.
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from session_store import SessionStore
+
+SESSIONS = int(os.getenv("BENCH_SESSIONS", "100000"))
+
+def timed(label, fn, count):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<22} {elapsed * 1000:>9.1f} ms  ({count / elapsed:>10.0f} ops/sec)")
+
+def main():
+    print(f"Session store benchmark ({SESSIONS} sessions)")
+    print("=" * 50)
+
+    clock = [0.0]
+    store = SessionStore(idle_timeout=60, max_sessions=SESSIONS, clock=lambda: clock[0])
+    preferences = {"seat": "aisle", "class": "business"}
+
+    tracemalloc.start()
+    started = []
+    timed("start", lambda: started.extend(store.start(f"user{i}", preferences) for i in range(SESSIONS)), SESSIONS)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   memory                 {current / 1024 / 1024:>9.1f} MB  ({current / SESSIONS:.0f} bytes/session)")
+
+    ids = [(record.session_id, token) for record, token in started]
+    timed("get", lambda: [store.get(session_id, token) for session_id, token in ids], SESSIONS)
+    timed("update", lambda: [store.update(session_id, token, state={"city": "Tokyo"}) for session_id, token in ids],
+          SESSIONS)
+
+    clock[0] = 120.0
+    timed("evict idle", store.evict_idle, SESSIONS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.log")
+        durable = SessionStore(max_sessions=SESSIONS, log_path=path)
+        timed("start (logged)", lambda: [durable.start(f"user{i}", preferences) for i in range(SESSIONS)], SESSIONS)
+        durable.close()
+        timed("recover from log", lambda: SessionStore(max_sessions=SESSIONS, log_path=path).close(), SESSIONS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for LiveKit token issuance.
+Reports tokens/sec for building an AccessToken by hand per request and
+through TokenService. The service only saves the per-request environment
+lookups, so expect the two rates to be within noise of each other.
+"""
+
+import os
+import time
+import uuid
+
+from dotenv import load_dotenv
+from livekit.api import AccessToken, VideoGrants
+
+from token_service import TokenService
+
+load_dotenv(".env")
+
+def access_token_path(api_key, api_secret, count):
+    for _ in range(count):
+        AccessToken(
+            api_key=api_key,
+            api_secret=api_secret,
+        ).with_identity(f"user_{uuid.uuid4().hex}").with_grants(
+            VideoGrants(room_join=True, room="business-travel-room")
+        ).to_jwt()
+
+def service_path(service, count):
+    for _ in range(count):
+        service.mint()
+
+def measure(label, fn, count):
+    start = time.perf_counter()
+    fn(count)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<28} {count / elapsed:>10.0f} tokens/sec")
+
+def main():
+    api_key = os.getenv("LIVEKIT_API_KEY", "benchkey")
+    api_secret = os.getenv("LIVEKIT_API_SECRET", "benchsecret" * 4)
+    count = int(os.getenv("BENCH_TOKENS", "20000"))
+    service = TokenService(api_key, api_secret)
+
+    print(f"Token issuance benchmark ({count} tokens)")
+    print("=" * 50)
+    measure("AccessToken per request", lambda n: access_token_path(api_key, api_secret, n), count)
+    measure("TokenService.mint", lambda n: service_path(service, n), count)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Indexed destination and services catalog.
+
+Loaded once at startup from ``CATALOG_PATH`` (default ``data/catalog.json``)
+and never mutated, so every index is built up front:
+
+- country -> destination ids
+- a trie over the words of each destination name for prefix search
+- destination ids bucketed by ``business_index`` value for range queries
+
+The unfiltered pages (``destinations_page()``, ``services_page()``) are
+serialized once, pre-compressed at maximum level by ``warm_up`` and kept for
+the life of the process. Filtered queries are caller-controlled and
+unbounded, so they are serialized per request and compressed at a cheap
+level, not cached. Every page carries an ETag derived from the catalog digest
+and the query, so ``If-None-Match`` revalidation still answers 304.
+"""
+
+import bisect
+import hashlib
+import itertools
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from response_encoding import CachedBody, dumps
+
+DEFAULT_CATALOG_PATH = os.getenv(
+    "CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.json"),
+)
+
+_WORD = re.compile(r"\w+")
+PAGE_SIZE = 50
+# destinations_page() key with no filters: the page every client starts from
+_FIRST_DESTINATIONS_PAGE = ("destinations", "", "", None, None, 0, PAGE_SIZE)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class PrefixTrie:
+    """Maps word prefixes to the ids of entries containing such a word"""
+
+    __slots__ = ("children", "ids")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "PrefixTrie"] = {}
+        self.ids: List[int] = []
+
+    def insert(self, word: str, entry_id: int) -> None:
+        node = self
+        for char in word:
+            node = node.children.setdefault(char, PrefixTrie())
+            # Every node lists the entries below it, so lookups never walk subtrees
+            if not node.ids or node.ids[-1] != entry_id:
+                node.ids.append(entry_id)
+
+    def lookup(self, prefix: str) -> List[int]:
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+
+class Catalog:
+    """Immutable in-memory catalog with precomputed indexes"""
+
+    def __init__(self, destinations: List[Dict[str, Any]], services: List[Dict[str, Any]]) -> None:
+        self.destinations = destinations
+        self.services = services
+        payload = json.dumps({"destinations": destinations, "services": services}, sort_keys=True)
+        self.digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+        self.by_country: Dict[str, List[int]] = {}
+        self.names = PrefixTrie()
+        for entry_id, destination in enumerate(destinations):
+            self.by_country.setdefault(destination["country"].lower(), []).append(entry_id)
+            for word in _words(destination["name"]):
+                self.names.insert(word, entry_id)
+        # One id list per distinct business_index value, each in catalog order
+        buckets: Dict[float, List[int]] = {}
+        for entry_id, destination in enumerate(destinations):
+            buckets.setdefault(destination["business_index"], []).append(entry_id)
+        self._index_values = sorted(buckets)
+        self._index_buckets = [buckets[value] for value in self._index_values]
+
+        self.services_by_id = {service["id"]: service for service in services}
+        # The unfiltered pages only; query pages are built per request
+        self._responses: Dict[Tuple, CachedBody] = {}
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH) -> "Catalog":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("destinations", []), data.get("services", []))
+
+    # Destination queries -----------------------------------------------
+
+    def _range_buckets(self, low: Optional[float], high: Optional[float]) -> List[List[int]]:
+        start = 0 if low is None else bisect.bisect_left(self._index_values, low)
+        end = len(self._index_values) if high is None else bisect.bisect_right(self._index_values, high)
+        return self._index_buckets[start:end]
+
+    def _prefix(self, words: List[str]) -> List[int]:
+        # "new yo" matches entries having a word starting with each query word
+        ids = self.names.lookup(words[0])
+        for word in words[1:]:
+            ids = [i for i in ids if self._has_prefixes(i, [word])]
+        return ids
+
+    def _has_prefixes(self, entry_id: int, words: List[str]) -> bool:
+        name_words = _words(self.destinations[entry_id]["name"])
+        return all(any(w.startswith(prefix) for w in name_words) for prefix in words)
+
+    def find_destinations(self, q: Optional[str] = None, country: Optional[str] = None,
+                          min_index: Optional[float] = None, max_index: Optional[float] = None
+                          ) -> List[int]:
+        """Ids of matching destinations in catalog order"""
+        words = _words(q) if q else []
+        ranged = min_index is not None or max_index is not None
+        # Candidate lists by (size, loader); only the smallest one is materialized
+        candidates = []
+        if country:
+            ids = self.by_country.get(country.lower(), [])
+            candidates.append((len(ids), lambda: ids))
+        if words:
+            first = self.names.lookup(words[0])
+            candidates.append((len(first), lambda: self._prefix(words)))
+        if ranged:
+            buckets = self._range_buckets(min_index, max_index)
+            # Concatenated sorted runs: timsort merges them in linear time
+            candidates.append((sum(map(len, buckets)),
+                               lambda: buckets[0] if len(buckets) == 1
+                               else sorted(itertools.chain.from_iterable(buckets))))
+        if not candidates:
+            return list(range(len(self.destinations)))
+
+        size, load = min(candidates, key=lambda candidate: candidate[0])
+        ids = load()
+        if len(candidates) == 1:
+            return ids
+
+        # Check the remaining filters per entry instead of intersecting big lists
+        country_key = country.lower() if country else None
+        low = float("-inf") if min_index is None else min_index
+        high = float("inf") if max_index is None else max_index
+        result = []
+        for entry_id in ids:
+            destination = self.destinations[entry_id]
+            if country_key and destination["country"].lower() != country_key:
+                continue
+            if ranged and not low <= destination["business_index"] <= high:
+                continue
+            if words and not self._has_prefixes(entry_id, words):
+                continue
+            result.append(entry_id)
+        return result
+
+    def destinations_page(self, q: Optional[str] = None, country: Optional[str] = None,
+                          min_index: Optional[float] = None, max_index: Optional[float] = None,
+                          offset: int = 0, limit: int = PAGE_SIZE) -> CachedBody:
+        key = ("destinations", (q or "").strip().lower(), (country or "").lower(),
+               min_index, max_index, offset, limit)
+        return self._page(key, lambda: self._destinations_payload(
+            q, country, min_index, max_index, offset, limit), key == _FIRST_DESTINATIONS_PAGE)
+
+    def _destinations_payload(self, q, country, min_index, max_index, offset, limit) -> Dict[str, Any]:
+        ids = self.find_destinations(q, country, min_index, max_index)
+        return {
+            "destinations": [self.destinations[i] for i in ids[offset:offset + limit]],
+            "total": len(ids),
+            "offset": offset,
+            "limit": limit,
+        }
+
+    # Services ------------------------------------------------------------
+
+    def services_page(self, q: Optional[str] = None) -> CachedBody:
+        key = ("services", (q or "").strip().lower())
+        return self._page(key, lambda: {"services": self.find_services(q)}, not key[1])
+
+    def find_services(self, q: Optional[str] = None) -> List[Dict[str, Any]]:
+        if not q:
+            return self.services
+        needle = q.strip().lower()
+        if needle in self.services_by_id:
+            return [self.services_by_id[needle]]
+        return [s for s in self.services
+                if needle in s["name"].lower() or needle in s["description"].lower()]
+
+    # Pre-serialized responses -------------------------------------------
+
+    def _page(self, key: Tuple, build, static: bool) -> CachedBody:
+        cached = self._responses.get(key) if static else None
+        if cached is not None:
+            return cached
+        body = dumps(build())
+        query_hash = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=6).hexdigest()
+        cached = CachedBody(body, f'W/"{self.digest}-{query_hash}"', fast=not static)
+        if static:
+            self._responses[key] = cached
+        return cached
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "digest": self.digest,
+            "destinations": len(self.destinations),
+            "countries": len(self.by_country),
+            "services": len(self.services),
+            "cached_responses": len(self._responses),
+        }
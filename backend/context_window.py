@@ -0,0 +1,272 @@
+"""
+Bounded chat context for long voice sessions.
+
+Without trimming, every turn resends the whole call to the LLM, so prompt
+size, latency and cost grow linearly with call length. ``ContextWindow``
+rebuilds the context handed to the LLM on each turn from:
+
+- the system prompt
+- a compact state block: structured trip slots (cities, dates, budget,
+  cabin class) pulled from the caller's messages, plus a rolling summary of
+  older turns
+- the last ``keep_turns`` turns verbatim
+
+Older turns are summarized by a background task started after the turn that
+pushed them out of the window, never on the reply's critical path. Until that
+summary lands, the unsummarized turns are kept verbatim as far as the token
+budget allows. The whole context is capped at ``token_budget`` estimated
+tokens; the most recent turn is always kept.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agent_registry import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "Update the running summary of a business travel planning call. Keep decisions, "
+    "constraints and open questions; drop pleasantries. At most 80 words."
+)
+
+_MONTHS = ("january february march april may june july august september october "
+           "november december jan feb mar apr jun jul aug sep sept oct nov dec")
+_DATE = re.compile(
+    r"\b(?:\d{4}-\d{2}-\d{2}"
+    r"|\d{1,2}(?:st|nd|rd|th)?\s+(?:" + "|".join(_MONTHS.split()) + r")\b"
+    r"|(?:" + "|".join(_MONTHS.split()) + r")\s+\d{1,2}(?:st|nd|rd|th)?\b"
+    r"|(?:next\s+)?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+    r"|today|tomorrow|next\s+week)",
+    re.IGNORECASE,
+)
+_BUDGET = re.compile(
+    r"(?:[$€£]\s?\d[\d,]*(?:\.\d+)?\s?k?"
+    r"|\b\d[\d,]*(?:\.\d+)?\s?k?\s?(?:dollars|usd|euros?|eur|pounds|gbp|yen))",
+    re.IGNORECASE,
+)
+_CABIN = re.compile(r"\b(first|business|premium economy|economy)\s+class\b", re.IGNORECASE)
+_ORIGIN = re.compile(r"\bfrom\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+_DESTINATION = re.compile(r"\b(?:to|in|into|at)\s+([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)?)")
+_NOT_PLACES = frozenset(
+    "I Monday Tuesday Wednesday Thursday Friday Saturday Sunday January February March April May "
+    "June July August September October November December".split()
+)
+
+
+def extract_slots(text: str) -> Dict[str, Any]:
+    """Trip details mentioned in one caller message"""
+    slots: Dict[str, Any] = {}
+    dates = [m.group(0) for m in _DATE.finditer(text)]
+    if dates:
+        slots["dates"] = dates
+    budget = _BUDGET.search(text)
+    if budget:
+        slots["budget"] = budget.group(0).strip()
+    cabin = _CABIN.search(text)
+    if cabin:
+        slots["cabin_class"] = cabin.group(1).lower()
+    origin = _ORIGIN.search(text)
+    if origin and origin.group(1) not in _NOT_PLACES:
+        slots["origin"] = origin.group(1)
+    for match in _DESTINATION.finditer(text):
+        if match.group(1) not in _NOT_PLACES and match.group(1) != slots.get("origin"):
+            slots["destination"] = match.group(1)
+    return slots
+
+
+def item_text(item: Any) -> str:
+    """Text of a chat item (message, tool call or tool output)"""
+    text = getattr(item, "text_content", None)
+    if text is not None:
+        return text
+    for attr in ("output", "arguments"):
+        value = getattr(item, attr, None)
+        if value:
+            return str(value)
+    return ""
+
+
+def _role(item: Any) -> Optional[str]:
+    return getattr(item, "role", None) if getattr(item, "type", "message") == "message" else None
+
+
+def _livekit_message(role: str, text: str):
+    from livekit.agents.llm import ChatMessage
+
+    return ChatMessage(role=role, content=[text])
+
+
+class ContextWindow:
+    """Keeps the last turns verbatim and folds older ones into a summary"""
+
+    def __init__(
+        self,
+        summarize: Optional[Callable[[str, str], Awaitable[str]]] = None,
+        keep_turns: int = 6,
+        token_budget: int = 2000,
+        make_message: Callable[[str, str], Any] = _livekit_message,
+    ) -> None:
+        self.summarize = summarize
+        self.keep_turns = max(1, keep_turns)
+        self.token_budget = token_budget
+        self.make_message = make_message
+        self.slots: "OrderedDict[str, Any]" = OrderedDict()
+        self.summary = ""
+        self._summarized = 0      # turns folded into the summary
+        self._slot_turns = 0      # turns scanned for slots
+        self._task: Optional[asyncio.Task] = None
+        self.prepared = 0
+        self.tokens_full = 0
+        self.tokens_sent = 0
+        self.summaries = 0
+        self.summary_failures = 0
+        self.dropped_turns = 0
+
+    @classmethod
+    def from_env(cls, summarize: Optional[Callable[[str, str], Awaitable[str]]] = None,
+                 **kwargs) -> "ContextWindow":
+        return cls(
+            summarize,
+            keep_turns=int(os.getenv("CONTEXT_KEEP_TURNS", "6")),
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000")),
+            **kwargs,
+        )
+
+    # Building the context ----------------------------------------------
+
+    @staticmethod
+    def _split(items: List[Any]):
+        """Leading system items, then turns that each start at a user message"""
+        head = 0
+        while head < len(items) and _role(items[head]) in ("system", "developer"):
+            head += 1
+        turns: List[List[Any]] = []
+        for item in items[head:]:
+            if _role(item) == "user" or not turns:
+                turns.append([item])
+            else:
+                turns[-1].append(item)
+        return items[:head], turns
+
+    def _update_slots(self, turns: List[List[Any]]) -> None:
+        for turn in turns[self._slot_turns:]:
+            for item in turn:
+                if _role(item) == "user":
+                    for name, value in extract_slots(item_text(item)).items():
+                        if name == "dates":
+                            known = self.slots.setdefault("dates", [])
+                            known.extend(d for d in value if d not in known)
+                        else:
+                            self.slots[name] = value
+                            self.slots.move_to_end(name)
+        # The latest turn is rescanned: a speculative request may have seen
+        # only the interim transcript of it
+        self._slot_turns = max(0, len(turns) - 1)
+
+    def state_block(self) -> str:
+        lines = []
+        if self.slots:
+            details = "; ".join(
+                f"{name}: {', '.join(value) if isinstance(value, list) else value}"
+                for name, value in self.slots.items()
+            )
+            lines.append(f"Known trip details - {details}.")
+        if self.summary:
+            lines.append(f"Earlier in this call: {self.summary}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _tokens(items: List[Any]) -> int:
+        return sum(estimate_tokens(item_text(item)) + 4 for item in items)
+
+    def prepare_items(self, items: List[Any]) -> List[Any]:
+        """Return the trimmed item list to send to the LLM this turn"""
+        system, turns = self._split(list(items))
+        self._update_slots(turns)
+        self.prepared += 1
+        full_tokens = self._tokens(items)
+        self.tokens_full += full_tokens
+
+        if len(turns) <= self.keep_turns and full_tokens <= self.token_budget:
+            self.tokens_sent += full_tokens
+            return list(items)
+
+        older = turns[:-self.keep_turns] if len(turns) > self.keep_turns else []
+        self._schedule_summary(older)
+
+        block = self.state_block()
+        head = list(system)
+        if block:
+            head.append(self.make_message("system", block))
+        budget = self.token_budget - self._tokens(head)
+
+        # Newest turns first; the latest turn is kept even over budget
+        kept: List[List[Any]] = []
+        candidates = turns[self._summarized:]
+        for turn in reversed(candidates):
+            cost = self._tokens(turn)
+            if kept and cost > budget:
+                break
+            kept.append(turn)
+            budget -= cost
+        self.dropped_turns += len(candidates) - len(kept)
+
+        result = head + [item for turn in reversed(kept) for item in turn]
+        self.tokens_sent += self._tokens(result)
+        return result
+
+    def prepare(self, chat_ctx):
+        """Trimmed copy of a LiveKit ``ChatContext``"""
+        items = self.prepare_items(chat_ctx.items)
+        if len(items) == len(chat_ctx.items) and all(a is b for a, b in zip(items, chat_ctx.items)):
+            return chat_ctx
+        return type(chat_ctx)(items)
+
+    # Background summarization ------------------------------------------
+
+    def _schedule_summary(self, older: List[List[Any]]) -> None:
+        if self.summarize is None or len(older) <= self._summarized:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        pending = older[self._summarized:]
+        transcript = "\n".join(
+            f"{_role(item) or getattr(item, 'type', 'item')}: {item_text(item)}"
+            for turn in pending for item in turn
+        )
+        self._task = asyncio.create_task(self._run_summary(transcript, len(older)))
+
+    async def _run_summary(self, transcript: str, upto: int) -> None:
+        try:
+            summary = (await self.summarize(self.summary, transcript)).strip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.summary_failures += 1
+            logger.warning(f"Context summarization failed: {e}")
+            return
+        if summary:
+            self.summary = summary
+            self._summarized = upto
+            self.summaries += 1
+
+    async def aclose(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns_prepared": self.prepared,
+            "summarized_turns": self._summarized,
+            "dropped_turns": self.dropped_turns,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "avg_tokens_full": round(self.tokens_full / self.prepared, 1) if self.prepared else 0.0,
+            "avg_tokens_sent": round(self.tokens_sent / self.prepared, 1) if self.prepared else 0.0,
+            "slots": dict(self.slots),
+        }
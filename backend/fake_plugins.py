@@ -0,0 +1,111 @@
+"""
+Offline stand-ins for the voice pipeline providers.
+
+Used by the load-test harness to drive voice sessions without LiveKit Cloud
+or provider keys: ``FakeSTT`` replays recorded PCM as caller audio frames at
+real-time pace and returns a scripted transcript per utterance, the LLM is
+``StubLLMBackend`` and the TTS is ``greeting_cache.FakeTTS``.
+"""
+
+import asyncio
+import math
+import wave
+from types import SimpleNamespace
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from greeting_cache import FakeTTS  # noqa: F401  re-exported for the harness
+from llm_backend import StubLLMBackend  # noqa: F401
+
+DEFAULT_TRANSCRIPTS = (
+    "What are the visa rules for Frankfurt?",
+    "Find business hotels in London near the financial district.",
+    "What is the time zone in Tokyo compared to New York?",
+    "Book a flight to Singapore next Tuesday morning.",
+    "Convert five hundred euros to Japanese yen.",
+)
+
+
+def load_pcm(path: Optional[str] = None, sample_rate: int = 48000, seconds: float = 2.0) -> Tuple[bytes, int]:
+    """(mono 16-bit PCM, sample rate) from a WAV recording, or a synthetic speech-like burst"""
+    if path:
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                raise ValueError(f"{path} must be mono 16-bit PCM")
+            return wav.readframes(wav.getnframes()), wav.getframerate()
+
+    # Amplitude-modulated tone: loud enough for a VAD, cheap to generate
+    pcm = bytearray()
+    for n in range(int(sample_rate * seconds)):
+        t = n / sample_rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t)
+        value = int(6000 * envelope * math.sin(2 * math.pi * 180 * t))
+        pcm += value.to_bytes(2, "little", signed=True)
+    return bytes(pcm), sample_rate
+
+
+class FakeSTT:
+    """Feeds recorded PCM frame by frame and returns scripted transcripts"""
+
+    def __init__(
+        self,
+        pcm: bytes,
+        transcripts: Sequence[str] = DEFAULT_TRANSCRIPTS,
+        sample_rate: int = 48000,
+        frame_ms: int = 20,
+        final_delay: float = 0.15,
+        realtime: bool = True,
+    ) -> None:
+        self.pcm = pcm
+        self.transcripts: List[str] = list(transcripts)
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.final_delay = final_delay
+        self.realtime = realtime
+        self.frames_fed = 0
+
+    async def frames(self, turn: int) -> AsyncIterator[SimpleNamespace]:
+        """One utterance as caller audio frames, shaped like ``rtc.AudioFrame``"""
+        samples = self.sample_rate * self.frame_ms // 1000
+        view = memoryview(self.pcm)
+        for offset in range(0, len(view) - samples * 2 + 1, samples * 2):
+            self.frames_fed += 1
+            yield SimpleNamespace(data=view[offset:offset + samples * 2], sample_rate=self.sample_rate,
+                                  num_channels=1, samples_per_channel=samples)
+            await asyncio.sleep(self.frame_ms / 1000 if self.realtime else 0)
+
+    async def final_transcript(self, turn: int) -> str:
+        """Transcript of the utterance, after the provider's finalization delay"""
+        if self.final_delay:
+            await asyncio.sleep(self.final_delay)
+        return self.transcripts[turn % len(self.transcripts)]
+
+
+class FakeVADRunner:
+    """Batch runner shaped like the silero VAD, for benchmarks without the model
+
+    A small recurrent network over (state, window) pairs: one projection of
+    context + window, one recurrent update, one sigmoid readout. Numbers are
+    meaningless but the per-call and per-row costs behave like a real runner.
+    """
+
+    def __init__(self, hidden: int = 128, context: int = 64, window: int = 512, seed: int = 0) -> None:
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        self.input_weights = (rng.standard_normal((context + window, hidden)) / 24).astype(np.float32)
+        self.recurrent_weights = (rng.standard_normal((hidden, hidden)) / 12).astype(np.float32)
+        self.readout = (rng.standard_normal(hidden) / 12).astype(np.float32)
+
+    def run_arrays(self, inputs, states):
+        import numpy as np
+
+        hidden = np.tanh(inputs @ self.input_weights + states[0] @ self.recurrent_weights)
+        probabilities = 1 / (1 + np.exp(-(hidden @ self.readout)))
+        new_states = states.copy()
+        new_states[0] = hidden
+        return probabilities, new_states
+
+    def __call__(self, payloads) -> List[float]:
+        from inference_batcher import run_vad_batch
+
+        return run_vad_batch(self.run_arrays, payloads)
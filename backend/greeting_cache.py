@@ -0,0 +1,243 @@
+"""
+Pre-synthesized greeting audio for the voice agent.
+
+The opening line of every session is the same sentence spoken by the same
+voice, so its PCM audio is synthesized once per (model, voice, text), kept in
+memory and on disk, and played straight into the room with ``session.say``
+instead of a fresh LLM call plus TTS call per caller.
+
+The cache is shared by every job in the process. Jobs run as threads
+(``AGENT_JOB_EXECUTOR=thread``) each have their own event loop, so the lock
+that stops concurrent sessions synthesizing the same greeting is per loop.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import wave
+import weakref
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+GREETING_TEXT = "Welcome to your business travel assistant. How can I help with your travel plans today?"
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "GREETING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "greetings"),
+)
+
+
+class GreetingAudio:
+    """Raw 16-bit PCM plus the format needed to play it back"""
+
+    __slots__ = ("pcm", "sample_rate", "num_channels")
+
+    def __init__(self, pcm: bytes, sample_rate: int, num_channels: int = 1) -> None:
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (2 * self.num_channels * self.sample_rate)
+
+
+class GreetingCache:
+    """Memory + disk cache of synthesized greeting audio"""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+        self._memory: Dict[str, GreetingAudio] = {}
+        # Event loop -> key -> lock; an asyncio.Lock only works on one loop
+        self._locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = \
+            weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, model: str, voice: str) -> str:
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _read_disk(self, key: str) -> Optional[GreetingAudio]:
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with wave.open(path, "rb") as wav:
+                return GreetingAudio(
+                    wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels()
+                )
+        except (OSError, wave.Error) as e:
+            logger.warning(f"Ignoring unreadable greeting cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key: str, audio: GreetingAudio) -> None:
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with wave.open(tmp_path, "wb") as wav:
+                wav.setnchannels(audio.num_channels)
+                wav.setsampwidth(2)
+                wav.setframerate(audio.sample_rate)
+                wav.writeframes(audio.pcm)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist greeting audio to {path}: {e}")
+
+    def lookup(self, text: str, model: str, voice: str) -> Optional[GreetingAudio]:
+        """Return cached audio from memory or disk without synthesizing"""
+        key = self.key(text, model, voice)
+        audio = self._memory.get(key)
+        if audio is None:
+            audio = self._read_disk(key)
+            if audio is not None:
+                self._memory[key] = audio
+        return audio
+
+    def preload(self, text: str, model: str, voice: str) -> bool:
+        """Pull a previously persisted greeting into memory (used from prewarm)"""
+        return self.lookup(text, model, voice) is not None
+
+    async def get_or_synthesize(self, tts, text: str, model: str, voice: str) -> GreetingAudio:
+        """Return the greeting audio, synthesizing it at most once per key"""
+        key = self.key(text, model, voice)
+        audio = self.lookup(text, model, voice)
+        if audio is not None:
+            self.hits += 1
+            return audio
+
+        lock = self._locks.setdefault(asyncio.get_running_loop(), {}).setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another session may have filled the cache while we waited
+            audio = self._memory.get(key)
+            if audio is not None:
+                self.hits += 1
+                return audio
+
+            self.misses += 1
+            audio = await synthesize_pcm(tts, text)
+            self._memory[key] = audio
+            self._write_disk(key, audio)
+            logger.info(f"Cached greeting audio ({audio.duration:.2f}s) for {model}/{voice}")
+            return audio
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+
+async def synthesize_pcm(tts, text: str) -> GreetingAudio:
+    """Run a one-shot TTS synthesis and collect its frames into one PCM buffer"""
+    chunks = []
+    sample_rate = getattr(tts, "sample_rate", 24000)
+    num_channels = getattr(tts, "num_channels", 1)
+    async with tts.synthesize(text) as stream:
+        async for event in stream:
+            frame = event.frame
+            sample_rate = frame.sample_rate
+            num_channels = frame.num_channels
+            chunks.append(bytes(frame.data))
+    return GreetingAudio(b"".join(chunks), sample_rate, num_channels)
+
+
+async def audio_frames(audio: GreetingAudio, frame_ms: int = 20) -> AsyncIterator:
+    """Slice cached PCM into ``rtc.AudioFrame`` objects for ``session.say``"""
+    from livekit import rtc
+
+    samples_per_frame = audio.sample_rate * frame_ms // 1000
+    frame_bytes = samples_per_frame * audio.num_channels * 2
+    view = memoryview(audio.pcm)
+    for offset in range(0, len(view), frame_bytes):
+        chunk = view[offset:offset + frame_bytes]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=audio.sample_rate,
+            num_channels=audio.num_channels,
+            samples_per_channel=len(chunk) // (2 * audio.num_channels),
+        )
+
+
+async def play_greeting(session, cache: "GreetingCache", tts, model: str, voice: str,
+                        text: str = GREETING_TEXT):
+    """Speak the greeting from cache, falling back to an LLM-generated reply"""
+    try:
+        audio = await cache.get_or_synthesize(tts, text, model, voice)
+    except Exception as e:
+        logger.warning(f"Greeting synthesis failed, falling back to generate_reply: {e}")
+        return await session.generate_reply(instructions=text)
+    return await session.say(text, audio=audio_frames(audio), add_to_chat_ctx=True)
+
+
+class FakeTTS:
+    """Offline stand-in for ``cartesia.TTS`` producing a deterministic tone"""
+
+    def __init__(self, sample_rate: int = 24000, num_channels: int = 1,
+                 ms_per_char: int = 60, frame_ms: int = 20, first_byte_delay: float = 0.0) -> None:
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.ms_per_char = ms_per_char
+        self.frame_ms = frame_ms
+        self.first_byte_delay = first_byte_delay
+        self.synth_calls = 0
+
+    def synthesize(self, text: str) -> "_FakeChunkedStream":
+        self.synth_calls += 1
+        return _FakeChunkedStream(self, text)
+
+
+class _FakeChunkedStream:
+    def __init__(self, tts: FakeTTS, text: str) -> None:
+        self._tts = tts
+        self._text = text
+
+    async def __aenter__(self) -> "_FakeChunkedStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def __aiter__(self):
+        tts = self._tts
+        # Pitch is derived from the text so different phrases sound different
+        freq = 200 + int(hashlib.md5(self._text.encode("utf-8")).hexdigest()[:4], 16) % 400
+        total = tts.sample_rate * tts.ms_per_char * max(1, len(self._text)) // 1000
+        per_frame = tts.sample_rate * tts.frame_ms // 1000
+        # One frame of tone is rendered and repeated, keeping the fake cheap under load
+        tone = bytearray()
+        for n in range(per_frame):
+            value = int(8000 * math.sin(2 * math.pi * freq * n / tts.sample_rate))
+            tone += value.to_bytes(2, "little", signed=True) * tts.num_channels
+        tone = bytes(tone)
+        if tts.first_byte_delay:
+            await asyncio.sleep(tts.first_byte_delay)
+        for start in range(0, total, per_frame):
+            count = min(per_frame, total - start)
+            yield SimpleNamespace(frame=SimpleNamespace(
+                data=tone[:count * 2 * tts.num_channels],
+                sample_rate=tts.sample_rate,
+                num_channels=tts.num_channels,
+                samples_per_channel=count,
+            ))
+            await asyncio.sleep(0)
+
+
+_cache: Optional[GreetingCache] = None
+
+
+def get_greeting_cache() -> GreetingCache:
+    """Return the process-wide greeting cache"""
+    global _cache
+    if _cache is None:
+        _cache = GreetingCache()
+    return _cache
@@ -0,0 +1,235 @@
+"""
+Batched VAD inference shared by every session in a process.
+
+Each session's VAD used to call its own ONNX model one 32 ms window at a
+time, paying the per-call overhead of ``InferenceSession.run`` for every
+window of every call. ``BatchScheduler`` collects requests from all sessions
+(on any thread or event loop) and hands them to a runner as one batch once
+``INFERENCE_BATCH_SIZE`` requests are waiting or ``INFERENCE_BATCH_DELAY_MS``
+has passed since the oldest one arrived, whichever comes first.
+
+``SileroBatchRunner`` runs the silero VAD model for a whole batch in one call:
+every stream keeps its own recurrent state and audio context, gathered into
+the batch before the call and scattered back after it. Its pending count is
+registered with ``worker_load`` so a backlog sheds load.
+
+With ``INFERENCE_POOL_PROCESSES`` > 0 the batches run in child processes
+(see ``inference_pool``) instead of this process.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from latency_metrics import Histogram, summarize
+
+logger = logging.getLogger(__name__)
+
+VAD_SAMPLE_RATE = 16000
+VAD_WINDOW = 512
+VAD_CONTEXT = 64
+
+# Queue waits are bounded by the batch delay, so they need finer buckets than turn latency
+INFERENCE_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.015, 0.02, 0.05, 0.1, 0.25)
+
+
+class VADState:
+    """Per-stream recurrent state and trailing context for the silero model"""
+
+    __slots__ = ("rnn", "context")
+
+    def __init__(self) -> None:
+        self.rnn = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros(VAD_CONTEXT, dtype=np.float32)
+
+
+def run_vad_batch(run_arrays: Callable[[np.ndarray, np.ndarray], Any], payloads: Sequence[Any]) -> List[float]:
+    """Gather (state, window) pairs into model inputs, run them, scatter the new states back
+
+    ``run_arrays(inputs, states)`` takes ``(B, context + window)`` samples and
+    ``(2, B, 128)`` recurrent state and returns ``(probabilities, new_states)``.
+    """
+    batch = len(payloads)
+    inputs = np.empty((batch, VAD_CONTEXT + VAD_WINDOW), dtype=np.float32)
+    states = np.empty((2, batch, 128), dtype=np.float32)
+    for row, (state, window) in enumerate(payloads):
+        inputs[row, :VAD_CONTEXT] = state.context
+        inputs[row, VAD_CONTEXT:] = window
+        states[:, row] = state.rnn[:, 0]
+    probabilities, new_states = run_arrays(inputs, states)
+    for row, (state, _) in enumerate(payloads):
+        state.rnn[:, 0] = new_states[:, row]
+        state.context[:] = inputs[row, -VAD_CONTEXT:]
+    return [float(p) for p in np.asarray(probabilities).reshape(batch)]
+
+
+class SileroBatchRunner:
+    """Runs the silero VAD ONNX model over a batch of (state, window) pairs"""
+
+    def __init__(self, session=None, model_path: Optional[str] = None) -> None:
+        self._session = session
+        self.model_path = model_path
+        self._sr = np.array(VAD_SAMPLE_RATE, dtype=np.int64)
+
+    def load(self):
+        if self._session is None:
+            from livekit.plugins.silero import onnx_model
+            self._session = onnx_model.new_inference_session(force_cpu=True, onnx_file_path=self.model_path)
+        return self._session
+
+    def run_arrays(self, inputs: np.ndarray, states: np.ndarray):
+        return self.load().run(None, {"input": inputs, "state": states, "sr": self._sr})
+
+    def __call__(self, payloads: Sequence[Any]) -> List[float]:
+        return run_vad_batch(self.run_arrays, payloads)
+
+
+class _Request:
+    __slots__ = ("kind", "payload", "future", "enqueued")
+
+    def __init__(self, kind: str, payload: Any) -> None:
+        self.kind = kind
+        self.payload = payload
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchScheduler:
+    """Collects inference requests from all sessions and runs them in batches"""
+
+    def __init__(self, runners: Dict[str, Callable[[Sequence[Any]], List[Any]]],
+                 max_batch: int = 32, max_delay: float = 0.010) -> None:
+        self.runners = runners
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.wait = Histogram(INFERENCE_BUCKETS)
+        self.run_time = Histogram(INFERENCE_BUCKETS)
+        self.batches = 0
+        self.requests = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, runners: Dict[str, Callable[[Sequence[Any]], List[Any]]]) -> "BatchScheduler":
+        return cls(
+            runners,
+            max_batch=int(os.getenv("INFERENCE_BATCH_SIZE", "32")),
+            max_delay=float(os.getenv("INFERENCE_BATCH_DELAY_MS", "10")) / 1000,
+        )
+
+    def start(self) -> "BatchScheduler":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, kind: str, payload: Any) -> concurrent.futures.Future:
+        """Queue one request; safe to call from any thread"""
+        if self._thread is None:
+            self.start()
+        request = _Request(kind, payload)
+        self._queue.put(request)
+        return request.future
+
+    async def infer(self, kind: str, payload: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(kind, payload))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _collect(self, first: "_Request") -> List["_Request"]:
+        batch = [first]
+        deadline = first.enqueued + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Requests whose caller gave up (session closed) are dropped here
+            batch = [r for r in self._collect(first) if r.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            by_kind: Dict[str, List[_Request]] = {}
+            for request in batch:
+                by_kind.setdefault(request.kind, []).append(request)
+                self.wait.observe(started - request.enqueued)
+            for kind, requests in by_kind.items():
+                try:
+                    results = self.runners[kind]([request.payload for request in requests])
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Batched {kind} inference failed: {e}")
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                for request, result in zip(requests, results):
+                    request.future.set_result(result)
+            self.run_time.observe(time.perf_counter() - started)
+            self.batches += 1
+            self.requests += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "pending": self.pending(),
+            "errors": self.errors,
+            **summarize({"queue_wait": self.wait, "batch_run": self.run_time}),
+            **{f"{kind}_runner": runner.stats() for kind, runner in self.runners.items()
+               if hasattr(runner, "stats")},
+        }
+
+
+_scheduler: Optional[BatchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    """Process-wide scheduler running the silero VAD, created on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from worker_load import register_queue_source
+
+            runner = SileroBatchRunner()
+            if int(os.getenv("INFERENCE_POOL_PROCESSES", "0")) > 0:
+                from inference_pool import InferencePool
+
+                try:
+                    runner = InferencePool.from_env().load()
+                except Exception as e:
+                    # e.g. daemonic job processes may not start children
+                    logger.error(f"Inference pool unavailable, running VAD in process: {e}")
+            _scheduler = BatchScheduler.from_env({"vad": runner})
+            register_queue_source(_scheduler.pending)
+        return _scheduler
@@ -0,0 +1,373 @@
+"""
+Process pool for VAD inference.
+
+The batch scheduler runs the silero model in a thread of the job process, so
+a slow or stuck inference still competes with the event loop that moves
+every session's audio. With ``INFERENCE_POOL_PROCESSES`` > 0 the scheduler's
+VAD runner is an ``InferencePool`` instead, which runs each batch in one of
+that many child processes:
+
+- audio windows and recurrent state travel through a
+  ``multiprocessing.shared_memory`` block, one row per stream in the batch;
+  only the row count goes over the pipe, nothing is pickled per window
+- each worker owns its own rows, and batches larger than
+  ``min_chunk`` are split across workers that run them in parallel
+- workers write new states and probabilities into output columns of the row
+  and never touch the inputs; streams lose nothing on a failure because their
+  state lives in the job process and is only written back on success
+- a worker that crashes or misses ``INFERENCE_POOL_TIMEOUT_MS`` is killed and
+  respawned in a background thread, so the batch never waits for a model to
+  load; its chunk is retried once on another running worker, or fails fast
+  when there is none, and new batches skip the worker until it is back
+- idle workers are pinged every ``INFERENCE_POOL_HEALTH_SECONDS``
+"""
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from inference_batcher import INFERENCE_BUCKETS, VAD_CONTEXT, VAD_WINDOW, SileroBatchRunner
+from latency_metrics import Histogram, summarize
+
+logger = logging.getLogger(__name__)
+
+# Row layout: model input (context + window) and recurrent state, written by
+# the job process; new recurrent state and probability, written by the worker
+INPUT_WIDTH = VAD_CONTEXT + VAD_WINDOW
+STATE_WIDTH = 2 * 128
+STATE_IN = slice(INPUT_WIDTH, INPUT_WIDTH + STATE_WIDTH)
+STATE_OUT = slice(INPUT_WIDTH + STATE_WIDTH, INPUT_WIDTH + 2 * STATE_WIDTH)
+SLOT_WIDTH = INPUT_WIDTH + 2 * STATE_WIDTH + 1
+
+# Loading the model in a fresh process takes a while on a cold box
+STARTUP_TIMEOUT = 60.0
+
+
+class SharedSlots:
+    """A (rows, width) float32 array in a shared memory block"""
+
+    def __init__(self, rows: int, width: int = SLOT_WIDTH, name: Optional[str] = None) -> None:
+        self.owner = name is None
+        # Workers are spawned from the owner and share its resource tracker,
+        # so the block is unlinked once, by the owner
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=rows * width * 4)
+        self.rows = np.ndarray((rows, width), dtype=np.float32, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        del self.rows
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(conn, shm_name: str, total_rows: int, start: int, count: int,
+                 runner_factory: Callable[[], Any]) -> None:
+    """Child process: run batches written into rows [start, start + count)"""
+    slots = SharedSlots(total_rows, name=shm_name)
+    region = slots.rows[start:start + count]
+    runner = runner_factory()
+    if hasattr(runner, "load"):
+        runner.load()
+    conn.send(("ready", os.getpid()))
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            if message == "ping":
+                conn.send("pong")
+                continue
+            rows = region[:message]
+            inputs = np.ascontiguousarray(rows[:, :INPUT_WIDTH])
+            states = np.ascontiguousarray(
+                rows[:, STATE_IN].reshape(message, 2, 128).transpose(1, 0, 2))
+            probabilities, new_states = runner.run_arrays(inputs, states)
+            rows[:, STATE_OUT] = \
+                np.asarray(new_states).transpose(1, 0, 2).reshape(message, STATE_WIDTH)
+            rows[:, -1] = np.asarray(probabilities).reshape(message)
+            conn.send(message)
+    finally:
+        del region
+        slots.close()
+
+
+class PoolWorkerError(RuntimeError):
+    """A pool worker crashed or stopped answering"""
+
+
+class _Worker:
+    __slots__ = ("index", "start", "process", "conn", "lock", "ready", "batches", "restarts")
+
+    def __init__(self, index: int, start: int) -> None:
+        self.index = index
+        self.start = start
+        self.process = None
+        self.conn = None
+        self.lock = threading.Lock()
+        # False while the worker is being respawned; only set under ``lock``
+        self.ready = False
+        self.batches = 0
+        self.restarts = 0
+
+
+class InferencePool:
+    """Batch runner that executes VAD batches in child processes"""
+
+    def __init__(self, processes: int = 2, max_batch: int = 32, timeout: float = 1.0,
+                 health_interval: float = 5.0, min_chunk: int = 8,
+                 runner_factory: Callable[[], Any] = SileroBatchRunner) -> None:
+        self.processes = processes
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.min_chunk = min_chunk
+        self.runner_factory = runner_factory
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots: Optional[SharedSlots] = None
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._next = 0
+        self.round_trip = Histogram(INFERENCE_BUCKETS)
+        self.timeouts = 0
+        self.crashes = 0
+
+    @classmethod
+    def from_env(cls) -> "InferencePool":
+        return cls(
+            processes=int(os.getenv("INFERENCE_POOL_PROCESSES", "2")),
+            max_batch=int(os.getenv("INFERENCE_BATCH_SIZE", "32")),
+            timeout=float(os.getenv("INFERENCE_POOL_TIMEOUT_MS", "1000")) / 1000,
+            health_interval=float(os.getenv("INFERENCE_POOL_HEALTH_SECONDS", "5")),
+        )
+
+    def load(self) -> "InferencePool":
+        """Start the workers and wait until each has loaded its model"""
+        with self._lock:
+            if self._slots is not None:
+                return self
+            self._slots = SharedSlots(self.processes * self.max_batch)
+            self._workers = [_Worker(i, i * self.max_batch) for i in range(self.processes)]
+            try:
+                for worker in self._workers:
+                    worker.process, worker.conn = self._spawn(worker)
+                    worker.ready = True
+            except Exception:
+                self._shutdown()
+                raise
+            atexit.register(self.close)
+            threading.Thread(target=self._health_loop, name="inference-pool-health", daemon=True).start()
+        logger.info(f"Inference pool running {self.processes} worker process(es)")
+        return self
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._slots.name, len(self._slots.rows), worker.start, self.max_batch,
+                  self.runner_factory),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        try:
+            if not parent_conn.poll(STARTUP_TIMEOUT):
+                raise EOFError("timed out")
+            parent_conn.recv()
+        except EOFError as e:
+            process.kill()
+            parent_conn.close()
+            raise PoolWorkerError(f"Inference worker {worker.index} did not start ({e or 'exited'})")
+        return process, parent_conn
+
+    def _restart(self, worker: _Worker, reason: str) -> None:
+        """Kill a failed worker and respawn it in the background; caller holds ``worker.lock``"""
+        logger.warning(f"Restarting inference worker {worker.index} (pid {worker.process.pid}): {reason}")
+        worker.ready = False
+        worker.process.kill()
+        worker.process.join(timeout=1.0)
+        worker.conn.close()
+        worker.restarts += 1
+        threading.Thread(target=self._respawn, args=(worker,),
+                         name=f"inference-respawn-{worker.index}", daemon=True).start()
+
+    def _respawn(self, worker: _Worker) -> None:
+        while not self._stopped.is_set():
+            try:
+                process, conn = self._spawn(worker)
+            except Exception as e:
+                logger.error(f"{e}; retrying in {self.health_interval:.0f}s")
+                self._stopped.wait(self.health_interval)
+                continue
+            with worker.lock:
+                if not self._stopped.is_set():
+                    worker.process, worker.conn, worker.ready = process, conn, True
+                    logger.info(f"Inference worker {worker.index} is back (pid {process.pid})")
+                    return
+            conn.close()
+            process.kill()
+            return
+
+    def _live(self, exclude: Optional[_Worker] = None) -> List[_Worker]:
+        # An unlocked read: a worker that goes down after this is caught by ``_run_chunk``
+        return [w for w in self._workers if w.ready and w is not exclude]
+
+    def _exchange(self, worker: _Worker, message: Any) -> Any:
+        """Send one message and wait for the reply; caller holds ``worker.lock``"""
+        try:
+            worker.conn.send(message)
+            if worker.conn.poll(self.timeout):
+                return worker.conn.recv()
+        except (EOFError, OSError) as e:
+            self.crashes += 1
+            raise PoolWorkerError(f"worker exited ({e})")
+        if not worker.process.is_alive():
+            self.crashes += 1
+            raise PoolWorkerError(f"worker exited with code {worker.process.exitcode}")
+        self.timeouts += 1
+        raise PoolWorkerError(f"no reply within {self.timeout * 1000:.0f} ms")
+
+    def _run_chunk(self, worker: _Worker, payloads: Sequence[Any], results: List[float], offset: int) -> None:
+        with worker.lock:
+            if not worker.ready:
+                raise PoolWorkerError(f"inference worker {worker.index} is restarting")
+            rows = self._slots.rows[worker.start:worker.start + len(payloads)]
+            for row, (state, window) in zip(rows, payloads):
+                row[:VAD_CONTEXT] = state.context
+                row[VAD_CONTEXT:INPUT_WIDTH] = window
+                row[STATE_IN] = state.rnn.reshape(STATE_WIDTH)
+            try:
+                self._exchange(worker, len(payloads))
+            except PoolWorkerError as e:
+                self._restart(worker, str(e))
+                raise
+            for k, (row, (state, window)) in enumerate(zip(rows, payloads)):
+                state.rnn.reshape(STATE_WIDTH)[:] = row[STATE_OUT]
+                state.context[:] = window[-VAD_CONTEXT:]
+                results[offset + k] = float(row[-1])
+            worker.batches += 1
+
+    def __call__(self, payloads: Sequence[Any]) -> List[float]:
+        if self._slots is None:
+            self.load()
+        started = time.perf_counter()
+        live = self._live()
+        if not live:
+            raise PoolWorkerError("no inference worker is running")
+        results = [0.0] * len(payloads)
+        size = max(self.min_chunk, math.ceil(len(payloads) / len(live)))
+        chunks = []
+        for offset in range(0, len(payloads), size):
+            worker = live[self._next % len(live)]
+            self._next += 1
+            chunks.append((worker, payloads[offset:offset + size], offset))
+        if len(chunks) == 1:
+            self._run_retrying(*chunks[0], results)
+        else:
+            errors = []
+
+            def run(chunk):
+                try:
+                    self._run_retrying(*chunk, results)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=run, args=(chunk,)) for chunk in chunks[1:]]
+            for thread in threads:
+                thread.start()
+            run(chunks[0])
+            for thread in threads:
+                thread.join()
+            if errors:
+                raise errors[0]
+        self.round_trip.observe(time.perf_counter() - started)
+        return results
+
+    def _run_retrying(self, worker: _Worker, payloads: Sequence[Any], offset: int, results: List[float]) -> None:
+        try:
+            self._run_chunk(worker, payloads, results, offset)
+        except PoolWorkerError:
+            # The failed worker is respawning; one retry on another worker, never a wait for the respawn
+            others = self._live(exclude=worker)
+            if not others:
+                raise
+            self._run_chunk(others[offset % len(others)], payloads, results, offset)
+
+    def _health_loop(self) -> None:
+        while not self._stopped.wait(self.health_interval):
+            for worker in self._workers:
+                # A busy worker is answering batches; only idle ones are pinged
+                if not worker.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if self._stopped.is_set():
+                        return
+                    if not worker.ready:
+                        continue
+                    try:
+                        self._exchange(worker, "ping")
+                    except PoolWorkerError as e:
+                        self._restart(worker, str(e))
+                except Exception as e:
+                    logger.error(f"Inference worker {worker.index} health check failed: {e}")
+                finally:
+                    worker.lock.release()
+
+    def _shutdown(self) -> None:
+        for worker in self._workers:
+            if worker.conn is not None:
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(timeout=1.0)
+                if worker.process.is_alive():
+                    worker.process.kill()
+            if worker.conn is not None:
+                worker.conn.close()
+        if self._slots is not None:
+            self._slots.close()
+            self._slots = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._slots is None:
+                return
+            self._stopped.set()
+            for worker in self._workers:
+                worker.lock.acquire()
+            try:
+                self._shutdown()
+            finally:
+                for worker in self._workers:
+                    worker.lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "alive": sum(1 for w in self._workers if w.ready and w.process.is_alive()),
+            "restarting": sum(1 for w in self._workers if not w.ready),
+            "batches": [w.batches for w in self._workers],
+            "restarts": sum(w.restarts for w in self._workers),
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            **summarize({"round_trip": self.round_trip}),
+        }
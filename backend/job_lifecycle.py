@@ -0,0 +1,370 @@
+"""
+Event-driven lifetime of an agent job.
+
+The entrypoint used to keep a job alive with a one-second sleep loop and only
+cleaned up when LiveKit cancelled it, so a session whose caller had hung up
+kept its STT / TTS websockets open until the job was torn down.
+``JobLifetime`` resolves as soon as one of these happens:
+
+- the last remote participant leaves the room (once one has joined)
+- the room disconnects
+- the agent session closes, e.g. after an unrecoverable provider error
+- nothing has happened in the session for ``AGENT_IDLE_TIMEOUT`` seconds
+
+and the entrypoint then closes the session and its provider clients.
+
+``SessionTracker`` records each session's progress through that teardown
+in ``sessions-<worker>-<job>.json`` in ``AGENT_STATS_DIR``. Job processes
+exit right after teardown, so the counting happens in the worker:
+``SessionTotals`` folds finished sessions into totals that live as long as
+the worker. Sessions still closing after ``AGENT_LINGER_SECONDS`` count as
+lingering; closed sessions whose ``AgentSession`` is still referenced that
+long after closing count as leaked. Each worker writes one
+``lifecycle-<worker>.json``, summed under ``session_lifecycle`` in
+``/api/agent/stats``.
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import time
+import weakref
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from latency_metrics import METRICS_RETENTION, WORKER_ID_ENV, Histogram, summarize
+from worker_load import STATS_DIR, prune_stats_dir, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Session events that show the call is still going; the user going "away" does not
+ACTIVITY_EVENTS = ("user_input_transcribed", "user_state_changed", "agent_state_changed",
+                   "conversation_item_added")
+
+
+class JobLifetime:
+    """Resolves with the reason a job's session should end"""
+
+    def __init__(self, room, session, idle_timeout: float = 300.0) -> None:
+        self.room = room
+        self.session = session
+        self.idle_timeout = idle_timeout
+        self.reason: Optional[str] = None
+        self._ended = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._last_activity = self._loop.time()
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._seen_participant = bool(room.remote_participants)
+        self._handlers: List[Tuple[Any, str, Callable]] = []
+
+    @classmethod
+    def from_env(cls, room, session) -> "JobLifetime":
+        return cls(room, session, idle_timeout=float(os.getenv("AGENT_IDLE_TIMEOUT", "300")))
+
+    def start(self) -> "JobLifetime":
+        self._listen(self.room, "participant_connected", self._on_participant_connected)
+        self._listen(self.room, "participant_disconnected", self._on_participant_disconnected)
+        self._listen(self.room, "disconnected", lambda *_: self.end("room disconnected"))
+        self._listen(self.session, "close", lambda *_: self.end("session closed"))
+        for event in ACTIVITY_EVENTS:
+            self._listen(self.session, event, self._on_activity)
+        if self.idle_timeout > 0:
+            self._idle_handle = self._loop.call_later(self.idle_timeout, self._check_idle)
+        return self
+
+    def _listen(self, emitter, event: str, handler: Callable) -> None:
+        emitter.on(event, handler)
+        self._handlers.append((emitter, event, handler))
+
+    def _on_participant_connected(self, participant) -> None:
+        self._seen_participant = True
+
+    def _on_participant_disconnected(self, participant) -> None:
+        if self._seen_participant and not self.room.remote_participants:
+            self.end("participant disconnected")
+
+    def _on_activity(self, ev=None) -> None:
+        if getattr(ev, "new_state", None) != "away":
+            self._last_activity = self._loop.time()
+
+    def _check_idle(self) -> None:
+        # Re-armed for the remaining time instead of polling
+        idle_for = self._loop.time() - self._last_activity
+        if idle_for >= self.idle_timeout:
+            self.end("idle timeout")
+        else:
+            self._idle_handle = self._loop.call_later(self.idle_timeout - idle_for, self._check_idle)
+
+    def end(self, reason: str) -> None:
+        """End the job now; the first reason given wins"""
+        if self.reason is None:
+            self.reason = reason
+            self._ended.set()
+
+    async def wait(self) -> str:
+        try:
+            await self._ended.wait()
+        finally:
+            self.close()
+        return self.reason
+
+    def close(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        for emitter, event, handler in self._handlers:
+            try:
+                emitter.off(event, handler)
+            except Exception:
+                pass
+        self._handlers = []
+
+
+def _pid_alive(pid: Any) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (ProcessLookupError, TypeError, ValueError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SessionTracker:
+    """Writes the state of each session in this process for the worker to fold"""
+
+    def __init__(self, linger_seconds: float = 10.0, stats_dir: str = STATS_DIR,
+                 worker_id: Optional[str] = None, refresh_every: float = 30.0) -> None:
+        self.linger_seconds = linger_seconds
+        self.stats_dir = stats_dir
+        self.worker_id = worker_id or os.getenv(WORKER_ID_ENV) or str(os.getppid())
+        self.refresh_every = refresh_every
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Job -> weakref to its closed AgentSession, until the leak check has run
+        self._closed: Dict[str, Any] = {}
+        self._last_gc = 0.0
+        self._refresh: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_env(cls) -> "SessionTracker":
+        return cls(linger_seconds=float(os.getenv("AGENT_LINGER_SECONDS", "10")))
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.stats_dir, f"sessions-{self.worker_id}-{job_id}.json")
+
+    def started(self, job_id: str) -> None:
+        self._jobs[job_id] = {"job_id": job_id, "pid": os.getpid(), "state": "active", "started_ts": time.time()}
+        self._write(job_id)
+
+    def ending(self, job_id: str, reason: str) -> None:
+        job = self._jobs.setdefault(job_id, {"job_id": job_id, "pid": os.getpid()})
+        job.update(state="closing", reason=reason, closing_ts=time.time())
+        self._write(job_id)
+
+    def closed(self, job_id: str, session) -> None:
+        job = self._jobs.setdefault(job_id, {"job_id": job_id, "pid": os.getpid()})
+        now = time.time()
+        job.update(state="closed", closed_ts=now)
+        if "closing_ts" in job:
+            job["teardown_s"] = now - job["closing_ts"]
+        try:
+            self._closed[job_id] = weakref.ref(session)
+        except TypeError:
+            job["leaked"] = False
+        self._write(job_id)
+        try:
+            # A job process that is still running then records whether the session was freed
+            asyncio.get_running_loop().call_later(self.linger_seconds, self.check_leak, job_id)
+        except RuntimeError:
+            pass
+
+    def leaked(self, job_id: str) -> Optional[bool]:
+        """Whether a session closed here is still referenced; None if unknown"""
+        ref = self._closed.get(job_id)
+        if ref is None:
+            return None
+        if ref() is not None and time.monotonic() - self._last_gc >= 30.0:
+            # Sessions kept alive only by reference cycles are not leaks
+            self._last_gc = time.monotonic()
+            gc.collect()
+        return ref() is not None
+
+    def check_leak(self, job_id: str) -> None:
+        job = self._jobs.get(job_id)
+        leaked = self.leaked(job_id)
+        if job is None or leaked is None:
+            return
+        job["leaked"] = leaked
+        self._write(job_id)
+        self.forget(job_id)
+
+    def forget(self, job_id: str) -> None:
+        """Drop a job the worker has folded"""
+        self._jobs.pop(job_id, None)
+        self._closed.pop(job_id, None)
+
+    def _write(self, job_id: str) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        try:
+            write_json_atomic(self._path(job_id), {"worker": self.worker_id, "ts": time.time(), **job})
+        except OSError as e:
+            logger.debug(f"Could not publish session state: {e}")
+        self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        # Long calls rewrite their file so it is never pruned as abandoned
+        if self._refresh is not None:
+            self._refresh.cancel()
+            self._refresh = None
+        if any(job["state"] != "closed" for job in self._jobs.values()):
+            try:
+                self._refresh = asyncio.get_running_loop().call_later(self.refresh_every, self._refresh_all)
+            except RuntimeError:
+                pass
+
+    def _refresh_all(self) -> None:
+        self._refresh = None
+        for job_id, job in list(self._jobs.items()):
+            if job["state"] != "closed":
+                self._write(job_id)
+
+
+_tracker: Optional[SessionTracker] = None
+
+
+def get_session_tracker() -> SessionTracker:
+    """Return the process-wide tracker, creating it on first use"""
+    global _tracker
+    if _tracker is None:
+        _tracker = SessionTracker.from_env()
+    return _tracker
+
+
+class SessionTotals:
+    """Session lifecycle of a worker's jobs, folded and kept in the worker process
+
+    Passed to ``WorkerLoadMonitor.add_collector``. Each run reads this
+    worker's ``sessions-<worker>-<job>.json`` files, counts the sessions still
+    active or closing, and folds finished ones into cumulative totals: end
+    reasons, teardown time, lingered and leaked sessions. A folded job's file
+    is deleted, so the directory only holds live sessions. The result is
+    written to ``lifecycle-<worker>.json`` for ``/api/agent/stats``.
+
+    A closed session is folded once its job has checked for a leak, once the
+    job process has exited (which frees the session), or, for jobs run as
+    threads of this process, ``linger_seconds`` after it closed.
+    """
+
+    def __init__(self, worker_id: str, linger_seconds: float = 10.0,
+                 stats_dir: str = STATS_DIR, tracker: Optional[SessionTracker] = None) -> None:
+        self.worker_id = worker_id
+        self.linger_seconds = linger_seconds
+        self.stats_dir = stats_dir
+        self._tracker = tracker
+        self.end_reasons: Counter = Counter()
+        self.teardown = Histogram()
+        self.sessions = 0
+        self.lingered = 0
+        self.leaked = 0
+
+    @classmethod
+    def from_env(cls, worker_id: str) -> "SessionTotals":
+        return cls(worker_id, linger_seconds=float(os.getenv("AGENT_LINGER_SECONDS", "10")))
+
+    def _fold(self, job: Dict[str, Any], now: float, leaked: bool = False) -> None:
+        self.sessions += 1
+        self.end_reasons[job.get("reason") or "process exited"] += 1
+        if "teardown_s" in job:
+            self.teardown.observe(job["teardown_s"])
+            lingered = job["teardown_s"] >= self.linger_seconds
+        else:
+            # The job process exited before its session finished closing
+            lingered = now - job.get("closing_ts", now) >= self.linger_seconds
+        self.lingered += int(lingered)
+        self.leaked += int(leaked)
+
+    def _closed_leak(self, job: Dict[str, Any], now: float) -> Optional[bool]:
+        """Leak verdict for a closed session, or None while it is still pending"""
+        if "leaked" in job:
+            return bool(job["leaked"])
+        pid = job.get("pid")
+        if pid != os.getpid():
+            return None if _pid_alive(pid) else False
+        if now - job.get("closed_ts", now) < self.linger_seconds:
+            return None
+        # A job thread of this process: its loop is gone, so check from here
+        tracker = self._tracker or get_session_tracker()
+        leaked = bool(tracker.leaked(job["job_id"]))
+        tracker.forget(job["job_id"])
+        return leaked
+
+    def fold(self) -> Dict[str, Any]:
+        """Fold finished sessions and rewrite this worker's lifecycle file"""
+        prefix = f"sessions-{self.worker_id}-"
+        now = time.time()
+        gauges = {"active": 0, "closing": 0, "lingering": 0}
+        names = os.listdir(self.stats_dir) if os.path.isdir(self.stats_dir) else []
+        for name in names:
+            if not name.startswith(prefix) or not name.endswith(".json"):
+                continue
+            path = os.path.join(self.stats_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            state = job.get("state")
+            if state == "closed":
+                leaked = self._closed_leak(job, now)
+                if leaked is None:
+                    continue
+                self._fold(job, now, leaked)
+            elif job.get("pid") == os.getpid() or _pid_alive(job.get("pid")):
+                gauges[state if state in gauges else "active"] += 1
+                if state == "closing" and now - job.get("closing_ts", now) >= self.linger_seconds:
+                    gauges["lingering"] += 1
+                continue
+            else:
+                self._fold(job, now)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        stats = {
+            "worker": self.worker_id,
+            "ts": now,
+            **gauges,
+            "sessions": self.sessions,
+            "lingered": self.lingered,
+            "leaked": self.leaked,
+            "end_reasons": dict(self.end_reasons),
+            **summarize({"teardown": self.teardown}),
+        }
+        try:
+            write_json_atomic(os.path.join(self.stats_dir, f"lifecycle-{self.worker_id}.json"), stats)
+            # Files of workers that are gone, e.g. after a crash
+            prune_stats_dir(self.stats_dir, "sessions-", METRICS_RETENTION)
+            prune_stats_dir(self.stats_dir, "lifecycle-", METRICS_RETENTION)
+        except OSError as e:
+            logger.debug(f"Could not write session lifecycle: {e}")
+        return stats
+
+
+async def close_providers(*providers) -> int:
+    """Close a finished session's STT / LLM / TTS clients; returns how many closed"""
+    closed = 0
+    for provider in providers:
+        aclose = getattr(provider, "aclose", None)
+        if aclose is None:
+            continue
+        try:
+            await aclose()
+            closed += 1
+        except Exception as e:
+            logger.warning(f"Closing {type(provider).__name__} failed: {e}")
+    return closed
@@ -0,0 +1,340 @@
+"""
+Per-turn latency instrumentation for the STT -> LLM -> TTS pipeline.
+
+``TurnTracer`` listens to AgentSession events and records, for every user
+turn, the delay of each pipeline stage. Three are measured from the end of
+user speech, the LLM and TTS spans from their own request:
+
+- ``eou_delay``      end of speech -> end-of-utterance decision
+- ``stt_final``      end of speech -> final transcript
+- ``llm_ttft``       LLM request -> first token
+- ``tts_ttfb``       TTS request -> first audio byte
+- ``playout_start``  end of speech -> agent starts speaking
+
+LLM requests that are not a turn's reply (context summaries, speculative
+requests) report through the same metrics event. The agent marks them with
+``ignore_llm_request`` and they are left out of ``llm_ttft``.
+
+Stage samples feed fixed-bucket histograms. Each job publishes its histogram
+snapshot to ``AGENT_STATS_DIR`` as ``metrics-<worker>-<job>.json``. The
+worker process folds finished jobs into its running totals
+(``LatencyTotals``, ``metrics-<worker>-total.json``), so the exported counters
+only ever grow while the worker lives. The API merges totals and live jobs per
+worker and exports them as Prometheus text or p50/p95/p99 JSON. The full
+per-turn trace of a session is dumped as JSON when the session ends.
+"""
+
+import bisect
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from worker_load import STATS_DIR, prune_stats_dir, read_stats_dir, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("eou_delay", "stt_final", "llm_ttft", "tts_ttfb", "playout_start")
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+TRACE_DIR = os.getenv("AGENT_TRACE_DIR", os.path.join(STATS_DIR, "traces"))
+METRICS_RETENTION = float(os.getenv("AGENT_METRICS_RETENTION", "3600"))
+# Set by the worker process so every job labels its metrics with the same worker
+WORKER_ID_ENV = "AGENT_WORKER_ID"
+# Folded job files stay this long so a reader never sees a job in neither place
+FOLDED_GRACE = 30.0
+
+
+class Histogram:
+    """Cumulative-bucket histogram compatible with the Prometheus data model"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, value in enumerate(self.counts):
+            if seen + value >= rank and value:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / value
+            seen += value
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Histogram":
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.sum = data["sum"]
+        histogram.count = data["count"]
+        return histogram
+
+
+class TurnTracer:
+    """Collects per-turn stage latencies for one agent session"""
+
+    def __init__(self, session_id: str, worker_id: Optional[str] = None,
+                 job_id: Optional[str] = None) -> None:
+        self.session_id = session_id
+        self.worker_id = worker_id or os.getenv(WORKER_ID_ENV) or str(os.getppid())
+        self.job_id = job_id or session_id
+        self.histograms: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self.turns: List[Dict[str, Any]] = []
+        self._current: Optional[Dict[str, Any]] = None
+        self._by_speech_id: Dict[str, Dict[str, Any]] = {}
+        self._ignored_requests: Set[str] = set()
+        self.ignored_llm_requests = 0
+        self._started = time.time()
+
+    # Recording ---------------------------------------------------------
+
+    def _new_turn(self, end_of_speech: Optional[float]) -> Dict[str, Any]:
+        turn = {"index": len(self.turns), "end_of_speech": end_of_speech, "speech_id": None, "spans": {}}
+        self.turns.append(turn)
+        return turn
+
+    def _turn_for(self, speech_id: Optional[str]) -> Dict[str, Any]:
+        if speech_id and speech_id in self._by_speech_id:
+            return self._by_speech_id[speech_id]
+        turn = self._current
+        if turn is None or (speech_id and turn["speech_id"] not in (None, speech_id)):
+            # Agent-initiated speech (e.g. the greeting) has no user turn
+            turn = self._new_turn(None)
+        if speech_id:
+            turn["speech_id"] = speech_id
+            self._by_speech_id[speech_id] = turn
+        return turn
+
+    def record(self, stage: str, seconds: float, speech_id: Optional[str] = None) -> None:
+        if seconds is None or seconds < 0:
+            return
+        turn = self._turn_for(speech_id)
+        if stage in turn["spans"]:
+            return
+        turn["spans"][stage] = round(seconds, 4)
+        self.histograms[stage].observe(seconds)
+
+    def on_user_speech_end(self, now: Optional[float] = None) -> None:
+        self._current = self._new_turn(now if now is not None else time.time())
+
+    def on_agent_speaking(self, now: Optional[float] = None) -> None:
+        turn = self._current
+        if turn is None or turn["end_of_speech"] is None or "playout_start" in turn["spans"]:
+            return
+        now = now if now is not None else time.time()
+        self.record("playout_start", now - turn["end_of_speech"], turn["speech_id"])
+
+    def ignore_llm_request(self, request_id: Optional[str]) -> None:
+        """Keep the metrics of a background LLM request out of the turn spans"""
+        if request_id:
+            self._ignored_requests.add(request_id)
+
+    def on_metrics(self, metrics) -> None:
+        kind = getattr(metrics, "type", None)
+        speech_id = getattr(metrics, "speech_id", None)
+        if kind == "eou_metrics":
+            self.record("eou_delay", metrics.end_of_utterance_delay, speech_id)
+            self.record("stt_final", metrics.transcription_delay, speech_id)
+        elif kind == "llm_metrics":
+            request_id = getattr(metrics, "request_id", None)
+            if request_id in self._ignored_requests:
+                self._ignored_requests.discard(request_id)
+                self.ignored_llm_requests += 1
+                return
+            self.record("llm_ttft", metrics.ttft, speech_id)
+        elif kind == "tts_metrics":
+            self.record("tts_ttfb", metrics.ttfb, speech_id)
+
+    def attach(self, session) -> "TurnTracer":
+        """Subscribe to an AgentSession's state and metrics events"""
+
+        @session.on("user_state_changed")
+        def _on_user_state(ev):
+            if ev.old_state == "speaking" and ev.new_state != "speaking":
+                self.on_user_speech_end()
+
+        @session.on("agent_state_changed")
+        def _on_agent_state(ev):
+            if ev.new_state == "speaking":
+                self.on_agent_speaking()
+
+        @session.on("metrics_collected")
+        def _on_metrics(ev):
+            self.on_metrics(ev.metrics)
+
+        return self
+
+    # Export ------------------------------------------------------------
+
+    def snapshot(self, final: bool = False) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "ts": time.time(),
+            "final": final,
+            "histograms": {stage: h.to_dict() for stage, h in self.histograms.items()},
+        }
+
+    def publish(self, stats_dir: str = STATS_DIR, final: bool = False) -> None:
+        """Write this job's histogram snapshot; ``final`` once the session has ended"""
+        path = os.path.join(stats_dir, f"metrics-{self.worker_id}-{self.job_id}.json")
+        try:
+            write_json_atomic(path, self.snapshot(final))
+            prune_stats_dir(stats_dir, "metrics-", METRICS_RETENTION)
+        except OSError as e:
+            logger.debug(f"Could not publish latency metrics: {e}")
+
+    def dump_trace(self, trace_dir: str = TRACE_DIR) -> Optional[str]:
+        """Write the per-turn trace of this session for offline analysis"""
+        path = os.path.join(trace_dir, f"session-{self.session_id}-{int(self._started)}.json")
+        try:
+            write_json_atomic(path, {
+                "session_id": self.session_id,
+                "worker": self.worker_id,
+                "started_at": self._started,
+                "ended_at": time.time(),
+                "turns": self.turns,
+                "ignored_llm_requests": self.ignored_llm_requests,
+                "summary": summarize(self.histograms),
+            })
+        except OSError as e:
+            logger.warning(f"Could not write session trace: {e}")
+            return None
+        logger.info(f"Wrote latency trace for {len(self.turns)} turns to {path}")
+        return path
+
+
+class LatencyTotals:
+    """Cumulative histograms of a worker's finished jobs, kept in the worker process
+
+    ``fold`` moves each finished (or long-silent) job's snapshot into the
+    totals and rewrites ``metrics-<worker>-total.json``, which lists the jobs
+    it includes. Readers skip those jobs' own files, which are deleted
+    ``FOLDED_GRACE`` seconds later.
+    """
+
+    def __init__(self, worker_id: str, stats_dir: str = STATS_DIR,
+                 abandoned_after: float = 300.0, refresh_every: float = 60.0) -> None:
+        self.worker_id = worker_id
+        self.stats_dir = stats_dir
+        self.abandoned_after = abandoned_after
+        self.refresh_every = refresh_every
+        self.histograms: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self.folded: Dict[str, float] = {}
+        self._written = 0.0
+
+    def fold(self) -> int:
+        """Fold finished jobs into the totals; returns how many were added"""
+        if not os.path.isdir(self.stats_dir):
+            return 0
+        now = time.time()
+        prefix = f"metrics-{self.worker_id}-"
+        added = 0
+        for name in os.listdir(self.stats_dir):
+            if not name.startswith(prefix) or not name.endswith(".json") or name == f"{prefix}total.json":
+                continue
+            path = os.path.join(self.stats_dir, name)
+            job_id = name[len(prefix):-len(".json")]
+            if job_id in self.folded:
+                if now - self.folded[job_id] >= FOLDED_GRACE:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    del self.folded[job_id]
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get("final") or now - snapshot.get("ts", 0) >= self.abandoned_after:
+                for stage, data in snapshot["histograms"].items():
+                    if stage in self.histograms:
+                        self.histograms[stage].merge(Histogram.from_dict(data))
+                self.folded[job_id] = now
+                added += 1
+        if added or now - self._written >= self.refresh_every:
+            self._written = now
+            write_json_atomic(os.path.join(self.stats_dir, f"{prefix}total.json"), {
+                "worker": self.worker_id,
+                "total": True,
+                "ts": now,
+                "folded": sorted(self.folded),
+                "histograms": {stage: h.to_dict() for stage, h in self.histograms.items()},
+            })
+        return added
+
+
+def summarize(histograms: Dict[str, Histogram]) -> Dict[str, Dict[str, float]]:
+    return {
+        stage: {
+            "count": h.count,
+            "p50_ms": round(h.quantile(0.5) * 1000, 1),
+            "p95_ms": round(h.quantile(0.95) * 1000, 1),
+            "p99_ms": round(h.quantile(0.99) * 1000, 1),
+        }
+        for stage, h in histograms.items()
+    }
+
+
+def worker_histograms(stats_dir: str = STATS_DIR) -> Dict[str, Dict[str, Histogram]]:
+    """Merge each worker's totals and its live job snapshots"""
+    snapshots = read_stats_dir(stats_dir, prefix="metrics-", max_age=METRICS_RETENTION)
+    folded = {(snapshot["worker"], job_id) for snapshot in snapshots if snapshot.get("total")
+              for job_id in snapshot.get("folded", ())}
+    merged: Dict[str, Dict[str, Histogram]] = {}
+    for snapshot in snapshots:
+        if (snapshot["worker"], snapshot.get("job_id")) in folded:
+            continue
+        worker = merged.setdefault(snapshot["worker"], {stage: Histogram() for stage in STAGES})
+        for stage, data in snapshot["histograms"].items():
+            if stage in worker:
+                worker[stage].merge(Histogram.from_dict(data))
+    return merged
+
+
+def latency_summary(stats_dir: str = STATS_DIR) -> Dict[str, Any]:
+    return {worker: summarize(histograms) for worker, histograms in worker_histograms(stats_dir).items()}
+
+
+def prometheus_text(stats_dir: str = STATS_DIR) -> str:
+    """Render merged worker histograms in the Prometheus text exposition format"""
+    name = "voice_turn_latency_seconds"
+    lines = [
+        f"# HELP {name} Per-turn voice pipeline latency by stage",
+        f"# TYPE {name} histogram",
+    ]
+    for worker, histograms in sorted(worker_histograms(stats_dir).items()):
+        for stage, h in histograms.items():
+            labels = f'worker="{worker}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,170 @@
+"""
+Pluggable LLM backends for the text API.
+
+``TRAVEL_LLM_BACKEND`` selects the implementation: ``stub`` (default) is a
+local deterministic backend that needs no network or keys, ``gemini`` calls
+Google Gemini through ``google-generativeai``.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from agent_registry import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Gemini refuses explicit caches below a minimum size; smaller system prompts
+# are sent as ``system_instruction`` on a model built once per process
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+
+
+class LLMBackend:
+    """Interface every text generation backend implements"""
+
+    name = "base"
+
+    async def generate(self, prompt: str, context: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the answer in pieces; backends without streaming yield it whole"""
+        yield await self.generate(prompt, context)
+
+
+class StubLLMBackend(LLMBackend):
+    """Deterministic offline backend with an optional simulated latency"""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0) -> None:
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+        self.tokens_streamed = 0
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        return (
+            f"I understand you're asking about: {prompt}. "
+            "I'll help you with that as a business travel assistant."
+        )
+
+    async def generate(self, prompt: str, context: Dict[str, Any]) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def stream(self, prompt: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        words = self._answer(prompt).split(" ")
+        for index, word in enumerate(words):
+            if index and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            self.tokens_streamed += 1
+            yield word if index == 0 else f" {word}"
+
+
+class GeminiLLMBackend(LLMBackend):
+    """Google Gemini backend; the SDK is imported on first use"""
+
+    name = "gemini"
+
+    def __init__(self, model: str = "gemini-2.0-flash-exp", system_prompt: Optional[str] = None) -> None:
+        self.model_name = model
+        self.system_prompt = system_prompt
+        self.cached_content = None
+        self._model = None
+        self._model_expires_at: Optional[float] = None
+        self._model_lock = asyncio.Lock()
+
+    def _model_stale(self) -> bool:
+        return self._model is None or bool(self._model_expires_at and time.time() >= self._model_expires_at)
+
+    async def _get_model(self):
+        if self._model_stale():
+            async with self._model_lock:
+                if self._model_stale():
+                    # The SDK import and the cache creation are blocking calls
+                    self._model = await asyncio.to_thread(self._build_model)
+        return self._model
+
+    def _build_model(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        return self._cached_model(genai) or genai.GenerativeModel(
+            self.model_name, system_instruction=self.system_prompt
+        )
+
+    def _cached_model(self, genai):
+        """Model bound to an explicit context cache holding the system prompt"""
+        self._model_expires_at = None
+        if not self.system_prompt or estimate_tokens(self.system_prompt) < GEMINI_CACHE_MIN_TOKENS:
+            # Gemini rejects caches this small; the travel prompt is well below the minimum
+            return None
+        try:
+            from google.generativeai import caching
+
+            self.cached_content = caching.CachedContent.create(
+                model=f"models/{self.model_name}",
+                system_instruction=self.system_prompt,
+                ttl=datetime.timedelta(seconds=GEMINI_CACHE_TTL),
+            )
+        except Exception as e:
+            logger.warning(f"Gemini context cache unavailable, sending system prompt per request: {e}")
+            return None
+        # Rebuild shortly before the cache expires server-side
+        self._model_expires_at = time.time() + max(GEMINI_CACHE_TTL - 60, GEMINI_CACHE_TTL / 2)
+        logger.info(f"Created Gemini context cache {self.cached_content.name} for the system prompt")
+        return genai.GenerativeModel.from_cached_content(cached_content=self.cached_content)
+
+    @staticmethod
+    def _build_prompt(prompt: str, context: Dict[str, Any]) -> str:
+        if not context:
+            return prompt
+        return f"Traveler context: {json.dumps(context, sort_keys=True, default=str)}\n\n{prompt}"
+
+    async def generate(self, prompt: str, context: Dict[str, Any]) -> str:
+        model = await self._get_model()
+        response = await model.generate_content_async(self._build_prompt(prompt, context))
+        return response.text
+
+    async def stream(self, prompt: str, context: Dict[str, Any]) -> AsyncIterator[str]:
+        model = await self._get_model()
+        response = await model.generate_content_async(
+            self._build_prompt(prompt, context), stream=True
+        )
+        try:
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            # Closing the iterator drops the HTTP stream so Gemini stops generating
+            aclose = getattr(response, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+def get_llm_backend(system_prompt: Optional[str] = None) -> LLMBackend:
+    """Build the backend selected by ``TRAVEL_LLM_BACKEND``"""
+    name = os.getenv("TRAVEL_LLM_BACKEND", "stub").lower()
+    if name == "gemini":
+        return GeminiLLMBackend(
+            model=os.getenv("TRAVEL_LLM_MODEL", "gemini-2.0-flash-exp"),
+            system_prompt=system_prompt,
+        )
+    if name != "stub":
+        logger.warning(f"Unknown TRAVEL_LLM_BACKEND '{name}', using stub backend")
+    return StubLLMBackend(
+        latency=float(os.getenv("TRAVEL_LLM_STUB_LATENCY", "0")),
+        token_delay=float(os.getenv("TRAVEL_LLM_STUB_TOKEN_DELAY", "0")),
+    )
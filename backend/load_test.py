@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Offline load-test harness for the Business Travel Assistant backend.
+
+Simulates N concurrent callers without LiveKit Cloud or provider keys:
+
+- HTTP users drive /api/token, /session/* and /travel/query, either against a
+  running server (--target) or in-process through the ASGI app
+- voice sessions push recorded PCM through the agent's own pipeline stages
+  (audio ingest, batched VAD, the LLM cache with the agent's
+  ``agent_turn_cacheable`` rule over a chat context, the sentence-chunked TTS
+  pipeline and phrase cache) with fake providers, spread over
+  --voice-workers processes
+
+The voice side does not run the LiveKit entrypoint, AgentSession, turn
+detection or the provider network calls: STT finalization, end of utterance,
+LLM and TTS latencies are the simulated delays given on the command line, and
+the VAD runner is ``FakeVADRunner``, not the silero model. Its numbers measure
+this process's per-session overhead around those stages, not end-to-end
+agent latency.
+
+Reports throughput, latency percentiles per endpoint and per pipeline stage,
+and peak memory per voice worker process.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from model_pool import percentile
+
+
+def start_offsets(users: int, profile: str, ramp: float, step_users: int, step_interval: float) -> List[float]:
+    """Seconds after test start at which each simulated user begins"""
+    if profile == "linear" and users > 1:
+        return [ramp * i / (users - 1) for i in range(users)]
+    if profile == "step":
+        return [(i // max(1, step_users)) * step_interval for i in range(users)]
+    return [0.0] * users
+
+
+class Recorder:
+    """Latency samples and error counts keyed by operation name"""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def timed(self, name: str, request, require: str = ""):
+        """Await a request; failures, and bodies without ``require``, count as errors"""
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        if require:
+            try:
+                ok = bool(response.json().get(require))
+            except (ValueError, AttributeError):
+                ok = False
+            if not ok:
+                # e.g. /api/token answers 200 with {"error": ...} when LiveKit is not configured
+                self.errors[name] += 1
+                return None
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        total = sum(len(samples) for samples in self.latencies.values())
+        routes = {}
+        for name, samples in sorted(self.latencies.items()):
+            routes[name] = {
+                "requests": len(samples),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            }
+        return {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+# HTTP users ------------------------------------------------------------
+
+def make_client(target: str):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("The load test needs httpx: pip install httpx")
+    if target:
+        return httpx.AsyncClient(base_url=target, timeout=30.0)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=30.0)
+
+
+async def http_user(client, index: int, delay: float, queries: int, recorder: Recorder) -> None:
+    from fake_plugins import DEFAULT_TRANSCRIPTS
+
+    await asyncio.sleep(delay)
+    user_id = f"load-{index}"
+    await recorder.timed("GET /api/token", client.get("/api/token"), require="token")
+
+    response = await recorder.timed("POST /session/start", client.post(
+        "/session/start", json={"user_id": user_id, "preferences": {"class": "business"}}))
+    session = response.json() if response is not None else {}
+    for turn in range(queries):
+        query = DEFAULT_TRANSCRIPTS[(index + turn) % len(DEFAULT_TRANSCRIPTS)]
+        await recorder.timed("POST /travel/query", client.post(
+            "/travel/query", json={"query": query, "context": {}}))
+    if session.get("session_token"):
+        await recorder.timed("POST /session/end", client.post(
+            "/session/end", json={"session_id": session["session_id"]},
+            headers={"X-Session-Token": session["session_token"]}))
+
+
+async def run_http(args) -> Dict[str, Any]:
+    recorder = Recorder()
+    offsets = start_offsets(args.users, args.profile, args.ramp, args.step_users, args.step_interval)
+    async with make_client(args.target) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(http_user(client, i, offset, args.queries, recorder)
+                               for i, offset in enumerate(offsets)))
+        elapsed = time.perf_counter() - start
+    return recorder.summary(elapsed)
+
+
+# Voice sessions --------------------------------------------------------
+
+async def _vad_windows(ingest, scheduler, state, frame, pending: int) -> int:
+    """Run every complete VAD window the ingest ring holds through the batch scheduler"""
+    from inference_batcher import VAD_WINDOW
+
+    pending += frame.samples_per_channel
+    while pending >= VAD_WINDOW:
+        # The ring ends at the newest sample: the oldest unread window starts ``pending`` back
+        await scheduler.infer("vad", (state, ingest.ring.latest(pending)[:VAD_WINDOW]))
+        pending -= VAD_WINDOW
+    return pending
+
+
+async def voice_session(index: int, delay: float, args, providers: Dict[str, Any], worker: int):
+    from audio_ingest import AudioIngest
+    from greeting_cache import GREETING_TEXT
+    from inference_batcher import VADState
+    from latency_metrics import TurnTracer
+    from response_cache import agent_turn_cacheable
+    from tts_pipeline import TTSPipeline
+
+    await asyncio.sleep(delay)
+    tracer = TurnTracer(f"loadtest-{index}", worker_id=str(worker))
+    stt, llm, tts = providers["stt"], providers["llm"], providers["tts"]
+    cache, greetings, scheduler = providers["cache"], providers["greetings"], providers["scheduler"]
+    # One ingest per session, shared by the VAD and the STT as in the agent
+    ingest = AudioIngest(consumers=2)
+    vad_state = VADState()
+    # The conversation as the agent's llm_node would see it
+    chat_ctx = SimpleNamespace(items=[])
+
+    greeting = await greetings.get_or_synthesize(tts, GREETING_TEXT, "fake", "fake")
+    if args.realtime:
+        await asyncio.sleep(greeting.duration)
+
+    for turn in range(args.turns):
+        pending = 0
+        async for frame in stt.frames(turn):
+            vad_frame = ingest.process(frame)
+            ingest.process(frame)
+            pending = await _vad_windows(ingest, scheduler, vad_state, vad_frame, pending)
+        end_of_speech = time.time()
+        tracer.on_user_speech_end(end_of_speech)
+        await asyncio.sleep(args.eou_delay)
+        tracer.record("eou_delay", time.time() - end_of_speech)
+        text = await stt.final_transcript(turn)
+        tracer.record("stt_final", time.time() - end_of_speech)
+
+        # Same rule as the agent's llm_node: only opening questions are shared
+        chat_ctx.items.append(SimpleNamespace(type="message", role="user", text_content=text))
+        llm_start = time.perf_counter()
+        cacheable = agent_turn_cacheable(chat_ctx, args.cache_min_words)
+        cached = cache.get(text) if cacheable else None
+        first_text: List[float] = []
+
+        def on_first_text() -> None:
+            first_text.append(time.perf_counter())
+            tracer.record("llm_ttft", first_text[0] - llm_start)
+
+        async def reply_text():
+            parts = []
+            if cached is not None:
+                on_first_text()
+                parts.append(cached)
+                yield cached
+            else:
+                async for token in llm.stream(text, {}):
+                    if not parts:
+                        on_first_text()
+                    parts.append(token)
+                    yield token
+                if cacheable and parts:
+                    cache.put(text, "".join(parts))
+            chat_ctx.items.append(SimpleNamespace(type="message", role="assistant", text_content="".join(parts)))
+
+        # Same path as the agent's tts_node: sentence chunks through the phrase cache
+        pipeline = TTSPipeline.from_env(providers["phrases"].synthesize, providers["tts_stats"])
+        audio_seconds = 0.0
+        async with contextlib.aclosing(pipeline.run(reply_text())) as frames:
+            async for frame in frames:
+                if not audio_seconds:
+                    tracer.record("tts_ttfb", time.perf_counter() - first_text[0])
+                    tracer.on_agent_speaking()
+                audio_seconds += frame.samples_per_channel / frame.sample_rate
+        if args.realtime:
+            await asyncio.sleep(audio_seconds)
+    return tracer, ingest.stats()
+
+
+async def run_voice_worker_async(worker: int, sessions: List[int], args) -> Dict[str, Any]:
+    from fake_plugins import FakeSTT, FakeTTS, FakeVADRunner, StubLLMBackend, load_pcm
+    from greeting_cache import GreetingCache
+    from inference_batcher import BatchScheduler
+    from latency_metrics import STAGES, Histogram
+    from phrase_cache import CachedTTS, PhraseCache
+    from response_cache import response_cache_from_env
+    from tts_pipeline import PipelineStats
+
+    pcm, sample_rate = load_pcm(args.pcm, sample_rate=args.input_rate, seconds=args.utterance_seconds)
+    tts = FakeTTS(first_byte_delay=args.tts_delay)
+    scheduler = BatchScheduler.from_env({"vad": FakeVADRunner()}).start()
+    providers = {
+        "stt": FakeSTT(pcm, sample_rate=sample_rate, realtime=args.realtime, final_delay=args.stt_delay),
+        "llm": StubLLMBackend(latency=args.llm_latency, token_delay=args.token_delay),
+        "tts": tts,
+        # The agent's process-wide caches, built the same way
+        "cache": response_cache_from_env(semantic=False),
+        "phrases": CachedTTS(tts, PhraseCache(cache_dir=None), "fake", "fake"),
+        "greetings": GreetingCache(cache_dir=None),
+        "scheduler": scheduler,
+        "tts_stats": PipelineStats(),
+    }
+    offsets = start_offsets(args.voice_sessions, args.profile, args.ramp, args.step_users, args.step_interval)
+
+    start = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(voice_session(i, offsets[i], args, providers, worker) for i in sessions))
+    finally:
+        scheduler.close()
+    elapsed = time.perf_counter() - start
+
+    histograms = {stage: Histogram() for stage in STAGES}
+    ingest_us = []
+    for tracer, ingest in results:
+        for stage, histogram in tracer.histograms.items():
+            histograms[stage].merge(histogram)
+        ingest_us.append(ingest["avg_us_per_frame"])
+
+    return {
+        "worker": worker,
+        "sessions": len(sessions),
+        "turns": len(sessions) * args.turns,
+        "elapsed_s": round(elapsed, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "histograms": {stage: h.to_dict() for stage, h in histograms.items()},
+        "llm_cache": providers["cache"].stats(),
+        "phrase_cache": providers["phrases"].cache.stats(),
+        "tts_pipeline": providers["tts_stats"].to_dict(),
+        "vad_batches": scheduler.stats(),
+        "ingest_avg_us_per_frame": round(sum(ingest_us) / len(ingest_us), 2) if ingest_us else 0.0,
+    }
+
+
+def run_voice_worker(worker: int, sessions: List[int], args) -> Dict[str, Any]:
+    return asyncio.run(run_voice_worker_async(worker, sessions, args))
+
+
+def run_voice(args) -> Dict[str, Any]:
+    from latency_metrics import STAGES, Histogram, summarize
+
+    shards = [list(range(w, args.voice_sessions, args.voice_workers)) for w in range(args.voice_workers)]
+    start = time.perf_counter()
+    if args.voice_workers == 1:
+        results = [run_voice_worker(0, shards[0], args)]
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.voice_workers) as pool:
+            results = pool.starmap(run_voice_worker, [(w, shard, args) for w, shard in enumerate(shards)])
+    elapsed = time.perf_counter() - start
+
+    merged = {stage: Histogram() for stage in STAGES}
+    for result in results:
+        for stage, data in result.pop("histograms").items():
+            merged[stage].merge(Histogram.from_dict(data))
+    turns = sum(result["turns"] for result in results)
+    return {
+        "sessions": args.voice_sessions,
+        "turns": turns,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(turns / elapsed, 1) if elapsed else 0.0,
+        "stages": summarize(merged),
+        "workers": results,
+    }
+
+
+# Reporting -------------------------------------------------------------
+
+def print_report(report: Dict[str, Any]) -> None:
+    http = report.get("http")
+    if http:
+        print("\n=== HTTP ===")
+        print(f"   {http['requests']} requests, {http['errors']} errors in {http['elapsed_s']}s "
+              f"({http['throughput_rps']} req/s)")
+        for name, route in http["routes"].items():
+            print(f"   {name:<26} n={route['requests']:<6} err={route['errors']:<4} "
+                  f"p50 {route['p50_ms']:>8.2f} ms  p95 {route['p95_ms']:>8.2f} ms  p99 {route['p99_ms']:>8.2f} ms")
+
+    voice = report.get("voice")
+    if voice:
+        print("\n=== Voice ===")
+        print(f"   {voice['sessions']} sessions, {voice['turns']} turns in {voice['elapsed_s']}s "
+              f"({voice['turns_per_s']} turns/s)")
+        for stage, summary in voice["stages"].items():
+            print(f"   {stage:<16} n={summary['count']:<6} p50 {summary['p50_ms']:>8.1f} ms  "
+                  f"p95 {summary['p95_ms']:>8.1f} ms  p99 {summary['p99_ms']:>8.1f} ms")
+        for worker in voice["workers"]:
+            print(f"   worker {worker['worker']}: {worker['sessions']} sessions, "
+                  f"peak RSS {worker['max_rss_mb']} MB, LLM cache hit rate {worker['llm_cache']['hit_rate']}, "
+                  f"VAD avg batch {worker['vad_batches']['avg_batch']}, "
+                  f"ingest {worker['ingest_avg_us_per_frame']} us/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the travel assistant backend")
+    parser.add_argument("--target", default="", help="Base URL of a running API; in-process ASGI app if empty")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent HTTP users")
+    parser.add_argument("--queries", type=int, default=3, help="/travel/query calls per HTTP user")
+    parser.add_argument("--voice-sessions", type=int, default=20, help="Concurrent simulated voice calls")
+    parser.add_argument("--voice-workers", type=int, default=1, help="Processes to spread voice calls over")
+    parser.add_argument("--turns", type=int, default=3, help="User turns per voice call")
+    parser.add_argument("--profile", choices=["constant", "linear", "step"], default="constant",
+                        help="How users are ramped up")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Linear ramp duration in seconds")
+    parser.add_argument("--step-users", type=int, default=10, help="Users added per step")
+    parser.add_argument("--step-interval", type=float, default=5.0, help="Seconds between steps")
+    parser.add_argument("--pcm", default=None, help="Mono 16-bit WAV recording fed to the fake STT")
+    parser.add_argument("--input-rate", type=int, default=48000, help="Sample rate of the synthetic utterance")
+    parser.add_argument("--utterance-seconds", type=float, default=2.0, help="Synthetic utterance length")
+    parser.add_argument("--realtime", action="store_true", help="Pace audio input and playout in real time")
+    parser.add_argument("--eou-delay", type=float, default=0.2, help="Simulated end-of-utterance delay")
+    parser.add_argument("--stt-delay", type=float, default=0.15, help="Simulated STT finalization delay")
+    parser.add_argument("--llm-latency", type=float, default=0.35, help="Simulated LLM time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Simulated delay between LLM tokens")
+    parser.add_argument("--tts-delay", type=float, default=0.12, help="Simulated TTS time to first byte")
+    parser.add_argument("--cache-min-words", type=int, default=int(os.getenv("LLM_CACHE_MIN_WORDS", "4")),
+                        help="Shortest opening question the LLM cache stores")
+    parser.add_argument("--skip-http", action="store_true", help="Only run voice sessions")
+    parser.add_argument("--skip-voice", action="store_true", help="Only run HTTP users")
+    parser.add_argument("--json", default="", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    print("Business Travel Assistant - Load Test")
+    print("=" * 50)
+    print(f"   profile={args.profile} users={args.users} voice_sessions={args.voice_sessions} "
+          f"voice_workers={args.voice_workers} target={args.target or 'in-process'}")
+
+    report: Dict[str, Any] = {}
+    if not args.skip_http and args.users:
+        report["http"] = asyncio.run(run_http(args))
+    if not args.skip_voice and args.voice_sessions:
+        report["voice"] = run_voice(args)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+    return 1 if report.get("http", {}).get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
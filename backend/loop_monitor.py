@@ -0,0 +1,284 @@
+"""
+Event-loop health for agent workers and the API.
+
+``LoopMonitor`` watches one asyncio loop:
+
+- a ticker task sleeps ``LOOP_MONITOR_INTERVAL_MS`` at a time and records how
+  late it wakes up, which is the scheduling lag every session on the loop sees
+- a watchdog thread notices when the ticker has not run for
+  ``LOOP_STALL_MS`` and logs the loop thread's stack at that moment, i.e.
+  the callback that is blocking it, to ``stalls-<pid>.log``
+- sampled profiles of the loop thread on demand: on ``SIGUSR2``, through
+  ``POST /api/debug/profile`` (which drops a request file every monitor
+  polls), or by calling ``profile()``. Samples are written as folded stacks
+  (``profile-<pid>-<time>.folded``) that flamegraph tools read directly
+
+Files go to ``LOOP_MONITOR_DIR`` so a production stall can be looked at
+after the fact.
+
+There is one monitor per loop. Each ``monitor_running_loop()`` call must be
+paired with a ``stop()``; the last one stops the ticker and the watchdog and
+drops the monitor. Readers that only want the stats use
+``running_loop_monitor()``, which takes no reference. A watchdog also exits on its own once its loop is closed
+or its thread has finished, so a job that never stopped its monitor cannot
+sample whichever later thread reuses the thread id.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from latency_metrics import Histogram, summarize
+from worker_load import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+MONITOR_DIR = os.getenv(
+    "LOOP_MONITOR_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "loop_monitor"),
+)
+PROFILE_REQUEST = "profile-request.json"
+# Requests older than this are ignored, e.g. by workers started afterwards
+PROFILE_REQUEST_TTL = 60.0
+
+LAG_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _folded(frame) -> str:
+    """One sampled stack as ``outer;...;inner`` for flamegraph tools"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopMonitor:
+    """Scheduling lag, stall stacks and on-demand profiles for one event loop"""
+
+    def __init__(self, interval: float = 0.05, stall_threshold: float = 0.25,
+                 sample_interval: float = 0.005, profile_seconds: float = 10.0,
+                 output_dir: str = MONITOR_DIR) -> None:
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.sample_interval = sample_interval
+        self.profile_seconds = profile_seconds
+        self.output_dir = output_dir
+        self.lag = Histogram(LAG_BUCKETS)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.profiles = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id: Optional[int] = None
+        self._users = 0
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat = time.perf_counter()
+        self._stall_reported = 0.0
+        self._profiling = threading.Lock()
+        self._stopped = threading.Event()
+        self._request_seen = 0.0
+
+    @classmethod
+    def from_env(cls) -> "LoopMonitor":
+        return cls(
+            interval=float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000,
+            stall_threshold=float(os.getenv("LOOP_STALL_MS", "250")) / 1000,
+            sample_interval=float(os.getenv("LOOP_PROFILE_SAMPLE_MS", "5")) / 1000,
+            profile_seconds=float(os.getenv("LOOP_PROFILE_SECONDS", "10")),
+        )
+
+    def start(self) -> "LoopMonitor":
+        """Start monitoring the running loop; call from a coroutine on it"""
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.current_thread()
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        request = os.path.join(self.output_dir, PROFILE_REQUEST)
+        # A request made before this monitor started is not for it
+        self._request_seen = os.path.getmtime(request) if os.path.exists(request) else 0.0
+        self._task = self._loop.create_task(self._tick())
+        threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """Release this user of the monitor; the last one stops it"""
+        with _monitors_lock:
+            self._users = max(0, self._users - 1)
+            if self._users:
+                return
+            if _monitors.get(self._loop) is self:
+                del _monitors[self._loop]
+        self._shutdown()
+
+    def _shutdown(self) -> None:
+        self._stopped.set()
+        if self._task is not None and self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                pass
+        self._task = None
+
+    def _alive(self) -> bool:
+        """Whether the loop this monitor watches can still run"""
+        return (self._thread is not None and self._thread.is_alive()
+                and self._loop is not None and not self._loop.is_closed())
+
+    async def _tick(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.stall_threshold:
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+                self._write_stall(f"blocked for {lag * 1000:.0f} ms in total\n\n")
+
+    def _watchdog(self) -> None:
+        last_request_check = 0.0
+        while not self._stopped.wait(self.stall_threshold / 2):
+            if not self._alive():
+                # The job ended without stopping the monitor; its thread id may be reused
+                self._stopped.set()
+                return
+            now = time.perf_counter()
+            heartbeat = self._heartbeat
+            blocked = now - heartbeat - self.interval
+            if blocked >= self.stall_threshold and self._stall_reported != heartbeat:
+                self._stall_reported = heartbeat
+                self._report_stall(blocked)
+            if now - last_request_check >= 1.0:
+                last_request_check = now
+                self._check_profile_request()
+
+    def _report_stall(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._thread_id) if self._alive() else None
+        if frame is None:
+            return
+        self.stalls += 1
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms so far in:\n{stack}")
+        self._write_stall(f"{time.strftime('%Y-%m-%dT%H:%M:%S')} pid {os.getpid()} loop blocked for "
+                          f"{blocked * 1000:.0f} ms so far in:\n{stack}")
+
+    def _write_stall(self, text: str) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, f"stalls-{os.getpid()}.log"), "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            logger.debug(f"Could not write stall report: {e}")
+
+    def _check_profile_request(self) -> None:
+        path = os.path.join(self.output_dir, PROFILE_REQUEST)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if mtime <= self._request_seen:
+            return
+        self._request_seen = mtime
+        if time.time() - mtime > PROFILE_REQUEST_TTL:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                seconds = float(json.load(f).get("seconds", self.profile_seconds))
+        except (OSError, ValueError):
+            seconds = self.profile_seconds
+        self.profile(seconds)
+
+    def profile(self, seconds: Optional[float] = None) -> bool:
+        """Sample the loop thread for ``seconds`` in the background; False if one is running"""
+        if self._thread_id is None or not self._profiling.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._sample, args=(seconds or self.profile_seconds,),
+                         name="loop-profiler", daemon=True).start()
+        return True
+
+    def _sample(self, seconds: float) -> None:
+        try:
+            stacks: Counter = Counter()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline and not self._stopped.is_set() and self._alive():
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is not None:
+                    stacks[_folded(frame)] += 1
+                del frame
+                time.sleep(self.sample_interval)
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir,
+                                f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self.profiles += 1
+            logger.info(f"Wrote {sum(stacks.values())} loop samples over {seconds:.1f}s to {path}")
+        except Exception as e:
+            logger.error(f"Loop profile failed: {e}")
+        finally:
+            self._profiling.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **summarize({"lag": self.lag}),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "profiles": self.profiles,
+        }
+
+
+_monitors: Dict[asyncio.AbstractEventLoop, LoopMonitor] = {}
+_monitors_lock = threading.Lock()
+_signal_installed = False
+
+
+def _on_profile_signal(signum, frame) -> None:
+    for monitor in list(_monitors.values()):
+        monitor.profile()
+
+
+def monitor_running_loop() -> LoopMonitor:
+    """The monitor for the running loop, started on first use; ``stop()`` it when done"""
+    global _signal_installed
+    loop = asyncio.get_running_loop()
+    with _monitors_lock:
+        # Loops that closed without stopping their monitor (e.g. a crashed job)
+        for closed in [other for other in _monitors if other.is_closed()]:
+            _monitors.pop(closed)._shutdown()
+        monitor = _monitors.get(loop)
+        if monitor is None:
+            monitor = _monitors[loop] = LoopMonitor.from_env().start()
+        monitor._users += 1
+    if not _signal_installed and hasattr(signal, "SIGUSR2") and threading.current_thread() is threading.main_thread():
+        try:
+            signal.signal(signal.SIGUSR2, _on_profile_signal)
+            _signal_installed = True
+        except ValueError:
+            pass
+    return monitor
+
+
+def running_loop_monitor() -> Optional[LoopMonitor]:
+    """The running loop's monitor if one was started, without becoming one of its users"""
+    loop = asyncio.get_running_loop()
+    with _monitors_lock:
+        return _monitors.get(loop)
+
+
+def request_profile(seconds: float, output_dir: str = MONITOR_DIR) -> Dict[str, Any]:
+    """Ask every monitor sharing ``output_dir`` to record a profile"""
+    write_json_atomic(os.path.join(output_dir, PROFILE_REQUEST), {"seconds": seconds, "ts": time.time()})
+    return {"seconds": seconds, "output_dir": output_dir}
@@ -1,29 +1,78 @@
 import os
 import sys
+import argparse
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Load environment variables first
 
 load_dotenv(".env")  # Also try to load .env if .env.local doesn't exist
 
-# Only import FastAPI components at module level
-from fastapi import FastAPI
+# Only import FastAPI components at module level; uvicorn, LiveKit and the
+# LLM SDKs are imported by the code path that needs them
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
-from typing import Dict, Any
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import Dict, Any, Optional
 from pydantic import BaseModel
 
-# Import LiveKit API components for token generation
-from livekit.api import AccessToken, VideoGrants
-import uuid
 import logging
 
+from agent_registry import travel_assistant
+from llm_backend import get_llm_backend
+from response_cache import response_cache_from_env
+from query_stream import ENCODERS, MEDIA_TYPES, StreamStats, stream_answer
+from token_service import get_token_service
+from room_registry import RoomCapacityError, registry_from_env
+from session_store import session_routes_enabled, session_store_from_env
+from catalog import Catalog
+from response_encoding import ENCODINGS, ORJSON_AVAILABLE, CachedBody, dumps, etag_matches
+from readiness import get_readiness
+from loop_monitor import monitor_running_loop, request_profile, running_loop_monitor
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI app
-app = FastAPI(title="Business Travel Assistant API", version="1.0.0")
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def warm_up() -> None:
+    """Build what a cold worker would otherwise build on its first requests"""
+    try:
+        get_token_service()
+    except Exception as e:
+        logger.warning(f"Token service warm-up failed: {e}")
+    for cached in (ROOT_BODY, DEFINITION_BODY, catalog.destinations_page(), catalog.services_page()):
+        if cached.compressible:
+            for encoding in ENCODINGS:
+                cached.encoded(encoding)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness = get_readiness()
+    monitor = monitor_running_loop()
+    start = time.perf_counter()
+    warm_up()
+    readiness.mark_warm((time.perf_counter() - start) * 1000)
+    yield
+    readiness.close()
+    await room_registry.aclose()
+    session_store.close()
+    monitor.stop()
+
+# Initialize FastAPI app; every JSON route renders through the fast encoder
+app = FastAPI(
+    title="Business Travel Assistant API",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
+logger.info(f"JSON responses rendered with {'orjson' if ORJSON_AVAILABLE else 'the json module'}")
 
 # Add CORS middleware to allow frontend connections
 frontend_origin = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
@@ -55,36 +104,52 @@ class SessionResponse(BaseModel):
     session_id: str
     status: str
     message: str
+    # Returned once by /session/start; send it as X-Session-Token afterwards
+    session_token: str = ""
+
+class SessionEndRequest(BaseModel):
+    session_id: str
+
+class SessionUpdate(BaseModel):
+    preferences: Dict[str, Any] = {}
+    state: Dict[str, Any] = {}
+
+class SessionState(BaseModel):
+    session_id: str
+    user_id: str
+    status: str
+    preferences: Dict[str, Any]
+    state: Dict[str, Any]
+    created_at: float
+    last_seen: float
 
 class TravelQuery(BaseModel):
     query: str
     context: Dict[str, Any] = {}
 
+class TokenBatchRequest(BaseModel):
+    count: int
+
 class TravelResponse(BaseModel):
     response: str
     action_required: bool = False
     action_type: str = ""
 
-# Define the Assistant class without LiveKit dependencies
-class Assistant:
-    def __init__(self) -> None:
-        # Enhanced system prompt for business travel assistant
-        self.instructions = """You are a professional business travel assistant. 
-        Your role is to help business travelers with:
-        1. Flight bookings and itinerary management
-        2. Hotel reservations and recommendations
-        3. Transportation arrangements (taxis, rideshares, car rentals)
-        4. Travel expense tracking and reporting
-        5. Visa and documentation guidance
-        6. Weather updates for destinations
-        7. Currency conversion and payment methods
-        8. Business meeting scheduling across time zones
-        9. Local business services and facilities
-        10. Emergency assistance during travel
-        
-        Always be concise, professional, and helpful. 
-        Ask clarifying questions when needed.
-        Focus on business travel needs specifically."""
+# Text query answers are cached across requests; the backend is pluggable
+response_cache = response_cache_from_env()
+llm_backend = get_llm_backend(system_prompt=travel_assistant().instructions)
+stream_stats = StreamStats()
+
+# Every session gets its own LiveKit room while LiveKit reports spare capacity
+room_registry = registry_from_env()
+
+# Session state (preferences, agent context) survives reconnects. The store
+# lives in this process, so the routes are only served with a single worker
+session_store = session_store_from_env()
+sessions = APIRouter()
+
+# Destinations and services are indexed once; responses are pre-serialized
+catalog = Catalog.load()
 
 # Only import LiveKit when needed (inside functions)
 def get_livekit_components():
@@ -95,163 +160,322 @@ def get_livekit_components():
         from livekit.plugins import (
             cartesia,
             deepgram,
-            silero,
             google,
         )
-        from livekit.plugins.turn_detector.multilingual import MultilingualModel
-        return agents, AgentSession, Agent, RoomInputOptions, cartesia, deepgram, silero, MultilingualModel, google, WorkerOptions
+        return agents, AgentSession, Agent, RoomInputOptions, cartesia, deepgram, google, WorkerOptions
     except ImportError as e:
         print(f"LiveKit import error: {e}")
-        return None, None, None, None, None, None, None, None, None, None
+        return None, None, None, None, None, None, None, None
 
 async def entrypoint(ctx):
     """LiveKit agent entrypoint - only called when RUN_AGENT=true"""
     # Import LiveKit components only when needed
-    agents, AgentSession, Agent, RoomInputOptions, cartesia, deepgram, silero, MultilingualModel, google, _ = get_livekit_components()
+    agents, AgentSession, Agent, RoomInputOptions, cartesia, deepgram, google, _ = get_livekit_components()
     
     if not agents:
         print("LiveKit components not available")
         return
     
-    class LiveKitAssistant(Agent):
-        def __init__(self) -> None:
-            super().__init__(instructions="""You are a professional business travel assistant. 
-            Your role is to help business travelers with:
-            1. Flight bookings and itinerary management
-            2. Hotel reservations and recommendations
-            3. Transportation arrangements (taxis, rideshares, car rentals)
-            4. Travel expense tracking and reporting
-            5. Visa and documentation guidance
-            6. Weather updates for destinations
-            7. Currency conversion and payment methods
-            8. Business meeting scheduling across time zones
-            9. Local business services and facilities
-            10. Emergency assistance during travel
-            
-            Always be concise, professional, and helpful. 
-            Ask clarifying questions when needed.
-            Focus on business travel needs specifically.""")
+    # VAD and turn detection are shared from the prewarmed model pool
+    from model_pool import pool_for
+    from greeting_cache import get_greeting_cache, play_greeting
+
+    # Prompt and provider settings come from the shared agent definition
+    definition = travel_assistant()
+    tts = cartesia.TTS(model=definition.tts_model, voice=definition.tts_voice)
 
     session = AgentSession(
-        stt=deepgram.STT(model="nova-3", language="multi"),
-        llm=google.LLM(model="gemini-2.0-flash-exp"),
-        tts=cartesia.TTS(model="sonic-2", voice="f786b574-daa5-4673-aa0c-cbe3e8534c02"),
-        vad=silero.VAD.load(),
-        turn_detection=MultilingualModel(),
+        stt=deepgram.STT(model=definition.stt_model, language=definition.stt_language),
+        llm=google.LLM(model=definition.llm_model),
+        tts=tts,
+        **pool_for(ctx).session_components(),
     )
 
     await session.start(
         room=ctx.room,
-        agent=LiveKitAssistant(),
+        agent=Agent(instructions=definition.instructions),
         room_input_options=RoomInputOptions(),
     )
 
-    await session.generate_reply(
-        instructions="Welcome to your business travel assistant. How can I help with your travel plans today?"
-    )
+    # Greeting audio is synthesized once and replayed from cache
+    await play_greeting(session, get_greeting_cache(), tts, definition.tts_model, definition.tts_voice)
+
+def encoded_response(request: Request, cached: CachedBody, cache_control: str = "no-cache") -> Response:
+    """Serve a pre-serialized body, compressed per Accept-Encoding, answering revalidation with 304"""
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+    if cached.compressible:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    body, encoding = cached.select(request.headers.get("accept-encoding"))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=cached.media_type, headers=headers)
+
+# Responses that never change while the process runs are serialized once
+ROOT_BODY = CachedBody.from_payload({"message": "Business Travel Assistant API is running"})
+HEALTH_BODY = CachedBody.from_payload({"status": "healthy"})
+DEFINITION_BODY = CachedBody.from_payload(travel_assistant().to_dict())
 
 # FastAPI routes
 @app.get("/")
-async def root():
-    return {"message": "Business Travel Assistant API is running"}
+async def root(request: Request):
+    return encoded_response(request, ROOT_BODY)
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"}
+    return Response(content=HEALTH_BODY.body, media_type=HEALTH_BODY.media_type)
+
+@app.get("/api/ready")
+async def readiness_check():
+    """Whether this worker is warm and not draining; 503 tells the load balancer to skip it"""
+    status = get_readiness().status()
+    return FastJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+TOKEN_BATCH_LIMIT = int(os.getenv("TOKEN_BATCH_LIMIT", "100"))
+
+# Profiling routes are off unless explicitly enabled for a deployment
+DEBUG_ROUTES = os.getenv("DEBUG_ROUTES", "false").lower() == "true"
+
+@app.get("/api/agent/stats")
+async def get_agent_stats():
+    """Load, active sessions and inference queue depth reported by agent workers"""
+    from worker_load import agent_stats
+    return agent_stats()
+
+@app.get("/api/agent/definition")
+async def get_agent_definition(request: Request):
+    """Prompt version and provider settings the agents are built from"""
+    return encoded_response(request, DEFINITION_BODY)
+
+@app.get("/api/agent/latency")
+async def get_agent_latency():
+    """Per-worker p50/p95/p99 of each voice pipeline stage"""
+    from latency_metrics import latency_summary
+    return latency_summary()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Voice pipeline latency histograms in Prometheus text format"""
+    from latency_metrics import prometheus_text
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+@app.post("/api/debug/profile")
+async def start_profile(seconds: float = Query(10.0, gt=0, le=120)):
+    """Record a sampled event-loop profile in every agent worker and API process"""
+    if not DEBUG_ROUTES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return request_profile(seconds)
+
+@app.get("/api/debug/loop")
+async def get_loop_stats():
+    """Event-loop lag and stalls of this API process"""
+    if not DEBUG_ROUTES:
+        raise HTTPException(status_code=404, detail="Not Found")
+    monitor = running_loop_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="Loop monitor is not running")
+    return monitor.stats()
 
 @app.get("/api/token")
 async def get_token():
     """Generate a token for LiveKit connection"""
     try:
-        # Log the environment variables for debugging
-        api_key = os.getenv("LIVEKIT_API_KEY")
-        api_secret = os.getenv("LIVEKIT_API_SECRET")
-        
-        if not api_key or not api_secret:
+        service = get_token_service()
+        if service is None:
             logger.error("LIVEKIT_API_KEY or LIVEKIT_API_SECRET not found in environment variables")
             return {"error": "LiveKit API credentials not configured"}
-            
-        logger.info(f"Generating token with API key: {api_key[:5]}...")  # Log first 5 chars for security
-        
-        # Create access token with optimized settings
-        token = AccessToken(
-            api_key=api_key,
-            api_secret=api_secret,
-        ).with_identity(f"user_{uuid.uuid4().hex}").with_grants(
-            VideoGrants(
-                room_join=True,
-                room="business-travel-room",
-            )
-        ).to_jwt()
-        
-        logger.info("Token generated successfully")
-        return {"token": token, "room": "business-travel-room"}
+
+        room = await room_registry.allocate()
+        issued = service.mint(room=room)
+        logger.debug(f"Token issued for {issued['identity']} in {room}")
+        return {"token": issued["token"], "room": issued["room"]}
+    except RoomCapacityError as e:
+        logger.warning(f"Rejecting token request: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating token: {e}")
         return {"error": f"Failed to generate token: {str(e)}"}
 
-@app.post("/session/start", response_model=SessionResponse)
+@app.post("/api/tokens")
+async def get_tokens(request: TokenBatchRequest):
+    """Generate tokens for several new participants in one call"""
+    service = get_token_service()
+    if service is None:
+        logger.error("LIVEKIT_API_KEY or LIVEKIT_API_SECRET not found in environment variables")
+        return {"error": "LiveKit API credentials not configured"}
+
+    # Identities are generated server-side; callers cannot choose one
+    if request.count <= 0:
+        raise HTTPException(status_code=400, detail="count must be positive")
+    if request.count > TOKEN_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {TOKEN_BATCH_LIMIT} tokens per batch")
+
+    try:
+        rooms = await room_registry.allocate_many(request.count)
+    except RoomCapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"tokens": [service.mint(room) for room in rooms]}
+
+@app.get("/api/rooms/stats")
+async def get_room_stats():
+    """Rooms in use as LiveKit last reported them, and rooms awaiting their caller"""
+    await room_registry.refresh()
+    return room_registry.stats()
+
+@sessions.post("/session/start", response_model=SessionResponse)
 async def start_session(request: SessionRequest):
     """Initialize a new travel assistant session"""
+    record, token = session_store.start(request.user_id, request.preferences)
     return SessionResponse(
-        session_id=f"session_{request.user_id}",
-        status="active",
-        message="Travel assistant session started successfully"
+        session_id=record.session_id,
+        status=record.status,
+        message="Travel assistant session started successfully",
+        session_token=token,
     )
 
-@app.post("/session/end", response_model=SessionResponse)
-async def end_session(request: SessionRequest):
+@sessions.post("/session/end", response_model=SessionResponse)
+async def end_session(request: SessionEndRequest, x_session_token: Optional[str] = Header(None)):
     """End the current travel assistant session"""
+    if session_store.end(request.session_id, x_session_token) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {request.session_id}")
     return SessionResponse(
-        session_id=f"session_{request.user_id}",
+        session_id=request.session_id,
         status="inactive",
         message="Travel assistant session ended successfully"
     )
 
+@sessions.get("/session/stats")
+async def get_session_stats():
+    """Active session count and eviction counters"""
+    return session_store.stats()
+
+@sessions.get("/session/{session_id}", response_model=SessionState)
+async def get_session(session_id: str, x_session_token: Optional[str] = Header(None)):
+    """Fetch a live session's preferences and state"""
+    # Someone else's session looks the same as a missing one
+    record = session_store.get(session_id, x_session_token)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+    return SessionState(**record.to_dict())
+
+@sessions.patch("/session/{session_id}", response_model=SessionState)
+async def update_session(session_id: str, update: SessionUpdate,
+                         x_session_token: Optional[str] = Header(None)):
+    """Merge new preferences/state into a live session"""
+    record = session_store.update(session_id, x_session_token,
+                                  preferences=update.preferences, state=update.state)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+    return SessionState(**record.to_dict())
+
+if session_routes_enabled():
+    app.include_router(sessions)
+
 @app.post("/travel/query", response_model=TravelResponse)
 async def handle_travel_query(query: TravelQuery):
     """Handle travel-related queries"""
+    answer = await response_cache.get_or_generate(
+        query.query,
+        query.context,
+        lambda: llm_backend.generate(query.query, query.context),
+    )
     return TravelResponse(
-        response=f"I understand you're asking about: {query.query}. I'll help you with that as a business travel assistant.",
+        response=answer,
         action_required=False
     )
 
+@app.post("/travel/query/stream")
+async def stream_travel_query(query: TravelQuery, request: Request, format: str = "sse"):
+    """Stream the answer token by token as server-sent events or NDJSON"""
+    if format not in ENCODERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {format}")
+    encode = ENCODERS[format]
+
+    async def body():
+        events = stream_answer(
+            llm_backend,
+            response_cache,
+            query.query,
+            query.context,
+            stream_stats,
+            is_disconnected=request.is_disconnected,
+        )
+        async for event in events:
+            yield encode(event)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[format],
+        # Disable proxy buffering so each token is flushed as soon as it is yielded
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/travel/stream/stats")
+async def get_stream_stats():
+    """Time-to-first-token and time-to-last-token for streamed queries"""
+    return stream_stats.stats()
+
+@app.get("/travel/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the travel query response cache"""
+    return {"backend": llm_backend.name, **response_cache.stats()}
+
+CATALOG_CACHE_CONTROL = "public, max-age=300"
+
 @app.get("/travel/destinations")
-async def get_popular_destinations():
-    """Get list of popular business travel destinations"""
-    return {
-        "destinations": [
-            {"name": "New York", "country": "USA", "business_index": 9.5},
-            {"name": "London", "country": "UK", "business_index": 9.3},
-            {"name": "Tokyo", "country": "Japan", "business_index": 9.0},
-            {"name": "Singapore", "country": "Singapore", "business_index": 9.2},
-            {"name": "Frankfurt", "country": "Germany", "business_index": 8.8},
-        ]
-    }
+async def get_popular_destinations(
+    request: Request,
+    q: Optional[str] = None,
+    country: Optional[str] = None,
+    min_index: Optional[float] = None,
+    max_index: Optional[float] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Get popular business travel destinations, filtered and paginated"""
+    cached = catalog.destinations_page(q, country, min_index, max_index, offset, limit)
+    return encoded_response(request, cached, CATALOG_CACHE_CONTROL)
 
 @app.get("/travel/services")
-async def get_travel_services():
+async def get_travel_services(request: Request, q: Optional[str] = None):
     """Get list of available travel services"""
-    return {
-        "services": [
-            {"id": "flights", "name": "Flight Booking", "description": "Book business class flights"},
-            {"id": "hotels", "name": "Hotel Reservations", "description": "Reserve business-friendly hotels"},
-            {"id": "transport", "name": "Transportation", "description": "Arrange airport transfers and local transport"},
-            {"id": "visa", "name": "Visa Assistance", "description": "Get visa requirements and assistance"},
-            {"id": "expenses", "name": "Expense Tracking", "description": "Track and report travel expenses"},
-        ]
-    }
+    return encoded_response(request, catalog.services_page(q), CATALOG_CACHE_CONTROL)
+
+@app.get("/travel/catalog/stats")
+async def get_catalog_stats():
+    """Catalog size, digest and cached response count"""
+    return catalog.stats()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Business Travel Assistant API")
+    parser.add_argument("--import-report", action="store_true",
+                        help="Print an -X importtime breakdown of the API cold start and exit")
+    parser.add_argument("--top", type=int, default=25,
+                        help="Number of entries to show in the import report")
+    # Anything else (--workers, --reload, ...) is for serve.py
+    args, serve_args = parser.parse_known_args()
+
+    if args.import_report:
+        from startup_report import format_report, heavy_imports, loaded_modules, profile_imports
+        print(format_report(profile_imports("main"), "main", args.top))
+        heavy = heavy_imports(loaded_modules("main"))
+        if heavy:
+            print(f"\nWarning: heavy modules loaded at import time: {', '.join(heavy)}")
+        sys.exit(0)
+
     # If running directly, start the LiveKit agent
     if os.getenv("RUN_AGENT", "false").lower() == "true":
         # Import LiveKit components only when needed for the agent
-        agents, _, _, _, _, _, _, _, _, WorkerOptions = get_livekit_components()
+        agents, _, _, _, _, _, _, WorkerOptions = get_livekit_components()
         if agents and WorkerOptions:
-            agents.cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint))
+            from model_pool import import_plugins, prewarm
+            import_plugins()
+            agents.cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
         else:
             print("LiveKit components not available. Cannot start agent.")
             sys.exit(1)
     else:
-        # Otherwise run the FastAPI server
-        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+        # Otherwise serve the API; pass --reload for the development server
+        from serve import main as serve_main
+        serve_main(serve_args)
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""
+Process-level model pool for the voice agent.
+
+The silero VAD and the multilingual turn detector are loaded once per worker
+process from the LiveKit prewarm hook and then shared read-only by every job
+that process runs, so a new caller never waits on ONNX model loading.
+
+With ``INFERENCE_BATCHING=1`` the VAD is ``batched_vad.BatchedVAD`` instead,
+which runs every session's windows through one batching scheduler (in child
+processes with ``INFERENCE_POOL_PROCESSES`` > 0). Otherwise each session's
+silero stream is wrapped in ``BacklogVADStream``, which tracks how much
+pushed audio the model has not reached yet; that backlog is the inference
+queue depth the worker's load function sees.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Duration of one silero window (512 samples at 16 kHz)
+VAD_WINDOW_SECONDS = 512 / 16000
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a sequence of numbers (0.0 when empty)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class BacklogVADStream:
+    """VAD stream that tracks pushed audio its events have not covered yet"""
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+        self.pushed = 0.0
+        self.processed = 0.0
+
+    def push_frame(self, frame) -> None:
+        self.pushed += frame.samples_per_channel / frame.sample_rate
+        self._stream.push_frame(frame)
+
+    def pending_windows(self) -> int:
+        return max(0, int((self.pushed - self.processed) / VAD_WINDOW_SECONDS))
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._stream.__anext__()
+        # Every VAD event carries the audio time the model has reached
+        self.processed = max(self.processed, getattr(event, "timestamp", 0.0))
+        return event
+
+
+class BacklogVAD:
+    """Shared VAD whose streams report their backlog to ``vad_backlog``"""
+
+    def __init__(self, vad) -> None:
+        self._vad = vad
+        self._streams: "weakref.WeakSet[BacklogVADStream]" = weakref.WeakSet()
+        # Jobs run as threads share this VAD (AGENT_JOB_EXECUTOR=thread)
+        self._lock = threading.Lock()
+
+    def stream(self, *args, **kwargs) -> BacklogVADStream:
+        stream = BacklogVADStream(self._vad.stream(*args, **kwargs))
+        with self._lock:
+            self._streams.add(stream)
+        return stream
+
+    def pending(self) -> int:
+        """Windows pushed to this process's VAD streams and not yet inferred"""
+        with self._lock:
+            streams = list(self._streams)
+        return sum(stream.pending_windows() for stream in streams)
+
+    def __getattr__(self, name: str):
+        return getattr(self._vad, name)
+
+
+class ModelPool:
+    """Holds the shared VAD / turn-detector instances and their load metrics"""
+
+    def __init__(self, max_samples: int = 512, batch_inference: bool = False) -> None:
+        self._lock = threading.Lock()
+        self.batch_inference = batch_inference
+        self.vad = None
+        self.turn_detector = None
+        self.loaded = False
+        self.load_times: Dict[str, float] = {}
+        self._first_greeting = deque(maxlen=max_samples)
+
+    def load(self) -> "ModelPool":
+        """Load every model once; later calls return immediately"""
+        with self._lock:
+            if self.loaded:
+                return self
+
+            start = time.perf_counter()
+            if self.batch_inference:
+                from batched_vad import BatchedVAD
+                from inference_batcher import get_batch_scheduler
+
+                scheduler = get_batch_scheduler()
+                scheduler.runners["vad"].load()
+                self.vad = BatchedVAD(scheduler)
+            else:
+                from livekit.plugins import silero
+                from worker_load import register_queue_source
+
+                self.vad = BacklogVAD(silero.VAD.load())
+                register_queue_source(self.vad.pending)
+            self.load_times["vad"] = time.perf_counter() - start
+            logger.info(f"Loaded VAD in {self.load_times['vad'] * 1000:.1f} ms")
+
+            try:
+                from livekit.plugins.turn_detector.multilingual import MultilingualModel
+            except ImportError:
+                logger.warning("Turn detector not available, using default settings")
+            else:
+                start = time.perf_counter()
+                self.turn_detector = MultilingualModel()
+                self.load_times["turn_detector"] = time.perf_counter() - start
+                logger.info(
+                    f"Loaded turn detector in {self.load_times['turn_detector'] * 1000:.1f} ms"
+                )
+
+            self.loaded = True
+        return self
+
+    def session_components(self) -> Dict[str, Any]:
+        """AgentSession keyword arguments backed by the shared models"""
+        if not self.loaded:
+            self.load()
+        components: Dict[str, Any] = {"vad": self.vad}
+        if self.turn_detector is not None:
+            components["turn_detection"] = self.turn_detector
+        return components
+
+    def record_first_greeting(self, seconds: float) -> None:
+        """Record the delay between job start and the agent starting to speak"""
+        self._first_greeting.append(seconds)
+        logger.info(
+            f"Time to first greeting: {seconds * 1000:.1f} ms "
+            f"(p50 {percentile(self._first_greeting, 50) * 1000:.1f} ms, "
+            f"p95 {percentile(self._first_greeting, 95) * 1000:.1f} ms)"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        samples = list(self._first_greeting)
+        return {
+            "loaded": self.loaded,
+            "batch_inference": self.batch_inference,
+            "turn_detection": self.turn_detector is not None,
+            "load_ms": {name: round(value * 1000, 2) for name, value in self.load_times.items()},
+            "first_greeting_ms": {
+                "count": len(samples),
+                "p50": round(percentile(samples, 50) * 1000, 2),
+                "p95": round(percentile(samples, 95) * 1000, 2),
+                "p99": round(percentile(samples, 99) * 1000, 2),
+            },
+        }
+
+
+def import_plugins() -> bool:
+    """Import the VAD / turn-detector plugins in the worker's main process
+
+    LiveKit plugins register themselves at import time (the turn detector
+    also registers its inference runner), which has to happen before
+    ``run_app`` starts the worker. Returns whether turn detection is available.
+    """
+    from livekit.plugins import silero  # noqa: F401
+
+    try:
+        from livekit.plugins.turn_detector import multilingual  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_pool: Optional[ModelPool] = None
+
+
+def get_model_pool() -> ModelPool:
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        # The inference process pool is fed by the batch scheduler, so it implies batching
+        batch_inference = (os.getenv("INFERENCE_BATCHING", "0") == "1"
+                           or int(os.getenv("INFERENCE_POOL_PROCESSES", "0")) > 0)
+        _pool = ModelPool(batch_inference=batch_inference)
+    return _pool
+
+
+def prewarm(proc) -> None:
+    """LiveKit ``prewarm_fnc``: load models before the worker accepts jobs"""
+    proc.userdata["model_pool"] = get_model_pool().load()
+
+
+def pool_for(ctx) -> ModelPool:
+    """Pool for a job, falling back to a lazy load when prewarm did not run"""
+    pool = ctx.proc.userdata.get("model_pool") if getattr(ctx, "proc", None) else None
+    return pool or get_model_pool().load()
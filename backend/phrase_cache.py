@@ -0,0 +1,494 @@
+"""
+Content-addressed audio cache for phrases the agent repeats.
+
+Confirmations, clarifying questions ("Could you confirm your departure
+city?") and capability descriptions are spoken verbatim many times a day.
+``PhraseCache`` keys synthesized PCM on (text, voice, model, sample rate) and
+keeps it in two tiers:
+
+- disk: one WAV file per phrase under ``PHRASE_CACHE_DIR``, LRU-evicted by
+  access time once the directory exceeds ``PHRASE_CACHE_DISK_BYTES``
+- memory: memory-mapped views of those files, LRU-evicted once mapped audio
+  exceeds ``PHRASE_CACHE_MEMORY_BYTES``
+
+Hits are sliced out of the mapping as ``memoryview`` frames, so the file is
+never read into a Python buffer as a whole; ``rtc.AudioFrame`` still copies
+each 20 ms frame into its own buffer when it is built. ``get`` hands out the
+audio with a reference held for the stream replaying it, and an evicted entry
+is only unmapped once the last of those streams releases it.
+
+The cache holds no event-loop objects, and its maps and the audio reference
+counts are guarded by thread locks, so jobs run as threads
+(``AGENT_JOB_EXECUTOR=thread``), each on its own loop, can share it.
+
+Most chunks are spoken once, so a phrase is only stored the
+``PHRASE_CACHE_ADMIT_AFTER``-th time (default 2) it misses. WAV writes and
+mappings run in a worker thread, off the event loop. Disk hits reorder the
+in-memory LRU at once; the file access times that rebuild it after a restart
+are updated in batches, every ``TOUCH_INTERVAL`` seconds, on a worker thread.
+
+``CachedTTS`` wraps a TTS plugin with the same ``synthesize`` interface: hits
+are replayed from the cache and misses are streamed through unchanged while
+their frames are collected for the next time.
+"""
+
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+import unicodedata
+import wave
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "PHRASE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "phrases"),
+)
+
+# How often disk hits' access times are written back
+TOUCH_INTERVAL = 5.0
+
+try:
+    from livekit import rtc
+    RTC_AVAILABLE = True
+except ImportError:
+    RTC_AVAILABLE = False
+
+
+# Guards every CachedAudio's reader count; streams release from any job thread
+_refs_lock = threading.Lock()
+
+
+class CachedAudio:
+    """PCM backed by a memory mapping (or bytes when there is no disk tier)"""
+
+    __slots__ = ("pcm", "sample_rate", "num_channels", "_mmap", "_readers", "_retired", "_nbytes")
+
+    def __init__(self, pcm: memoryview, sample_rate: int, num_channels: int,
+                 mapping: Optional[mmap.mmap] = None) -> None:
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self._mmap = mapping
+        self._readers = 0
+        self._retired = False
+        self._nbytes = len(pcm)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def closed(self) -> bool:
+        return self._retired and self._readers == 0
+
+    def acquire(self) -> "CachedAudio":
+        """Keep the PCM mapped while a stream replays it"""
+        with _refs_lock:
+            self._readers += 1
+        return self
+
+    def release(self) -> None:
+        with _refs_lock:
+            self._readers -= 1
+            unmap = self._retired and self._readers == 0
+        if unmap:
+            self._close()
+
+    def close(self) -> None:
+        """Unmap now, or when the last reader releases the audio"""
+        with _refs_lock:
+            unmap = not self._retired and self._readers == 0
+            self._retired = True
+        if unmap:
+            self._close()
+
+    def _close(self) -> None:
+        self.pcm.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A frame still references the mapping; it closes once collected
+                pass
+
+
+def _map_wav(path: str) -> CachedAudio:
+    with wave.open(path, "rb") as wav:
+        sample_rate, num_channels = wav.getframerate(), wav.getnchannels()
+        data_bytes = wav.getnframes() * wav.getsampwidth() * num_channels
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # PCM data is the tail of the file, after the RIFF header
+    start = len(mapping) - data_bytes
+    return CachedAudio(memoryview(mapping)[start:], sample_rate, num_channels, mapping)
+
+
+def _write_wav(path: str, pcm: bytes, sample_rate: int, num_channels: int) -> Tuple[int, CachedAudio]:
+    """Write a phrase atomically and map it back; runs in a worker thread"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with wave.open(tmp_path, "wb") as wav:
+        wav.setnchannels(num_channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path), _map_wav(path)
+
+
+def _touch_files(paths: List[str]) -> None:
+    """Mark phrases as recently used on disk; runs in a worker thread"""
+    for path in paths:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+class PhraseCache:
+    """Two-tier LRU cache of synthesized phrases with byte budgets"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+        memory_budget: int = 64 * 1024 * 1024,
+        disk_budget: int = 512 * 1024 * 1024,
+        max_chars: int = 200,
+        admit_after: int = 2,
+        max_candidates: int = 4096,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.max_chars = max_chars
+        self.admit_after = max(1, admit_after)
+        self.max_candidates = max_candidates
+        self._memory: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        # Key -> misses so far, for phrases not stored yet
+        self._candidates: "OrderedDict[str, int]" = OrderedDict()
+        # Disk hits whose access time has not been written back yet
+        self._touched: Set[str] = set()
+        self._touched_at = time.monotonic()
+        # Jobs run as threads share this cache
+        self._lock = threading.RLock()
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if cache_dir:
+            self._scan_disk()
+
+    @classmethod
+    def from_env(cls) -> "PhraseCache":
+        return cls(
+            memory_budget=int(os.getenv("PHRASE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+            disk_budget=int(os.getenv("PHRASE_CACHE_DISK_BYTES", str(512 * 1024 * 1024))),
+            max_chars=int(os.getenv("PHRASE_CACHE_MAX_CHARS", "200")),
+            admit_after=int(os.getenv("PHRASE_CACHE_ADMIT_AFTER", "2")),
+        )
+
+    @staticmethod
+    def key(text: str, voice: str, model: str, sample_rate: int) -> str:
+        # Whitespace and Unicode form do not change the audio
+        text = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{model}\0{voice}\0{sample_rate}\0{text}".encode("utf-8")).hexdigest()
+
+    def cacheable(self, text: str) -> bool:
+        return 0 < len(text.strip()) <= self.max_chars
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _scan_disk(self) -> None:
+        """Rebuild the disk LRU from file access times after a restart"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".wav"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    # Tiers -------------------------------------------------------------
+
+    def _admit_memory(self, key: str, audio: CachedAudio) -> None:
+        if audio.nbytes > self.memory_budget:
+            return
+        self._memory[key] = audio
+        self.memory_bytes += audio.nbytes
+        while self.memory_bytes > self.memory_budget:
+            _, old = self._memory.popitem(last=False)
+            self.memory_bytes -= old.nbytes
+            old.close()
+            self.evictions += 1
+
+    def _evict_disk(self) -> None:
+        while self.disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self.disk_bytes -= size
+            self.evictions += 1
+            audio = self._memory.pop(key, None)
+            if audio is not None:
+                self.memory_bytes -= audio.nbytes
+                audio.close()
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    async def get(self, text: str, voice: str, model: str, sample_rate: int) -> Optional[CachedAudio]:
+        """Cached audio for a phrase, acquired for the caller to ``release``
+
+        None after counting the miss towards admission.
+        """
+        key = self.key(text, voice, model, sample_rate)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self._touch_disk(key)
+                self.memory_hits += 1
+                return audio.acquire()
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                audio = await asyncio.to_thread(_map_wav, self._path(key))
+            except (OSError, ValueError, wave.Error) as e:
+                logger.warning(f"Dropping unreadable phrase cache entry {key}: {e}")
+                with self._lock:
+                    if key in self._disk:
+                        self.disk_bytes -= self._disk.pop(key)
+            else:
+                with self._lock:
+                    if key in self._memory:
+                        # Another stream mapped it while this one waited
+                        audio.close()
+                        audio = self._memory[key]
+                    else:
+                        self._admit_memory(key, audio)
+                    self._touch_disk(key)
+                    self.disk_hits += 1
+                    return audio.acquire()
+
+        with self._lock:
+            self.misses += 1
+            self._candidates[key] = self._candidates.pop(key, 0) + 1
+            while len(self._candidates) > self.max_candidates:
+                self._candidates.popitem(last=False)
+        return None
+
+    def admits(self, text: str, voice: str, model: str, sample_rate: int) -> bool:
+        """Whether ``put`` would store this phrase now (it has missed often enough)"""
+        if not self.cacheable(text):
+            return False
+        key = self.key(text, voice, model, sample_rate)
+        with self._lock:
+            return key in self._memory or self._candidates.get(key, 0) >= self.admit_after
+
+    def _touch_disk(self, key: str) -> None:
+        if key not in self._disk:
+            return
+        self._disk.move_to_end(key)
+        self._touched.add(key)
+        now = time.monotonic()
+        if now - self._touched_at >= TOUCH_INTERVAL:
+            self._touched_at = now
+            asyncio.get_running_loop().run_in_executor(None, _touch_files, self._take_touched())
+
+    def _take_touched(self) -> List[str]:
+        paths = [self._path(key) for key in self._touched if key in self._disk]
+        self._touched.clear()
+        return paths
+
+    async def put(self, text: str, voice: str, model: str, sample_rate: int,
+                  pcm: bytes, num_channels: int = 1) -> Optional[CachedAudio]:
+        """Store synthesized PCM once the phrase is admitted; returns the cached (mapped) audio"""
+        if not pcm or not self.admits(text, voice, model, sample_rate):
+            return None
+        key = self.key(text, voice, model, sample_rate)
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+            self._candidates.pop(key, None)
+
+        if not self.cache_dir:
+            audio = CachedAudio(memoryview(pcm), sample_rate, num_channels)
+            size = None
+        else:
+            try:
+                size, audio = await asyncio.to_thread(_write_wav, self._path(key), pcm, sample_rate, num_channels)
+            except (OSError, ValueError, wave.Error) as e:
+                logger.warning(f"Could not persist phrase audio: {e}")
+                return None
+
+        with self._lock:
+            if key in self._memory:
+                # Stored by another stream while this one was writing
+                audio.close()
+                return self._memory[key]
+            if size is not None:
+                if key in self._disk:
+                    self.disk_bytes -= self._disk.pop(key)
+                self._disk[key] = size
+                self.disk_bytes += size
+                self._evict_disk()
+            self._admit_memory(key, audio)
+            self.stores += 1
+            return audio
+
+    def preload(self) -> int:
+        """Map the most recently used disk entries into memory (from prewarm)"""
+        with self._lock:
+            return self._preload()
+
+    def _preload(self) -> int:
+        loaded = 0
+        for key in reversed(list(self._disk)):
+            if key in self._memory:
+                continue
+            if self.memory_bytes + self._disk[key] > self.memory_budget:
+                break
+            try:
+                audio = _map_wav(self._path(key))
+            except (OSError, ValueError, wave.Error):
+                continue
+            self._memory[key] = audio
+            self._memory.move_to_end(key, last=False)
+            self.memory_bytes += audio.nbytes
+            loaded += 1
+        return loaded
+
+    def close(self) -> None:
+        with self._lock:
+            _touch_files(self._take_touched())
+            for audio in self._memory.values():
+                audio.close()
+            self._memory.clear()
+            self.memory_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._stats()
+
+    def _stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self.disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "candidates": len(self._candidates),
+            "evictions": self.evictions,
+        }
+
+
+def _frame(data: memoryview, sample_rate: int, num_channels: int):
+    samples = len(data) // (2 * num_channels)
+    if RTC_AVAILABLE:
+        # rtc.AudioFrame copies the slice into its own buffer
+        return rtc.AudioFrame(data=data, sample_rate=sample_rate,
+                              num_channels=num_channels, samples_per_channel=samples)
+    # Offline (load test): same attributes as rtc.AudioFrame
+    return SimpleNamespace(data=data, sample_rate=sample_rate,
+                           num_channels=num_channels, samples_per_channel=samples)
+
+
+class CachedTTS:
+    """TTS wrapper answering ``synthesize`` from the phrase cache when it can"""
+
+    def __init__(self, tts, cache: PhraseCache, model: str, voice: str, frame_ms: int = 20) -> None:
+        self.tts = tts
+        self.cache = cache
+        self.model = model
+        self.voice = voice
+        self.frame_ms = frame_ms
+
+    @property
+    def sample_rate(self) -> int:
+        return getattr(self.tts, "sample_rate", 24000)
+
+    @property
+    def num_channels(self) -> int:
+        return getattr(self.tts, "num_channels", 1)
+
+    def synthesize(self, text: str) -> "_CachedStream":
+        return _CachedStream(self, text)
+
+
+class _CachedStream:
+    def __init__(self, owner: CachedTTS, text: str) -> None:
+        self._owner = owner
+        self._text = text
+
+    async def __aenter__(self) -> "_CachedStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def __aiter__(self):
+        owner, cache = self._owner, self._owner.cache
+        cacheable = cache.cacheable(self._text)
+        audio = await cache.get(self._text, owner.voice, owner.model, owner.sample_rate) if cacheable else None
+        if audio is not None:
+            # get() acquired the audio: eviction while this stream replays only unmaps once it releases
+            try:
+                frame_bytes = audio.sample_rate * owner.frame_ms // 1000 * 2 * audio.num_channels
+                for offset in range(0, audio.nbytes, frame_bytes):
+                    chunk = audio.pcm[offset:offset + frame_bytes]
+                    yield SimpleNamespace(frame=_frame(chunk, audio.sample_rate, audio.num_channels))
+            finally:
+                audio.release()
+            return
+
+        # Frames are only collected when this synthesis would be stored
+        collect = cacheable and cache.admits(self._text, owner.voice, owner.model, owner.sample_rate)
+        chunks: List[bytes] = []
+        sample_rate, num_channels = owner.sample_rate, owner.num_channels
+        async with owner.tts.synthesize(self._text) as stream:
+            async for event in stream:
+                if collect:
+                    frame = event.frame
+                    sample_rate, num_channels = frame.sample_rate, frame.num_channels
+                    chunks.append(bytes(frame.data))
+                yield event
+        # Only complete syntheses are stored; an interrupted one never gets here
+        if collect and chunks:
+            await cache.put(self._text, owner.voice, owner.model, sample_rate, b"".join(chunks), num_channels)
+
+
+_cache: Optional[PhraseCache] = None
+
+
+def get_phrase_cache() -> PhraseCache:
+    """Return the process-wide phrase cache"""
+    global _cache
+    if _cache is None:
+        _cache = PhraseCache.from_env()
+    return _cache
@@ -0,0 +1,139 @@
+"""
+Token streaming for ``/travel/query/stream``.
+
+Tokens are pulled from the LLM backend only as fast as the client consumes
+them, so a slow reader applies backpressure all the way upstream. When the
+client disconnects the upstream generator is closed, which stops generation.
+If the backend fails mid-answer the stream ends with an ``error`` event
+instead of ``done``.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from model_pool import percentile
+from response_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def encode_sse(event: Dict[str, Any]) -> bytes:
+    return b"event: " + event["type"].encode("utf-8") + b"\ndata: " + dumps(event) + b"\n\n"
+
+
+def encode_ndjson(event: Dict[str, Any]) -> bytes:
+    return dumps(event) + b"\n"
+
+
+ENCODERS = {
+    "sse": encode_sse,
+    "ndjson": encode_ndjson,
+}
+
+
+class StreamStats:
+    """Rolling time-to-first-token / time-to-last-token samples"""
+
+    def __init__(self, max_samples: int = 1024) -> None:
+        self._ttft = deque(maxlen=max_samples)
+        self._ttlt = deque(maxlen=max_samples)
+        self.completed = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.cached = 0
+
+    def record(self, ttft: float, ttlt: float) -> None:
+        self._ttft.append(ttft)
+        self._ttlt.append(ttlt)
+
+    @staticmethod
+    def _summary(samples) -> Dict[str, float]:
+        return {
+            "count": len(samples),
+            "p50": round(percentile(samples, 50) * 1000, 2),
+            "p95": round(percentile(samples, 95) * 1000, 2),
+            "p99": round(percentile(samples, 99) * 1000, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "cached": self.cached,
+            "ttft_ms": self._summary(list(self._ttft)),
+            "ttlt_ms": self._summary(list(self._ttlt)),
+        }
+
+
+async def stream_answer(
+    backend,
+    cache,
+    query: str,
+    context: Dict[str, Any],
+    stats: StreamStats,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield ``token`` events followed by a ``done`` event with timings, or an ``error`` event"""
+    start = time.perf_counter()
+
+    cached = cache.get(query, context) if cache is not None else None
+    if cached is not None:
+        elapsed = time.perf_counter() - start
+        stats.cached += 1
+        stats.record(elapsed, elapsed)
+        yield {"type": "token", "text": cached}
+        yield {"type": "done", "cached": True, "ttft_ms": round(elapsed * 1000, 2),
+               "ttlt_ms": round(elapsed * 1000, 2)}
+        return
+
+    parts = []
+    first_token: Optional[float] = None
+    completed = False
+    failure: Optional[Exception] = None
+    upstream = backend.stream(query, context)
+    try:
+        async for token in upstream:
+            if is_disconnected is not None and await is_disconnected():
+                break
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            parts.append(token)
+            yield {"type": "token", "text": token}
+        else:
+            completed = True
+    except Exception as e:
+        failure = e
+    finally:
+        # Runs on normal exit, on disconnect and when the response task is cancelled
+        await upstream.aclose()
+        if failure is not None:
+            stats.errors += 1
+            logger.error(f"Upstream generation failed after {len(parts)} tokens: {failure}",
+                         exc_info=failure)
+        elif not completed:
+            stats.cancelled += 1
+            logger.info(f"Client went away after {len(parts)} tokens; upstream generation stopped")
+    if failure is not None:
+        yield {"type": "error", "message": "Answer generation failed", "tokens": len(parts),
+               "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)}
+        return
+    if not completed:
+        return
+
+    last_token = time.perf_counter() - start
+    if first_token is None:
+        first_token = last_token
+    stats.completed += 1
+    stats.record(first_token, last_token)
+    if cache is not None:
+        cache.put(query, "".join(parts), context)
+    yield {"type": "done", "cached": False, "ttft_ms": round(first_token * 1000, 2),
+           "ttlt_ms": round(last_token * 1000, 2)}
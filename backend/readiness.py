@@ -0,0 +1,113 @@
+"""
+Readiness of the API worker processes.
+
+``/api/health`` only says a process is alive. ``/api/ready`` says it should
+receive traffic. A worker becomes ready once its startup warm-up has run, and
+stops being ready as soon as it starts draining on SIGTERM, so a load
+balancer stops routing to it before in-flight requests are finished.
+
+When ``serve.py`` runs several workers it points every worker at one
+``API_READY_DIR``. Each warm worker leaves a marker file named after its pid
+there, so any worker can report how many of ``API_EXPECTED_WORKERS`` are warm.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Warm / draining state of this worker and its siblings"""
+
+    def __init__(self, state_dir: Optional[str] = None, expected_workers: int = 1) -> None:
+        self.state_dir = state_dir
+        self.expected_workers = expected_workers
+        self.started_at = time.monotonic()
+        self.warm = False
+        self.draining = False
+        self.warmup_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "Readiness":
+        return cls(
+            state_dir=os.getenv("API_READY_DIR") or None,
+            expected_workers=int(os.getenv("API_EXPECTED_WORKERS", "1")),
+        )
+
+    @property
+    def _marker(self) -> Optional[str]:
+        return os.path.join(self.state_dir, str(os.getpid())) if self.state_dir else None
+
+    def mark_warm(self, warmup_ms: float) -> None:
+        self.warm = True
+        self.warmup_ms = round(warmup_ms, 1)
+        if self._marker:
+            os.makedirs(self.state_dir, exist_ok=True)
+            with open(self._marker, "w"):
+                pass
+        logger.info(f"Worker {os.getpid()} warm in {self.warmup_ms} ms")
+
+    def start_draining(self) -> None:
+        if not self.draining:
+            self.draining = True
+            self._remove_marker()
+            logger.info(f"Worker {os.getpid()} draining")
+
+    def close(self) -> None:
+        self.warm = False
+        self._remove_marker()
+
+    def _remove_marker(self) -> None:
+        if self._marker:
+            try:
+                os.remove(self._marker)
+            except FileNotFoundError:
+                pass
+
+    def warm_workers(self) -> int:
+        if not self.state_dir:
+            return int(self.warm and not self.draining)
+        try:
+            names = os.listdir(self.state_dir)
+        except FileNotFoundError:
+            return 0
+        count = 0
+        for name in names:
+            try:
+                # Markers of workers that died without cleaning up are skipped
+                os.kill(int(name), 0)
+            except (ValueError, ProcessLookupError):
+                continue
+            except PermissionError:
+                pass
+            count += 1
+        return count
+
+    def status(self) -> Dict[str, Any]:
+        warm_workers = self.warm_workers()
+        return {
+            # A warm worker can serve even while a restarted sibling warms up
+            "ready": self.warm and not self.draining,
+            "warm": self.warm,
+            "draining": self.draining,
+            "pid": os.getpid(),
+            "workers_warm": warm_workers,
+            "workers_expected": self.expected_workers,
+            "all_workers_warm": warm_workers >= self.expected_workers,
+            "warmup_ms": self.warmup_ms,
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+        }
+
+
+_readiness: Optional[Readiness] = None
+
+
+def get_readiness() -> Readiness:
+    """Process-wide readiness state shared by the app and the server"""
+    global _readiness
+    if _readiness is None:
+        _readiness = Readiness.from_env()
+    return _readiness
@@ -0,0 +1,273 @@
+"""
+TTL + LRU response cache for travel questions.
+
+Entries are keyed on the normalized query text plus the request context.
+When an embedder is configured (``RESPONSE_CACHE_SEMANTIC=true``), a miss on
+the exact key falls back to a cosine-similarity scan over entries with the
+same context, so near-identical wordings ("what are the visa rules for
+Frankfurt" / "so what are the visa rules for Frankfurt, please?") share one
+answer. Embeddings keep every word plus
+word pairs, so "London to Paris" and "Paris to London" stay apart, and a
+paraphrase only matches when it has the same numbers and negations.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+_CONTRACTION = re.compile(r"n['’]t\b")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be can could do does for from have how i in is it me "
+    "my of on or please tell the to what whats when where which will with would you".split()
+)
+
+_NEGATIONS = frozenset("no not never none nothing nobody neither nor without".split())
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def context_key(context: Optional[Dict[str, Any]]) -> str:
+    """Stable string form of a ``TravelQuery.context`` dict"""
+    if not context:
+        return ""
+    return json.dumps(context, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def content_tokens(text: str):
+    """Normalized words of a query with stopwords dropped"""
+    for word in normalize_query(text).split():
+        if word in _STOPWORDS:
+            continue
+        # Crude plural folding so "visas" and "visa" land in one bucket
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        yield word
+
+
+def query_words(text: str):
+    """Normalized words of a query with stopwords kept and "n't" spelled out as not"""
+    for word in normalize_query(_CONTRACTION.sub(" not", text.lower())).split():
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        yield word
+
+
+def query_guard(text: str) -> Tuple[Tuple[str, ...], int]:
+    """Numbers and negations a paraphrase must share to reuse an answer"""
+    numbers = tuple(_NUMBER.findall(text.replace(",", "")))
+    negations = sum(1 for word in query_words(text) if word in _NEGATIONS)
+    return numbers, negations
+
+
+class HashingEmbedder:
+    """Dependency-free embedding of words and word pairs using the hashing trick"""
+
+    def __init__(self, dimensions: int = 1024) -> None:
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> Dict[int, float]:
+        vector: Dict[int, float] = {}
+        words = list(query_words(text))
+        # Word pairs keep the order that matters ("london to paris")
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest, "little") % self.dimensions
+            vector[index] = vector.get(index, 0.0) + 1.0
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm:
+            for index in vector:
+                vector[index] /= norm
+        return vector
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two L2-normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "context", "embedding", "guard")
+
+    def __init__(self, value: str, expires_at: float, context: str, embedding, guard) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.context = context
+        self.embedding = embedding
+        self.guard = guard
+
+
+class ResponseCache:
+    """Bounded LRU cache with per-entry TTL and optional semantic lookup"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        embedder: Optional[HashingEmbedder] = None,
+        similarity_threshold: float = 0.85,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _live(self, key: Tuple[str, str], entry: _Entry, now: float) -> bool:
+        if entry.expires_at > now:
+            return True
+        del self._entries[key]
+        self.expirations += 1
+        return False
+
+    def get(self, query: str, context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        now = self._clock()
+        ctx = context_key(context)
+        key = (normalize_query(query), ctx)
+
+        entry = self._entries.get(key)
+        if entry is not None and self._live(key, entry, now):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+        if self.embedder is not None:
+            match = self._semantic_lookup(query, ctx, now)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.hits += 1
+                self.semantic_hits += 1
+                return self._entries[match].value
+
+        self.misses += 1
+        return None
+
+    def _semantic_lookup(self, query: str, ctx: str, now: float) -> Optional[Tuple[str, str]]:
+        probe = self.embedder.embed(query)
+        if not probe:
+            return None
+        guard = query_guard(query)
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in list(self._entries.items()):
+            if entry.context != ctx or entry.embedding is None or entry.guard != guard:
+                continue
+            if not self._live(key, entry, now):
+                continue
+            score = cosine(probe, entry.embedding)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def put(self, query: str, value: str, context: Optional[Dict[str, Any]] = None) -> None:
+        ctx = context_key(context)
+        key = (normalize_query(query), ctx)
+        if self.embedder is not None:
+            embedding, guard = self.embedder.embed(query), query_guard(query)
+        else:
+            embedding = guard = None
+        self._entries[key] = _Entry(value, self._clock() + self.ttl, ctx, embedding, guard)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_generate(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        generate: Callable[[], Awaitable[str]],
+    ) -> str:
+        cached = self.get(query, context)
+        if cached is not None:
+            return cached
+        value = await generate()
+        self.put(query, value, context)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def last_user_text(chat_ctx) -> str:
+    """Text of the most recent user message in a chat context"""
+    for item in reversed(chat_ctx.items):
+        if getattr(item, "type", None) == "message" and item.role == "user":
+            return item.text_content or ""
+    return ""
+
+
+def opening_turn(chat_ctx) -> bool:
+    """Whether the most recent user message is the first one of the conversation"""
+    users = sum(1 for item in chat_ctx.items
+                if getattr(item, "type", None) == "message" and item.role == "user")
+    return users == 1
+
+
+def turn_used_tools(chat_ctx) -> bool:
+    """Whether tool calls were made since the most recent user message"""
+    for item in reversed(chat_ctx.items):
+        if getattr(item, "type", None) in ("function_call", "function_call_output"):
+            return True
+        if getattr(item, "type", None) == "message" and item.role == "user":
+            return False
+    return False
+
+
+def agent_turn_cacheable(chat_ctx, min_words: int) -> bool:
+    """Whether the voice agent may share its reply to the latest user message
+
+    Only a session's opening question of at least ``min_words`` words, answered
+    without tool calls. The agent's ``llm_node`` and the load test both use this.
+    """
+    return (len(last_user_text(chat_ctx).split()) >= min_words and opening_turn(chat_ctx)
+            and not turn_used_tools(chat_ctx))
+
+
+def response_cache_from_env(semantic: Optional[bool] = None) -> ResponseCache:
+    """Build a cache configured by ``RESPONSE_CACHE_*`` environment variables
+
+    ``semantic`` overrides ``RESPONSE_CACHE_SEMANTIC`` (off by default).
+    """
+    if semantic is None:
+        semantic = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        embedder=HashingEmbedder() if semantic else None,
+        similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.85")),
+    )
@@ -0,0 +1,144 @@
+"""
+JSON serialization and pre-encoded response bodies for the API.
+
+``dumps`` uses orjson when it is installed and falls back to the standard
+library with the same compact output. Responses that do not change between
+requests are serialized once into a ``CachedBody``. Its gzip and brotli
+variants are compressed on first use and then reused, so serving them costs
+a dict lookup. ``negotiate`` picks the variant from ``Accept-Encoding``.
+
+Maximum compression levels only pay off for bodies that are compressed once.
+Bodies built per request (``fast=True``) use cheap levels, since they are
+compressed on the event loop every time.
+
+Only the standard library is required; orjson and brotli are optional.
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this are sent as-is; compressing them saves nothing
+COMPRESS_MIN_BYTES = 512
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# For bodies compressed on every request
+GZIP_FAST_LEVEL = 5
+BROTLI_FAST_QUALITY = 4
+
+# Most preferred first
+ENCODINGS: Tuple[str, ...] = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, as FastAPI's JSONResponse would render it"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def compress(body: bytes, encoding: str, fast: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_FAST_QUALITY if fast else BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0 keeps the output, and so any ETag derived from it, stable
+        return gzip.compress(body, compresslevel=GZIP_FAST_LEVEL if fast else GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """Best encoding the client accepts, or None for the identity body"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        # Ties go to the server's preference order
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CachedBody:
+    """Pre-serialized response, its validator and its compressed variants"""
+
+    __slots__ = ("body", "etag", "media_type", "fast", "_variants")
+
+    def __init__(self, body: bytes, etag: str, media_type: str = "application/json",
+                 fast: bool = False) -> None:
+        self.body = body
+        self.etag = etag
+        self.media_type = media_type
+        # Built for one request: compress cheaply rather than as small as possible
+        self.fast = fast
+        self._variants: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_payload(cls, payload: Any, etag: Optional[str] = None, fast: bool = False) -> "CachedBody":
+        body = dumps(payload)
+        if etag is None:
+            etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        return cls(body, etag, fast=fast)
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= COMPRESS_MIN_BYTES
+
+    def encoded(self, encoding: str) -> bytes:
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = self._variants[encoding] = compress(self.body, encoding, self.fast)
+        return variant
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Body to send and its Content-Encoding (None for identity)"""
+        if not self.compressible:
+            return self.body, None
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            return self.body, None
+        return self.encoded(encoding), encoding
+
+    def sizes(self) -> Dict[str, int]:
+        return {"identity": len(self.body), **{name: len(self.encoded(name)) for name in ENCODINGS}}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header covers the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == bare:
+            return True
+    return False
@@ -0,0 +1,180 @@
+"""
+Per-session LiveKit room admission.
+
+Each caller gets their own room (``travel-<id>``) instead of everyone sharing
+``business-travel-room``. Issuing a token reserves nothing: the rooms in use
+are read from LiveKit itself, i.e. rooms with this prefix that have
+participants. A page load that never joins holds no slot, and a room frees
+up as soon as its caller leaves. Every API process sees the same count.
+LiveKit dispatch picks each room's agent worker from the load the workers
+report (``worker_load``); the registry only stops issuing new rooms once
+``ROOM_CAPACITY`` are in use.
+
+Rooms issued in the last ``ROOM_JOIN_GRACE`` seconds that LiveKit does not
+list yet also count against capacity, in the process that issued them, so a
+burst of requests between two refreshes cannot overshoot.
+
+Placement is deliberately not done here. A room name cannot be pinned to an
+agent worker: LiveKit dispatches each new room to an available worker, and a
+worker stops taking jobs once its reported load reaches
+``AGENT_LOAD_THRESHOLD`` (``worker_load``). That is the per-worker capacity
+and least-loaded placement. LiveKit's own room list is the shared store, so
+there is no Redis-style backend to keep in sync with it.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RoomCapacityError(RuntimeError):
+    """Raised when every room the agents can serve is in use"""
+
+
+class LiveKitRooms:
+    """Lists rooms through the LiveKit server API, connecting on first use"""
+
+    def __init__(self, url: str, api_key: str, api_secret: str) -> None:
+        self.url = url
+        self._api_key = api_key
+        self._api_secret = api_secret
+        self._api = None
+
+    async def __call__(self) -> Iterable[Any]:
+        from livekit import api
+
+        if self._api is None:
+            # The client owns an HTTP session, so it is created on the serving loop
+            self._api = api.LiveKitAPI(self.url, self._api_key, self._api_secret)
+        response = await self._api.room.list_rooms(api.ListRoomsRequest())
+        return response.rooms
+
+    async def aclose(self) -> None:
+        if self._api is not None:
+            await self._api.aclose()
+            self._api = None
+
+
+class RoomRegistry:
+    """Hands out per-session room names while LiveKit has rooms to spare"""
+
+    def __init__(
+        self,
+        list_rooms: Optional[Callable[[], Awaitable[Iterable[Any]]]] = None,
+        capacity: int = 25,
+        prefix: str = "travel",
+        refresh_interval: float = 2.0,
+        join_grace: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._list_rooms = list_rooms
+        self.capacity = capacity
+        self.prefix = prefix
+        self.refresh_interval = refresh_interval
+        self.join_grace = join_grace
+        self._clock = clock
+        # Room -> participants, as LiveKit last listed them
+        self._active: Dict[str, int] = {}
+        # Room -> when this process issued it, until LiveKit lists it
+        self._pending: Dict[str, float] = {}
+        self._refreshed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.allocated = 0
+        self.rejected = 0
+        self.refresh_errors = 0
+
+    def _stale(self, now: float) -> bool:
+        return self._refreshed_at is None or now - self._refreshed_at >= self.refresh_interval
+
+    async def refresh(self, force: bool = False) -> None:
+        """Re-read the rooms in use from LiveKit, at most every ``refresh_interval``"""
+        if self._list_rooms is None or not (force or self._stale(self._clock())):
+            return
+        async with self._lock:
+            now = self._clock()
+            if not (force or self._stale(now)):
+                return
+            self._refreshed_at = now
+            try:
+                rooms = await self._list_rooms()
+            except Exception as e:
+                # Keep the last count; the next refresh tries again
+                self.refresh_errors += 1
+                logger.warning(f"Could not list LiveKit rooms: {e}")
+                return
+            listed = {room.name: room.num_participants for room in rooms
+                      if room.name.startswith(f"{self.prefix}-")}
+            self._active = {name: count for name, count in listed.items() if count > 0}
+            for name in listed:
+                self._pending.pop(name, None)
+
+    def _expire_pending(self, now: float) -> None:
+        for name, issued_at in list(self._pending.items()):
+            if now - issued_at >= self.join_grace:
+                del self._pending[name]
+
+    def in_use(self) -> int:
+        return len(self._active) + len(self._pending)
+
+    async def allocate(self) -> str:
+        """Name a new room for one session, or raise ``RoomCapacityError``"""
+        return (await self.allocate_many(1))[0]
+
+    async def allocate_many(self, count: int) -> List[str]:
+        """Name ``count`` new rooms, all or none, or raise ``RoomCapacityError``"""
+        await self.refresh()
+        now = self._clock()
+        self._expire_pending(now)
+        # No await between the check and the reservation, so a batch never half-fills
+        if self.in_use() + count > self.capacity:
+            self.rejected += count
+            raise RoomCapacityError(
+                f"{count} room(s) requested but only {max(self.capacity - self.in_use(), 0)} "
+                f"of {self.capacity} agent rooms are free"
+            )
+        rooms = [f"{self.prefix}-{uuid.uuid4().hex[:12]}" for _ in range(count)]
+        for room in rooms:
+            self._pending[room] = now
+        self.allocated += count
+        return rooms
+
+    async def aclose(self) -> None:
+        aclose = getattr(self._list_rooms, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "capacity": self.capacity,
+            "active_rooms": len(self._active),
+            "participants": sum(self._active.values()),
+            "pending_rooms": len(self._pending),
+            "allocated": self.allocated,
+            "rejected": self.rejected,
+            "refresh_errors": self.refresh_errors,
+            "refreshed_s_ago": round(now - self._refreshed_at, 2) if self._refreshed_at is not None else None,
+        }
+
+
+def registry_from_env() -> RoomRegistry:
+    """Build a registry from ``ROOM_*`` settings and the LiveKit credentials"""
+    url = os.getenv("LIVEKIT_URL")
+    api_key = os.getenv("LIVEKIT_API_KEY")
+    api_secret = os.getenv("LIVEKIT_API_SECRET")
+    if url and api_key and api_secret:
+        list_rooms = LiveKitRooms(url, api_key, api_secret)
+    else:
+        list_rooms = None
+        logger.warning("LiveKit credentials not set; counting only rooms issued by this process")
+    return RoomRegistry(
+        list_rooms=list_rooms,
+        capacity=int(os.getenv("ROOM_CAPACITY", "25")),
+        refresh_interval=float(os.getenv("ROOM_REFRESH_SECONDS", "2")),
+        join_grace=float(os.getenv("ROOM_JOIN_GRACE", "30")),
+    )
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Production server for the API.
+
+Runs ``main:app`` under uvicorn with:
+
+- ``API_WORKERS`` worker processes (``auto`` sizes to the CPUs this container
+  may use, honouring cgroup quotas); one while ``SESSION_ROUTES`` is enabled,
+  because sessions live in a single process
+- uvloop and httptools when installed (``uvicorn[standard]``)
+- graceful drain on SIGTERM: the worker reports not ready on ``/api/ready``
+  for ``API_DRAIN_SECONDS`` so the load balancer stops routing to it, then
+  stops accepting connections and gives in-flight requests
+  ``API_GRACEFUL_TIMEOUT`` seconds to finish
+- keep-alive held for ``API_KEEPALIVE_TIMEOUT`` seconds, longer than the
+  usual 60 second load balancer idle timeout so the proxy closes first
+
+``--reload`` (or ``API_RELOAD=1``) runs the single-process auto-reloading
+development server instead.
+"""
+
+import argparse
+import logging
+import math
+import os
+import signal
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import uvicorn
+
+from readiness import get_readiness
+from session_store import session_routes_enabled
+
+logger = logging.getLogger(__name__)
+
+APP = "main:app"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, capped by a cgroup v2/v1 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def worker_count(value: str) -> int:
+    return available_cpus() if value == "auto" else max(1, int(value))
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that reports not ready for a while before shutting down"""
+
+    def __init__(self, config: uvicorn.Config, drain_seconds: float = 0.0) -> None:
+        super().__init__(config)
+        self.drain_seconds = drain_seconds
+        self._drain_deadline: Optional[float] = None
+
+    def handle_exit(self, sig: int, frame: Any) -> None:
+        # Only SIGTERM drains; Ctrl+C and a second signal exit right away
+        if sig == signal.SIGTERM and self.drain_seconds > 0 and self._drain_deadline is None:
+            get_readiness().start_draining()
+            self._drain_deadline = time.monotonic() + self.drain_seconds
+            return
+        get_readiness().start_draining()
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self._drain_deadline is not None and time.monotonic() >= self._drain_deadline:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+def server_options() -> Dict[str, Any]:
+    """uvicorn settings for serve mode, from the environment"""
+    options: Dict[str, Any] = {
+        "host": os.getenv("HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT", "8000")),
+        # "auto" picks uvloop / httptools when they are installed
+        "loop": os.getenv("API_LOOP", "auto"),
+        "http": os.getenv("API_HTTP", "auto"),
+        "timeout_keep_alive": int(os.getenv("API_KEEPALIVE_TIMEOUT", "75")),
+        "timeout_graceful_shutdown": int(os.getenv("API_GRACEFUL_TIMEOUT", "20")),
+        "backlog": int(os.getenv("API_BACKLOG", "2048")),
+        "proxy_headers": True,
+        "forwarded_allow_ips": os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        "access_log": os.getenv("API_ACCESS_LOG", "false").lower() == "true",
+    }
+    if os.getenv("API_LIMIT_CONCURRENCY"):
+        options["limit_concurrency"] = int(os.getenv("API_LIMIT_CONCURRENCY"))
+    return options
+
+
+def serve(workers: int, drain_seconds: float) -> None:
+    options = server_options()
+    if workers > 1 and session_routes_enabled():
+        logger.warning(f"/session/* keeps sessions in one process; serving with 1 worker instead of "
+                       f"{workers} (set SESSION_ROUTES=false to run more)")
+        workers = 1
+    if workers > 1:
+        # Workers are spawned after this, so they all inherit the shared state dir
+        os.environ["API_READY_DIR"] = tempfile.mkdtemp(prefix="api-ready-")
+        os.environ["API_EXPECTED_WORKERS"] = str(workers)
+
+    config = uvicorn.Config(APP, workers=workers, **options)
+    server = DrainingServer(config, drain_seconds=drain_seconds)
+    logger.info(f"Serving {APP} on {options['host']}:{options['port']} with {workers} worker(s), "
+                f"loop={options['loop']}, http={options['http']}, "
+                f"keep-alive {options['timeout_keep_alive']}s, drain {drain_seconds}s")
+    if workers > 1:
+        from uvicorn.supervisors import Multiprocess
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+def serve_dev() -> None:
+    """Single process with auto-reload; not for production"""
+    uvicorn.run(APP, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")), reload=True)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the Business Travel Assistant API")
+    parser.add_argument("--workers", default=os.getenv("API_WORKERS", "1"),
+                        help="Worker processes, or 'auto' to match available CPUs")
+    parser.add_argument("--drain-seconds", type=float, default=float(os.getenv("API_DRAIN_SECONDS", "5")),
+                        help="How long a worker reports not ready after SIGTERM before it stops accepting")
+    parser.add_argument("--reload", action="store_true",
+                        default=os.getenv("API_RELOAD", "false").lower() in ("1", "true"),
+                        help="Run the auto-reloading development server")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.reload:
+        serve_dev()
+    else:
+        serve(worker_count(args.workers), args.drain_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+In-process session store for ``/session/*``.
+
+Sessions live in an ``OrderedDict`` ordered by last activity, so lookup,
+touch and idle eviction are all O(1) per session. Records use ``__slots__``
+to keep 100k concurrent sessions cheap, and the store is bounded by
+``max_sessions`` (least recently active sessions go first).
+
+Session ids are random and every session has an owner token, returned once
+by ``start``; reading, updating or ending a session requires it.
+
+With ``log_path`` set every mutation is appended to a JSON-lines log that is
+replayed on startup, so a restarted API process recovers its sessions. Writes
+happen on a single writer thread, off the event loop, and the log is
+compacted down to the live sessions whenever it grows past twice their
+number.
+
+The store is per process, so ``/session/*`` needs a single API worker:
+``serve.py`` runs one worker while ``SESSION_ROUTES`` is enabled (the
+default). The log lock (``<log>.lock``) only guards against a second process
+pointed at the same file.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class SessionRecord:
+    __slots__ = ("session_id", "user_id", "token_hash", "status", "preferences", "state",
+                 "created_at", "last_seen")
+
+    def __init__(self, session_id: str, user_id: str, token_hash: str, preferences: Dict[str, Any],
+                 created_at: float, state: Optional[Dict[str, Any]] = None) -> None:
+        self.session_id = session_id
+        self.user_id = user_id
+        self.token_hash = token_hash
+        self.status = "active"
+        self.preferences = preferences
+        self.state = state if state is not None else {}
+        self.created_at = created_at
+        self.last_seen = created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "preferences": self.preferences,
+            "state": self.state,
+            "created_at": self.created_at,
+            "last_seen": self.last_seen,
+        }
+
+    def owned_by(self, token: Optional[str]) -> bool:
+        return bool(token) and hmac.compare_digest(self.token_hash, _token_hash(token))
+
+
+class SessionStore:
+    """Bounded, idle-evicting session map with an optional append-only log"""
+
+    def __init__(
+        self,
+        idle_timeout: float = 1800.0,
+        max_sessions: int = 100000,
+        log_path: Optional[str] = None,
+        compact_min_entries: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.compact_min_entries = compact_min_entries
+        self._clock = clock
+        self._sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._log = None
+        self._lock_file = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._log_entries = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+        self.compactions = 0
+        self.log_path = log_path if log_path and self._acquire_log(log_path) else None
+        if self.log_path:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-log")
+            self._recover(self.log_path)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # Persistence -------------------------------------------------------
+
+    def _acquire_log(self, path: str) -> bool:
+        """Become the only process writing ``path``; False if another API worker is"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if fcntl is None:
+            return True
+        lock_file = open(f"{path}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            logger.warning(f"{path} is owned by another process; sessions here are not persisted")
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _recover(self, path: str) -> None:
+        start = time.perf_counter()
+        replayed = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as log:
+                for line in log:
+                    self._log_entries += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write from a crash; everything before it is valid
+                        logger.warning("Skipping truncated session log entry")
+                        continue
+                    self._apply(entry)
+                    replayed += 1
+        self.evict_idle()
+        # Start from a log holding only the live sessions
+        self.compact()
+        logger.info(
+            f"Recovered {len(self._sessions)} sessions from {replayed} log entries "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        session_id = entry.get("session_id")
+        if op == "start":
+            record = SessionRecord(session_id, entry["user_id"], entry["token_hash"],
+                                   entry.get("preferences", {}), entry["ts"], entry.get("state"))
+            record.last_seen = entry.get("last_seen", entry["ts"])
+            self._sessions[session_id] = record
+            self._sessions.move_to_end(session_id)
+        elif op == "update" and session_id in self._sessions:
+            record = self._sessions[session_id]
+            record.preferences.update(entry.get("preferences") or {})
+            record.state.update(entry.get("state") or {})
+            record.last_seen = entry["ts"]
+            self._sessions.move_to_end(session_id)
+        elif op == "end":
+            self._sessions.pop(session_id, None)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if not self.log_path:
+            return
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        self._writer.submit(self._write, line)
+        self._log_entries += 1
+        if self._log_entries > max(self.compact_min_entries, 2 * len(self._sessions)):
+            self.compact()
+
+    def _write(self, line: str) -> None:
+        # Writer thread only
+        try:
+            if self._log is None:
+                self._log = open(self.log_path, "a", encoding="utf-8")
+            self._log.write(line)
+            self._log.flush()
+        except OSError as e:
+            logger.error(f"Could not append to session log: {e}")
+
+    def compact(self) -> None:
+        """Replace the log with one ``start`` entry per live session
+
+        The snapshot is taken here; it is written on the writer thread after
+        every entry appended before it, and later entries go to the new log.
+        """
+        if not self.log_path:
+            return
+        snapshot = [(record.session_id, record.user_id, record.token_hash, dict(record.preferences),
+                     dict(record.state), record.created_at, record.last_seen)
+                    for record in self._sessions.values()]
+        self._log_entries = len(snapshot)
+        self.compactions += 1
+        self._writer.submit(self._rewrite, snapshot)
+
+    def _rewrite(self, snapshot: List[Tuple]) -> None:
+        # Writer thread only
+        start = time.perf_counter()
+        tmp_path = f"{self.log_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as log:
+                for session_id, user_id, token_hash, preferences, state, created_at, last_seen in snapshot:
+                    log.write(json.dumps({
+                        "op": "start",
+                        "session_id": session_id,
+                        "user_id": user_id,
+                        "token_hash": token_hash,
+                        "preferences": preferences,
+                        "state": state,
+                        "ts": created_at,
+                        "last_seen": last_seen,
+                    }, separators=(",", ":"), default=str) + "\n")
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            os.replace(tmp_path, self.log_path)
+        except OSError as e:
+            logger.error(f"Could not compact session log: {e}")
+            return
+        logger.info(f"Compacted session log to {len(snapshot)} sessions "
+                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # Operations --------------------------------------------------------
+
+    def start(self, user_id: str, preferences: Optional[Dict[str, Any]] = None) -> Tuple[SessionRecord, str]:
+        """Create a session; returns it with the owner token, which is not stored"""
+        now = self._clock()
+        self.evict_idle(now)
+        session_id = f"session_{secrets.token_urlsafe(16)}"
+        token = secrets.token_urlsafe(32)
+        record = SessionRecord(session_id, user_id, _token_hash(token), dict(preferences or {}), now)
+        self._sessions[session_id] = record
+        self._append({"op": "start", "session_id": session_id, "user_id": user_id,
+                      "token_hash": record.token_hash, "preferences": record.preferences, "ts": now})
+        while len(self._sessions) > self.max_sessions:
+            oldest_id, _ = self._sessions.popitem(last=False)
+            self.evicted_capacity += 1
+            self._append({"op": "end", "session_id": oldest_id, "ts": now})
+        return record, token
+
+    def _live(self, session_id: str, token: Optional[str], now: float) -> Optional[SessionRecord]:
+        record = self._sessions.get(session_id)
+        if record is None or not record.owned_by(token):
+            return None
+        if now - record.last_seen > self.idle_timeout:
+            self._expire(session_id)
+            return None
+        return record
+
+    def get(self, session_id: str, token: Optional[str]) -> Optional[SessionRecord]:
+        """The live session, if ``token`` is its owner's; None otherwise
+
+        A read counts as activity, so a session that is only polled is not
+        idle-evicted.
+        """
+        now = self._clock()
+        record = self._live(session_id, token, now)
+        if record is None:
+            return None
+        record.last_seen = now
+        self._sessions.move_to_end(session_id)
+        self._append({"op": "update", "session_id": session_id, "ts": now})
+        return record
+
+    def update(self, session_id: str, token: Optional[str], preferences: Optional[Dict[str, Any]] = None,
+               state: Optional[Dict[str, Any]] = None) -> Optional[SessionRecord]:
+        """Merge preferences/state into a live session and mark it active"""
+        now = self._clock()
+        record = self._live(session_id, token, now)
+        if record is None:
+            return None
+        if preferences:
+            record.preferences.update(preferences)
+        if state:
+            record.state.update(state)
+        record.last_seen = now
+        self._sessions.move_to_end(session_id)
+        self._append({"op": "update", "session_id": session_id, "preferences": preferences,
+                      "state": state, "ts": now})
+        return record
+
+    def end(self, session_id: str, token: Optional[str]) -> Optional[SessionRecord]:
+        record = self._sessions.get(session_id)
+        if record is None or not record.owned_by(token):
+            return None
+        del self._sessions[session_id]
+        record.status = "inactive"
+        self._append({"op": "end", "session_id": session_id, "ts": self._clock()})
+        return record
+
+    def _expire(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self.evicted_idle += 1
+        self._append({"op": "end", "session_id": session_id, "ts": self._clock()})
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions idle past the timeout; stops at the first active one"""
+        now = self._clock() if now is None else now
+        evicted = 0
+        while self._sessions:
+            session_id, record = next(iter(self._sessions.items()))
+            if now - record.last_seen <= self.idle_timeout:
+                break
+            self._expire(session_id)
+            evicted += 1
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "evicted_idle": self.evicted_idle,
+            "evicted_capacity": self.evicted_capacity,
+            "persistent": bool(self.log_path),
+            "log_entries": self._log_entries,
+            "compactions": self.compactions,
+        }
+
+
+def session_routes_enabled() -> bool:
+    """Whether the API serves ``/session/*`` (``SESSION_ROUTES``, default true)"""
+    return os.getenv("SESSION_ROUTES", "true").lower() in ("1", "true")
+
+
+def session_store_from_env() -> SessionStore:
+    """Build a store from ``SESSION_*`` environment variables"""
+    return SessionStore(
+        idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT", "1800")),
+        max_sessions=int(os.getenv("SESSION_MAX", "100000")),
+        log_path=os.getenv("SESSION_LOG_PATH") or None,
+        compact_min_entries=int(os.getenv("SESSION_LOG_COMPACT_MIN", "10000")),
+    )
@@ -0,0 +1,240 @@
+"""
+Speculative LLM generation on interim STT transcripts.
+
+Deepgram sends interim hypotheses while the caller is still talking. Once the
+same hypothesis has been seen ``stable_after`` times in a row, ``Speculator``
+starts the LLM request in the background and buffers its chunks. When the turn
+ends, the final transcript is compared with the hypothesis:
+
+- close enough (word divergence <= ``max_divergence``): the buffered and
+  still-streaming chunks are committed as the reply, so the LLM's time to
+  first token overlaps the end-of-utterance delay
+- too different, or the speculative request failed: it is cancelled and the
+  reply is generated normally from the final transcript
+
+A committed speculation is handed over as its replay stream; closing that
+stream (an interruption) cancels the LLM request.
+
+Only filler and function words may differ. A changed number or negation, or a
+content word the final adds ("... under 300 euros", "... in business class"),
+asks a different question, so it always discards the speculation.
+
+Stats track the latency saved by committed speculations and the words of
+output wasted by discarded ones.
+"""
+
+import asyncio
+import difflib
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from response_cache import content_tokens, normalize_query, query_guard, query_words
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+# Hesitations STT sometimes transcribes; they never change the question
+_FILLERS = frozenset("um uh uhm er erm ah hmm mm".split())
+
+
+def divergence(hypothesis: str, final: str) -> float:
+    """Fraction of words that differ between two transcripts (0 = identical, 1 = different question)"""
+    if query_guard(hypothesis) != query_guard(final):
+        return 1.0
+    if set(content_tokens(final)) - set(content_tokens(hypothesis)) - _FILLERS:
+        # The caller added a constraint the speculative reply never saw
+        return 1.0
+    a = list(query_words(hypothesis))
+    b = list(query_words(final))
+    if not a and not b:
+        return 0.0
+    return 1.0 - difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def chunk_text(chunk: Any) -> str:
+    """Text content of an LLM stream chunk (plain string or ``ChatChunk``)"""
+    if isinstance(chunk, str):
+        return chunk
+    delta = getattr(chunk, "delta", None)
+    return (getattr(delta, "content", None) or "") if delta is not None else ""
+
+
+class Speculation:
+    """One in-flight speculative LLM request and its buffered output"""
+
+    def __init__(self, hypothesis: str, stream: AsyncIterator[Any], text_of: Callable[[Any], str]) -> None:
+        self.hypothesis = hypothesis
+        self.started = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+        self.chunks: List[Any] = []
+        self.words = 0
+        self.error: Optional[Exception] = None
+        self._stream = stream
+        self._text_of = text_of
+        self._updated = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            async for chunk in self._stream:
+                if self.first_chunk_at is None:
+                    self.first_chunk_at = time.perf_counter()
+                self.chunks.append(chunk)
+                self.words += len(self._text_of(chunk).split())
+                self._updated.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Speculative LLM request failed: {e}")
+            self.error = e
+            self.chunks.append(e)
+        finally:
+            self.chunks.append(_DONE)
+            self._updated.set()
+            aclose = getattr(self._stream, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception:
+                    pass
+
+    @property
+    def done(self) -> bool:
+        return self._task.done()
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    async def replay(self) -> AsyncIterator[Any]:
+        """Yield buffered chunks, then live ones until the request finishes
+
+        The replay owns the request: closing it early (the caller barged in)
+        cancels the upstream stream.
+        """
+        index = 0
+        try:
+            while True:
+                while index < len(self.chunks):
+                    chunk = self.chunks[index]
+                    index += 1
+                    if chunk is _DONE:
+                        return
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    yield chunk
+                self._updated.clear()
+                if index < len(self.chunks):
+                    continue
+                await self._updated.wait()
+        finally:
+            self.cancel()
+
+
+class Speculator:
+    """Starts, commits and discards speculative replies for one session"""
+
+    def __init__(
+        self,
+        generate: Callable[[str], AsyncIterator[Any]],
+        stable_after: int = 2,
+        min_words: int = 3,
+        max_divergence: float = 0.15,
+        text_of: Callable[[Any], str] = chunk_text,
+    ) -> None:
+        self.generate = generate
+        self.stable_after = stable_after
+        self.min_words = min_words
+        self.max_divergence = max_divergence
+        self.text_of = text_of
+        self.current: Optional[Speculation] = None
+        self._last_interim = ""
+        self._repeats = 0
+        self.started = 0
+        self.committed = 0
+        self.discarded = 0
+        self.wasted_words = 0
+        self.saved_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, generate: Callable[[str], AsyncIterator[Any]]) -> "Speculator":
+        return cls(
+            generate,
+            stable_after=int(os.getenv("SPECULATIVE_STABLE_INTERIMS", "2")),
+            min_words=int(os.getenv("SPECULATIVE_MIN_WORDS", "3")),
+            max_divergence=float(os.getenv("SPECULATIVE_MAX_DIVERGENCE", "0.15")),
+        )
+
+    def on_interim(self, text: str) -> None:
+        """Feed an interim transcript; may start or cancel a speculation"""
+        normalized = normalize_query(text)
+        if normalized == self._last_interim:
+            self._repeats += 1
+        else:
+            self._last_interim = normalized
+            self._repeats = 1
+
+        current = self.current
+        if current is not None and divergence(current.hypothesis, text) > self.max_divergence:
+            # The caller kept talking past the hypothesis; its reply is stale
+            self._discard()
+            current = None
+
+        if (current is None and self._repeats >= self.stable_after
+                and len(normalized.split()) >= self.min_words):
+            self.current = Speculation(text, self.generate(text), self.text_of)
+            self.started += 1
+
+    def take(self, final: str) -> Optional[AsyncIterator[Any]]:
+        """Commit the speculation if it matches the final transcript"""
+        current = self.current
+        self._reset()
+        if current is None:
+            return None
+        if current.error is not None or divergence(current.hypothesis, final) > self.max_divergence:
+            # A failed request falls back to a normal reply instead of failing the turn
+            self._discard(current)
+            return None
+
+        now = time.perf_counter()
+        if current.first_chunk_at is not None:
+            # First token was already waiting: the whole TTFT was hidden
+            saved = current.first_chunk_at - current.started
+        else:
+            saved = now - current.started
+        self.committed += 1
+        self.saved_seconds += saved
+        logger.debug(f"Committed speculative reply, saved {saved * 1000:.0f} ms")
+        return current.replay()
+
+    def cancel(self) -> None:
+        """Drop any in-flight speculation (e.g. the reply came from cache)"""
+        if self.current is not None:
+            self._discard()
+        self._reset()
+
+    def _discard(self, speculation: Optional[Speculation] = None) -> None:
+        speculation = speculation or self.current
+        if speculation is self.current:
+            self.current = None
+        speculation.cancel()
+        self.discarded += 1
+        self.wasted_words += speculation.words
+
+    def _reset(self) -> None:
+        self.current = None
+        self._last_interim = ""
+        self._repeats = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "discarded": self.discarded,
+            "commit_rate": round(self.committed / self.started, 4) if self.started else 0.0,
+            "wasted_words": self.wasted_words,
+            "saved_ms_total": round(self.saved_seconds * 1000, 1),
+            "saved_ms_avg": round(self.saved_seconds * 1000 / self.committed, 1) if self.committed else 0.0,
+        }
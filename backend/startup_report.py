@@ -0,0 +1,107 @@
+"""
+Cold-start import profiling for the API process.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+turns the raw stderr trace into a ranked per-module breakdown.
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules the API process must not pull in at import time; they belong to
+# the agent worker or are imported lazily by the route that needs them
+HEAVY_MODULES = (
+    "livekit.agents",
+    "livekit.plugins",
+    "livekit.api",
+    "google.generativeai",
+    "uvicorn",
+    "onnxruntime",
+    "numpy",
+)
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """Parse ``-X importtime`` output lines into ImportTiming records"""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip(" "))) // 2
+            timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return timings
+
+
+def profile_imports(module: str = "main") -> List[ImportTiming]:
+    """Import ``module`` in a clean interpreter and return its import timings"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def loaded_modules(module: str = "main") -> List[str]:
+    """Every module present in ``sys.modules`` after importing ``module``"""
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print('\\n'.join(sorted(sys.modules)))"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return result.stdout.split()
+
+
+def heavy_imports(modules: List[str]) -> List[str]:
+    return [name for name in modules if name.startswith(HEAVY_MODULES)]
+
+
+def total_import_us(timings: List[ImportTiming], module: str = "main") -> int:
+    """Cumulative import time of ``module`` itself"""
+    for timing in reversed(timings):
+        if timing.module == module and timing.depth == 0:
+            return timing.cumulative_us
+    return sum(timing.self_us for timing in timings)
+
+
+def format_report(timings: List[ImportTiming], module: str = "main", top: int = 25) -> str:
+    """Top-level packages ranked by cumulative import time"""
+    packages: Dict[str, int] = {}
+    for timing in timings:
+        root = timing.module.split(".")[0]
+        packages[root] = packages.get(root, 0) + timing.self_us
+
+    lines = [f"Cold start import report for '{module}': {total_import_us(timings, module) / 1000:.1f} ms total"]
+    lines.append(f"{'package':<32} {'self ms':>10} {'share':>7}")
+    total = sum(packages.values()) or 1
+    for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"{name:<32} {self_us / 1000:>10.1f} {self_us / total:>6.1%}")
+
+    lines.append("")
+    lines.append(f"{'slowest modules (cumulative)':<48} {'ms':>8}")
+    for timing in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{timing.module:<48} {timing.cumulative_us / 1000:>8.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,8 @@
+"""Make the backend modules importable as top-level modules, as the app imports them"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from audio_ingest import AudioIngest, SampleRing
+
+
+def _frame(samples: np.ndarray, sample_rate: int, channels: int = 1):
+    pcm = samples.astype(np.int16)
+    return SimpleNamespace(data=pcm.tobytes(), sample_rate=sample_rate, num_channels=channels,
+                           samples_per_channel=len(pcm) // channels)
+
+
+def test_sample_ring_wraps_and_returns_latest_in_order():
+    ring = SampleRing(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    ring.write(np.arange(6, 11, dtype=np.int16))
+    assert list(ring.latest(5)) == [6, 7, 8, 9, 10]
+    assert list(ring.latest(100)) == list(range(3, 11))
+
+
+def test_passthrough_frames_are_not_copied():
+    ingest = AudioIngest(sample_rate=16000)
+    frame = _frame(np.zeros(320), 16000)
+    assert ingest.process(frame) is frame
+    assert ingest.stats()["passthrough"] == 1
+
+
+def test_frame_is_converted_once_for_both_consumers():
+    ingest = AudioIngest(sample_rate=16000, consumers=2)
+    frame = _frame(np.zeros(960), 48000)
+    vad_frame = ingest.process(frame)
+    stt_frame = ingest.process(frame)
+    assert vad_frame is stt_frame
+    assert vad_frame.sample_rate == 16000 and vad_frame.samples_per_channel == 320
+    assert ingest.stats()["frames"] == 1 and ingest.stats()["shared"] == 1
+
+
+def test_resampled_tone_keeps_its_level():
+    ingest = AudioIngest(sample_rate=16000, consumers=1)
+    t = np.arange(48000) / 48000
+    tone = 10000 * np.sin(2 * np.pi * 440 * t)
+    out = []
+    for start in range(0, len(tone), 960):
+        converted = ingest.process(_frame(tone[start:start + 960], 48000))
+        out.append(np.frombuffer(converted.data, dtype=np.int16).copy())
+    samples = np.concatenate(out)[1000:].astype(np.float64)
+    assert len(np.concatenate(out)) == 16000
+    assert abs(np.sqrt(np.mean(samples ** 2)) - 10000 / np.sqrt(2)) < 300
+
+
+def test_stereo_is_downmixed():
+    ingest = AudioIngest(sample_rate=16000, consumers=1)
+    stereo = np.empty(640)
+    stereo[0::2], stereo[1::2] = 1000, 3000
+    converted = ingest.process(_frame(stereo, 16000, channels=2))
+    assert np.all(np.frombuffer(converted.data, dtype=np.int16) == 2000)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from audio_ingest import SampleRing
+from batched_vad import pending_window, speech_prefix
+from inference_batcher import VAD_SAMPLE_RATE, VAD_WINDOW
+
+
+def test_speech_prefix_takes_only_windows_before_the_speech():
+    # History ends with the two speech windows already collected for the turn
+    history = ["s1", "s2", "s3", "speech1", "speech2"]
+    assert speech_prefix(history, 2, padding=2) == ["s2", "s3"]
+    assert speech_prefix(history, 2, padding=10) == ["s1", "s2", "s3"]
+
+
+def test_speech_prefix_without_enough_history():
+    assert speech_prefix(["speech1"], 1, padding=3) == []
+    assert speech_prefix([], 0, padding=3) == []
+
+
+def test_no_window_is_duplicated_at_start_of_speech():
+    history = [f"w{i}" for i in range(6)]
+    speech = history[-2:] + ["w6"]
+    frames = speech_prefix(history, len(speech) - 1, padding=3) + speech
+    assert frames == ["w1", "w2", "w3", "w4", "w5", "w6"]
+    assert len(frames) == len(set(frames))
+
+
+def test_pending_window_reads_samples_in_order_across_wraps():
+    ring = SampleRing(VAD_SAMPLE_RATE + VAD_WINDOW)
+    samples = (np.arange(3 * VAD_SAMPLE_RATE) % 20000).astype(np.int16)
+    pending = consumed = 0
+    for start in range(0, len(samples), 320):
+        ring.write(samples[start:start + 320])
+        pending += 320
+        while pending >= VAD_WINDOW:
+            window = pending_window(ring, pending)
+            assert np.array_equal(window, samples[consumed:consumed + VAD_WINDOW])
+            consumed += VAD_WINDOW
+            pending -= VAD_WINDOW
+    assert consumed == len(samples) // VAD_WINDOW * VAD_WINDOW
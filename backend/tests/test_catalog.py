@@ -0,0 +1,14 @@
+from catalog import Catalog
+
+
+def test_only_unfiltered_pages_are_kept():
+    catalog = Catalog.load()
+    assert catalog.destinations_page() is catalog.destinations_page()
+    assert catalog.services_page() is catalog.services_page()
+    assert not catalog.destinations_page().fast
+
+    query = catalog.destinations_page(q="new", limit=5)
+    assert query.fast
+    assert catalog.destinations_page(q="new", limit=5) is not query
+    assert catalog.destinations_page(q="new", limit=5).etag == query.etag
+    assert catalog.stats()["cached_responses"] == 2
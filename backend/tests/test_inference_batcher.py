@@ -0,0 +1,53 @@
+import asyncio
+
+import numpy as np
+
+from fake_plugins import FakeVADRunner
+from inference_batcher import VAD_CONTEXT, VAD_WINDOW, BatchScheduler, VADState, run_vad_batch
+
+
+def test_run_vad_batch_gathers_and_scatters_state():
+    seen = {}
+
+    def run_arrays(inputs, states):
+        seen["inputs"], seen["states"] = inputs.copy(), states.copy()
+        return inputs[:, -1], states + 1
+
+    first, second = VADState(), VADState()
+    second.rnn[:] = 5
+    windows = [np.full(VAD_WINDOW, 0.25, dtype=np.float32), np.arange(VAD_WINDOW, dtype=np.float32)]
+    probabilities = run_vad_batch(run_arrays, [(first, windows[0]), (second, windows[1])])
+
+    assert probabilities == [0.25, float(VAD_WINDOW - 1)]
+    assert seen["inputs"].shape == (2, VAD_CONTEXT + VAD_WINDOW)
+    assert np.all(seen["states"][:, 1] == 5)
+    assert np.all(first.rnn == 1) and np.all(second.rnn == 6)
+    # Each stream's context is the tail of its own window
+    assert np.array_equal(second.context, windows[1][-VAD_CONTEXT:])
+
+
+def test_batched_results_match_one_window_at_a_time():
+    runner = FakeVADRunner()
+    rng = np.random.default_rng(1)
+    windows = rng.standard_normal((4, VAD_WINDOW)).astype(np.float32)
+    batched_states = [VADState() for _ in windows]
+    single_states = [VADState() for _ in windows]
+
+    batched = runner(list(zip(batched_states, windows)))
+    single = [runner([(state, window)])[0] for state, window in zip(single_states, windows)]
+    assert np.allclose(batched, single, atol=1e-5)
+
+
+def test_scheduler_batches_concurrent_requests():
+    async def run():
+        scheduler = BatchScheduler({"vad": FakeVADRunner()}, max_batch=8, max_delay=0.05).start()
+        try:
+            window = np.zeros(VAD_WINDOW, dtype=np.float32)
+            results = await asyncio.gather(*(scheduler.infer("vad", (VADState(), window)) for _ in range(8)))
+        finally:
+            scheduler.close()
+        return results, scheduler.stats()
+
+    results, stats = asyncio.run(run())
+    assert len(results) == 8
+    assert stats["requests"] == 8 and stats["batches"] < 8
@@ -0,0 +1,120 @@
+import functools
+import os
+import time
+
+import numpy as np
+import pytest
+
+from fake_plugins import FakeVADRunner
+from inference_batcher import VAD_WINDOW, VADState
+from inference_pool import InferencePool, PoolWorkerError
+
+
+class ExitOnRead:
+    """Probabilities that kill the worker when it reads them, after it has stored the new states"""
+
+    def __array__(self, dtype=None, copy=None):
+        os._exit(1)
+
+
+class CrashOnceRunner(FakeVADRunner):
+    """Dies mid-batch the first time any worker sees the marker"""
+
+    def __init__(self, marker: str) -> None:
+        super().__init__()
+        self.marker = marker
+
+    def run_arrays(self, inputs, states):
+        probabilities, new_states = super().run_arrays(inputs, states)
+        try:
+            os.remove(self.marker)
+        except FileNotFoundError:
+            return probabilities, new_states
+        return ExitOnRead(), new_states
+
+
+def batch(count):
+    rng = np.random.default_rng(1)
+    states = [VADState() for _ in range(count)]
+    for state in states:
+        state.rnn[:] = rng.standard_normal(state.rnn.shape).astype(np.float32)
+    windows = rng.standard_normal((count, VAD_WINDOW)).astype(np.float32) * 0.1
+    return list(zip(states, windows))
+
+
+def copy(payloads):
+    copies = []
+    for state, window in payloads:
+        clone = VADState()
+        clone.rnn[:], clone.context[:] = state.rnn, state.context
+        copies.append((clone, window))
+    return copies
+
+
+def wait_until_ready(pool, seconds=30.0):
+    deadline = time.monotonic() + seconds
+    while pool.stats()["restarting"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.stats()["restarting"] == 0
+
+
+@pytest.fixture
+def marker(tmp_path):
+    path = tmp_path / "crash"
+    path.touch()
+    return str(path)
+
+
+def test_pool_matches_in_process_runner():
+    payloads = batch(12)
+    expected_payloads = copy(payloads)
+    pool = InferencePool(processes=2, max_batch=8, min_chunk=4, runner_factory=FakeVADRunner).load()
+    try:
+        probabilities = pool(payloads)
+    finally:
+        pool.close()
+
+    expected = FakeVADRunner()(expected_payloads)
+    assert np.allclose(probabilities, expected, atol=1e-5)
+    for (state, _), (reference, _) in zip(payloads, expected_payloads):
+        assert np.allclose(state.rnn, reference.rnn, atol=1e-5)
+
+
+def test_crashed_chunk_retries_from_its_original_state(marker):
+    payloads = batch(4)
+    expected_payloads = copy(payloads)
+    pool = InferencePool(processes=2, max_batch=8, runner_factory=functools.partial(CrashOnceRunner, marker)).load()
+    try:
+        started = time.perf_counter()
+        probabilities = pool(payloads)
+        # The retry ran on the other worker instead of waiting for the respawn
+        assert time.perf_counter() - started < 1.0
+        assert pool.stats()["crashes"] == 1
+
+        # The worker wrote its new state before dying; the retry still started from the old one
+        expected = FakeVADRunner()(expected_payloads)
+        assert np.allclose(probabilities, expected, atol=1e-5)
+        for (state, _), (reference, _) in zip(payloads, expected_payloads):
+            assert np.allclose(state.rnn, reference.rnn, atol=1e-5)
+
+        wait_until_ready(pool)
+        assert pool.stats()["alive"] == 2
+    finally:
+        pool.close()
+
+
+def test_lone_worker_failure_fails_fast_and_respawns(marker):
+    pool = InferencePool(processes=1, max_batch=8, runner_factory=functools.partial(CrashOnceRunner, marker)).load()
+    try:
+        payloads = batch(2)
+        before = [state.rnn.copy() for state, _ in payloads]
+        with pytest.raises(PoolWorkerError):
+            pool(payloads)
+        # Streams keep their state when a batch fails
+        assert all(np.array_equal(state.rnn, rnn) for (state, _), rnn in zip(payloads, before))
+
+        wait_until_ready(pool)
+        assert len(pool(payloads)) == 2
+        assert pool.stats()["restarts"] == 1
+    finally:
+        pool.close()
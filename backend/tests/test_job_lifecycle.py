@@ -0,0 +1,62 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from job_lifecycle import SessionTotals, SessionTracker
+from worker_load import agent_stats
+
+
+class Session:
+    pass
+
+
+def test_worker_folds_ended_sessions_into_totals(tmp_path):
+    stats_dir = str(tmp_path)
+
+    async def run():
+        tracker = SessionTracker(linger_seconds=0.05, stats_dir=stats_dir, worker_id="w1")
+        totals = SessionTotals("w1", linger_seconds=0.05, stats_dir=stats_dir, tracker=tracker)
+        tracker.started("a")
+        tracker.started("b")
+        assert totals.fold()["active"] == 2
+
+        held = Session()
+        tracker.ending("a", "participant disconnected")
+        tracker.closed("a", Session())
+        tracker.ending("b", "idle timeout")
+        tracker.closed("b", held)
+        await asyncio.sleep(0.1)
+        return totals.fold(), held
+
+    stats, _ = asyncio.run(run())
+    assert stats["sessions"] == 2 and stats["leaked"] == 1
+    assert stats["end_reasons"] == {"participant disconnected": 1, "idle timeout": 1}
+    # Folded sessions leave only the worker's lifecycle file behind
+    assert os.listdir(stats_dir) == ["lifecycle-w1.json"]
+    assert agent_stats(stats_dir)["session_lifecycle"]["sessions"] == 2
+
+
+def test_job_process_that_died_while_closing_counts_as_lingered(tmp_path):
+    stats_dir = str(tmp_path)
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    job = {"worker": "w1", "ts": time.time(), "job_id": "c", "pid": dead.pid, "state": "closing",
+           "reason": "room disconnected", "closing_ts": time.time() - 30}
+    with open(os.path.join(stats_dir, "sessions-w1-c.json"), "w", encoding="utf-8") as f:
+        json.dump(job, f)
+
+    stats = SessionTotals("w1", linger_seconds=10, stats_dir=stats_dir).fold()
+    assert stats["sessions"] == 1 and stats["lingered"] == 1
+    assert stats["end_reasons"] == {"room disconnected": 1}
+
+
+def test_live_closing_session_is_lingering_until_it_closes(tmp_path):
+    stats_dir = str(tmp_path)
+    tracker = SessionTracker(linger_seconds=0.0, stats_dir=stats_dir, worker_id="w1")
+    tracker.started("a")
+    tracker.ending("a", "session closed")
+    stats = SessionTotals("w1", linger_seconds=0.0, stats_dir=stats_dir, tracker=tracker).fold()
+    assert stats["closing"] == 1 and stats["lingering"] == 1 and stats["sessions"] == 0
@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from latency_metrics import TurnTracer
+
+
+def llm_metrics(request_id, ttft):
+    return SimpleNamespace(type="llm_metrics", request_id=request_id, ttft=ttft, speech_id=None)
+
+
+def test_background_llm_requests_stay_out_of_llm_ttft():
+    tracer = TurnTracer("room", worker_id="w", job_id="job")
+    tracer.on_user_speech_end(now=0.0)
+    tracer.ignore_llm_request("summary-1")
+
+    tracer.on_metrics(llm_metrics("summary-1", 2.0))
+    tracer.on_metrics(llm_metrics("turn-1", 0.4))
+
+    assert tracer.histograms["llm_ttft"].count == 1
+    assert tracer.histograms["llm_ttft"].sum == 0.4
+    assert tracer.turns[-1]["spans"] == {"llm_ttft": 0.4}
+    assert tracer.ignored_llm_requests == 1
@@ -0,0 +1,39 @@
+import asyncio
+
+from load_test import Recorder, start_offsets
+
+
+class Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+async def _respond(response):
+    return response
+
+
+def test_token_body_without_token_is_an_error():
+    async def run():
+        recorder = Recorder()
+        ok = await recorder.timed("GET /api/token", _respond(Response(200, {"token": "t"})), require="token")
+        missing = await recorder.timed("GET /api/token", _respond(Response(200, {"error": "not configured"})),
+                                       require="token")
+        broken = await recorder.timed("GET /api/token", _respond(Response(200, ValueError("not json"))),
+                                      require="token")
+        return ok, missing, broken, recorder.errors["GET /api/token"]
+
+    ok, missing, broken, errors = asyncio.run(run())
+    assert ok is not None and missing is None and broken is None
+    assert errors == 2
+
+
+def test_start_offsets_profiles():
+    assert start_offsets(3, "linear", 10, 1, 1) == [0.0, 5.0, 10.0]
+    assert start_offsets(4, "step", 0, 2, 5) == [0.0, 0.0, 5.0, 5.0]
+    assert start_offsets(2, "constant", 10, 1, 1) == [0.0, 0.0]
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+import loop_monitor
+from loop_monitor import monitor_running_loop
+
+
+def test_monitor_is_shared_per_loop_and_stopped_by_last_user(monkeypatch):
+    monkeypatch.setenv("LOOP_MONITOR_INTERVAL_MS", "10")
+
+    async def run():
+        first, second = monitor_running_loop(), monitor_running_loop()
+        assert first is second
+        first.stop()
+        assert asyncio.get_running_loop() in loop_monitor._monitors
+        second.stop()
+        assert asyncio.get_running_loop() not in loop_monitor._monitors
+        return first
+
+    monitor = asyncio.run(run())
+    assert monitor._stopped.is_set()
+
+
+def test_watchdog_exits_when_its_loop_thread_finishes():
+    async def job():
+        return monitor_running_loop()
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("monitor", asyncio.run(job())))
+    thread.start()
+    thread.join()
+    monitor = result["monitor"]
+    deadline = time.time() + 2
+    while not monitor._stopped.is_set() and time.time() < deadline:
+        time.sleep(0.05)
+    assert monitor._stopped.is_set()
+    assert monitor.stats()["stalls"] == 0
+
+    async def next_job():
+        current = monitor_running_loop()
+        current.stop()
+
+    # The closed loop's monitor is dropped on the next lookup
+    asyncio.run(next_job())
+    assert all(not loop.is_closed() for loop in loop_monitor._monitors)
+
+
+def test_reading_the_running_monitor_takes_no_reference():
+    async def run():
+        assert loop_monitor.running_loop_monitor() is None
+        monitor = monitor_running_loop()
+        for _ in range(3):
+            assert loop_monitor.running_loop_monitor() is monitor
+        assert monitor._users == 1
+        monitor.stop()
+        assert loop_monitor.running_loop_monitor() is None
+        return monitor
+
+    assert asyncio.run(run())._stopped.is_set()
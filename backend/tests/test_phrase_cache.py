@@ -0,0 +1,91 @@
+import asyncio
+
+from greeting_cache import FakeTTS
+from phrase_cache import CachedAudio, CachedTTS, PhraseCache
+
+TEXT = "Could you confirm your departure city?"
+
+
+async def _play(tts: CachedTTS) -> int:
+    frames = 0
+    async with tts.synthesize(TEXT) as stream:
+        async for event in stream:
+            bytes(event.frame.data)
+            frames += 1
+    return frames
+
+
+def test_phrase_is_stored_on_second_miss(tmp_path):
+    async def run():
+        cache = PhraseCache(cache_dir=str(tmp_path))
+        tts = CachedTTS(FakeTTS(first_byte_delay=0), cache, "model", "voice")
+        await _play(tts)
+        assert cache.stats()["stores"] == 0
+        await _play(tts)
+        assert cache.stats()["stores"] == 1
+        frames = await _play(tts)
+        assert cache.stats()["memory_hits"] == 1
+        return frames
+
+    assert asyncio.run(run()) > 0
+
+
+def test_disk_entries_are_mapped_by_a_new_cache(tmp_path):
+    async def run():
+        cache = PhraseCache(cache_dir=str(tmp_path), admit_after=1)
+        await _play(CachedTTS(FakeTTS(first_byte_delay=0), cache, "model", "voice"))
+        restarted = PhraseCache(cache_dir=str(tmp_path))
+        audio = await restarted.get(TEXT, "voice", "model", 24000)
+        return audio, restarted.stats()
+
+    audio, stats = asyncio.run(run())
+    assert audio is not None and audio.nbytes > 0
+    assert stats["disk_hits"] == 1
+
+
+def test_eviction_waits_for_streams_replaying_the_phrase(tmp_path):
+    async def run():
+        cache = PhraseCache(cache_dir=str(tmp_path), admit_after=1)
+        tts = CachedTTS(FakeTTS(first_byte_delay=0), cache, "model", "voice")
+        expected = await _play(tts)
+        replay = tts.synthesize(TEXT).__aiter__()
+        await replay.__anext__()
+        cache.close()
+        frames = 1
+        async for event in replay:
+            bytes(event.frame.data)
+            frames += 1
+        return expected, frames
+
+    expected, frames = asyncio.run(run())
+    assert frames == expected
+
+
+def test_cached_audio_closes_after_last_reader():
+    audio = CachedAudio(memoryview(b"\0" * 64), 16000, 1)
+    audio.acquire()
+    audio.close()
+    assert not audio.closed
+    assert bytes(audio.pcm[:2]) == b"\0\0"
+    audio.release()
+    assert audio.closed
+
+
+def test_disk_access_times_are_written_back_in_batches(tmp_path, monkeypatch):
+    import phrase_cache
+
+    touched = []
+    monkeypatch.setattr(phrase_cache, "TOUCH_INTERVAL", 3600.0)
+    monkeypatch.setattr(phrase_cache, "_touch_files", lambda paths: touched.extend(paths))
+
+    async def run():
+        cache = PhraseCache(cache_dir=str(tmp_path))
+        tts = CachedTTS(FakeTTS(first_byte_delay=0), cache, "model", "voice")
+        for _ in range(4):
+            await _play(tts)
+        assert cache.stats()["memory_hits"] == 2
+        assert touched == []
+        cache.close()
+
+    asyncio.run(run())
+    assert len(touched) == 1 and touched[0].endswith(".wav")
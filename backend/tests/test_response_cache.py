@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from response_cache import HashingEmbedder, ResponseCache, agent_turn_cacheable, normalize_query, query_guard
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_normalize_query_ignores_case_and_punctuation():
+    assert normalize_query("  What are the VISA rules, for Frankfurt?? ") == "what are the visa rules for frankfurt"
+
+
+def test_exact_hit_and_context_separation():
+    cache = ResponseCache()
+    cache.put("Visa rules for Frankfurt?", "answer", {"class": "business"})
+    assert cache.get("visa rules for frankfurt", {"class": "business"}) == "answer"
+    assert cache.get("visa rules for frankfurt", {"class": "economy"}) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.put("hotels in london", "answer")
+    clock.now = 9.9
+    assert cache.get("hotels in london") == "answer"
+    clock.now = 10.0
+    assert cache.get("hotels in london") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_semantic_lookup_matches_paraphrase():
+    cache = ResponseCache(embedder=HashingEmbedder())
+    cache.put("what are the visa rules for frankfurt", "answer")
+    assert cache.get("so what are the visa rules for frankfurt please") == "answer"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_semantic_lookup_keeps_word_order_numbers_and_negations_apart():
+    cache = ResponseCache(embedder=HashingEmbedder())
+    cache.put("flights from london to paris", "london first")
+    cache.put("hotels for 2 nights in tokyo", "two nights")
+    cache.put("I need a hotel with parking", "parking")
+    assert cache.get("flights from paris to london") is None
+    assert cache.get("hotels for 3 nights in tokyo") is None
+    assert cache.get("I don't need a hotel with parking") is None
+
+
+def test_query_guard_spells_out_contractions():
+    assert query_guard("I don't need a car") == ((), 1)
+    assert query_guard("2 rooms for 1,500 euros") == (("2", "1500"), 0)
+
+
+def _ctx(*items):
+    return SimpleNamespace(items=[SimpleNamespace(type=kind, role=role, text_content=text)
+                                  for kind, role, text in items])
+
+
+def test_agent_shares_only_tool_free_opening_questions():
+    opening = ("message", "user", "do I need a visa for Germany")
+    assert agent_turn_cacheable(_ctx(opening), 4)
+    assert not agent_turn_cacheable(_ctx(("message", "user", "visa?")), 4)
+    assert not agent_turn_cacheable(_ctx(opening, ("message", "assistant", "yes"),
+                                         ("message", "user", "and for France then")), 4)
+    assert not agent_turn_cacheable(_ctx(opening, ("function_call", None, "")), 4)
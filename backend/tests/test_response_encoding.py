@@ -0,0 +1,42 @@
+import gzip
+
+from response_encoding import CachedBody, etag_matches, negotiate
+
+
+def test_negotiate_prefers_server_order_on_ties():
+    assert negotiate("gzip, br", available=("br", "gzip")) == "br"
+
+
+def test_negotiate_honours_q_values():
+    assert negotiate("br;q=0.5, gzip;q=0.8", available=("br", "gzip")) == "gzip"
+    assert negotiate("gzip;q=0", available=("gzip",)) is None
+    assert negotiate("*;q=0.1", available=("gzip",)) == "gzip"
+
+
+def test_negotiate_identity_when_nothing_matches():
+    assert negotiate(None) is None
+    assert negotiate("deflate", available=("gzip",)) is None
+    assert negotiate("gzip;q=abc", available=("gzip",)) is None
+
+
+def test_etag_matches_weak_and_lists():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', 'W/"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_cached_body_gzip_round_trips():
+    body = CachedBody.from_payload({"items": ["x" * 40] * 50})
+    encoded, encoding = body.select("gzip")
+    assert encoding == "gzip"
+    assert gzip.decompress(encoded) == body.body
+
+
+def test_fast_bodies_use_a_cheaper_gzip_level():
+    payload = {"items": [f"destination {i}" for i in range(500)]}
+    full = CachedBody.from_payload(payload)
+    fast = CachedBody.from_payload(payload, fast=True)
+    assert gzip.decompress(fast.encoded("gzip")) == full.body
+    assert fast.encoded("gzip") != full.encoded("gzip")
@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from room_registry import RoomCapacityError, RoomRegistry
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRooms:
+    def __init__(self) -> None:
+        self.rooms = []
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("livekit down")
+        return [SimpleNamespace(name=name, num_participants=count) for name, count in self.rooms]
+
+
+def test_rooms_are_unique_and_capped_by_pending_issues():
+    async def run():
+        registry = RoomRegistry(capacity=2, clock=FakeClock())
+        first, second = await registry.allocate(), await registry.allocate()
+        assert first != second and first.startswith("travel-")
+        with pytest.raises(RoomCapacityError):
+            await registry.allocate()
+        assert registry.stats()["rejected"] == 1
+
+    asyncio.run(run())
+
+
+def test_pending_rooms_expire_after_join_grace():
+    async def run():
+        clock = FakeClock()
+        registry = RoomRegistry(capacity=1, join_grace=30, clock=clock)
+        await registry.allocate()
+        clock.now = 30.0
+        await registry.allocate()
+
+    asyncio.run(run())
+
+
+def test_capacity_counts_livekit_rooms_with_participants():
+    async def run():
+        clock, rooms = FakeClock(), FakeRooms()
+        rooms.rooms = [("travel-a", 1), ("travel-b", 0), ("other-c", 3)]
+        registry = RoomRegistry(rooms, capacity=2, refresh_interval=2, clock=clock)
+        room = await registry.allocate()
+        assert registry.in_use() == 2
+        with pytest.raises(RoomCapacityError):
+            await registry.allocate()
+
+        # Once LiveKit lists the issued room it is no longer pending
+        rooms.rooms = [(room, 1)]
+        clock.now = 2.0
+        await registry.refresh()
+        assert registry.stats()["pending_rooms"] == 0
+        assert registry.in_use() == 1
+
+    asyncio.run(run())
+
+
+def test_refresh_is_rate_limited_and_survives_errors():
+    async def run():
+        clock, rooms = FakeClock(), FakeRooms()
+        registry = RoomRegistry(rooms, refresh_interval=2, clock=clock)
+        await registry.refresh()
+        await registry.refresh()
+        assert rooms.calls == 1
+        rooms.fail = True
+        clock.now = 5.0
+        await registry.refresh()
+        assert registry.stats()["refresh_errors"] == 1
+
+    asyncio.run(run())
+
+
+def test_batch_allocation_is_all_or_nothing():
+    async def run():
+        registry = RoomRegistry(capacity=3, clock=FakeClock())
+        await registry.allocate()
+        with pytest.raises(RoomCapacityError):
+            await registry.allocate_many(3)
+        assert registry.in_use() == 1
+
+        rooms = await registry.allocate_many(2)
+        assert len(set(rooms)) == 2
+        assert registry.in_use() == 3
+
+    asyncio.run(run())
@@ -0,0 +1,105 @@
+import json
+
+from session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_only_the_owner_token_reaches_a_session():
+    store = SessionStore(clock=FakeClock())
+    record, token = store.start("alice", {"seat": "aisle"})
+
+    assert store.get(record.session_id, token) is record
+    assert store.get(record.session_id, None) is None
+    assert store.get(record.session_id, "not-the-token") is None
+    assert store.update(record.session_id, "not-the-token", state={"city": "Tokyo"}) is None
+    assert store.end(record.session_id, "not-the-token") is None
+    assert store.end(record.session_id, token) is record
+    assert store.get(record.session_id, token) is None
+
+
+def test_idle_sessions_are_evicted_but_reads_keep_them_alive():
+    clock = FakeClock()
+    store = SessionStore(idle_timeout=60, clock=clock)
+    polled, polled_token = store.start("alice")
+    idle, idle_token = store.start("bob")
+
+    clock.now = 50.0
+    assert store.get(polled.session_id, polled_token) is polled
+    clock.now = 100.0
+    assert store.evict_idle() == 1
+    assert store.get(idle.session_id, idle_token) is None
+    assert store.get(polled.session_id, polled_token) is polled
+    assert store.stats()["evicted_idle"] == 1
+
+
+def test_capacity_evicts_the_least_recently_active_session():
+    clock = FakeClock()
+    store = SessionStore(max_sessions=2, clock=clock)
+    first, first_token = store.start("a")
+    second, second_token = store.start("b")
+    clock.now = 1.0
+    store.get(first.session_id, first_token)
+    store.start("c")
+
+    assert len(store) == 2
+    assert store.get(second.session_id, second_token) is None
+    assert store.get(first.session_id, first_token) is first
+    assert store.stats()["evicted_capacity"] == 1
+
+
+def test_log_recovers_live_sessions_after_a_restart(tmp_path):
+    path = str(tmp_path / "sessions.log")
+    store = SessionStore(log_path=path)
+    kept, kept_token = store.start("alice", {"seat": "aisle"})
+    store.update(kept.session_id, kept_token, state={"destination": "Tokyo"})
+    ended, ended_token = store.start("bob")
+    store.end(ended.session_id, ended_token)
+    store.close()
+
+    # A torn final write is skipped
+    with open(path, "a") as log:
+        log.write('{"op": "start", "sess')
+
+    restarted = SessionStore(log_path=path)
+    recovered = restarted.get(kept.session_id, kept_token)
+    assert recovered is not None
+    assert recovered.preferences == {"seat": "aisle"}
+    assert recovered.state == {"destination": "Tokyo"}
+    assert restarted.get(ended.session_id, ended_token) is None
+    restarted.close()
+
+    # Recovery rewrites the log down to the live sessions (plus the read above)
+    with open(path) as log:
+        ops = [json.loads(line)["op"] for line in log]
+    assert ops == ["start", "update"]
+
+
+def test_log_is_compacted_once_it_outgrows_the_live_sessions(tmp_path):
+    path = str(tmp_path / "sessions.log")
+    store = SessionStore(log_path=path, compact_min_entries=4)
+    record, token = store.start("alice")
+    for turn in range(10):
+        store.update(record.session_id, token, state={"turn": turn})
+    assert store.stats()["compactions"] >= 2
+    store.close()
+
+    restarted = SessionStore(log_path=path)
+    assert restarted.get(record.session_id, token).state == {"turn": 9}
+    restarted.close()
+
+
+def test_a_second_process_on_the_same_log_does_not_write_it(tmp_path):
+    path = str(tmp_path / "sessions.log")
+    owner = SessionStore(log_path=path)
+    other = SessionStore(log_path=path)
+    assert owner.stats()["persistent"] is True
+    assert other.stats()["persistent"] is False
+    other.close()
+    owner.close()
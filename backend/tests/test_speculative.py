@@ -0,0 +1,104 @@
+import asyncio
+
+from speculative import Speculator, divergence
+
+
+def test_identical_and_filler_changes_stay_close():
+    assert divergence("flights to Paris on Tuesday", "Flights to Paris on Tuesday.") == 0.0
+    assert divergence("flights to Paris on Tuesday", "um flights to Paris on Tuesday please") <= 0.2
+
+
+def test_changed_number_discards():
+    assert divergence("book 2 rooms in London", "book 3 rooms in London") == 1.0
+
+
+def test_negation_discards():
+    assert divergence("I need a hotel with parking", "I don't need a hotel with parking") == 1.0
+    assert divergence("hotels in London", "hotels in London not near the airport") == 1.0
+
+
+def test_added_constraint_discards():
+    assert divergence("flights to Paris on Tuesday", "flights to Paris on Tuesday in business class") == 1.0
+
+
+def test_word_order_counts():
+    assert divergence("London to Paris flights", "Paris to London flights") > 0.15
+
+
+async def _words(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _run_speculation(final):
+    async def run():
+        speculator = Speculator(lambda text: _words("Sure, ", "here are flights."), max_divergence=0.15)
+        for _ in range(2):
+            speculator.on_interim("flights to Paris on Tuesday")
+        await asyncio.sleep(0)
+        stream = speculator.take(final)
+        replay = [chunk async for chunk in stream] if stream is not None else None
+        await asyncio.sleep(0)
+        return replay, speculator.stats()
+
+    return asyncio.run(run())
+
+
+def test_speculator_commits_matching_final():
+    replay, stats = _run_speculation("Flights to Paris on Tuesday")
+    assert replay == ["Sure, ", "here are flights."]
+    assert stats["committed"] == 1
+
+
+def test_speculator_discards_added_constraint_and_counts_words():
+    replay, stats = _run_speculation("flights to Paris on Tuesday under 300 euros")
+    assert replay is None
+    assert stats["discarded"] == 1
+    assert "wasted_words" in stats
+
+
+def _speculate(speculator):
+    for _ in range(2):
+        speculator.on_interim("flights to Paris on Tuesday")
+
+
+def test_closing_the_replay_early_closes_the_upstream_stream():
+    closed = []
+
+    async def upstream(text):
+        try:
+            yield "Sure, "
+            await asyncio.sleep(3600)
+            yield "never sent"
+        finally:
+            closed.append(True)
+
+    async def run():
+        speculator = Speculator(upstream)
+        _speculate(speculator)
+        await asyncio.sleep(0.01)
+        replay = speculator.take("flights to Paris on Tuesday")
+        assert await replay.__anext__() == "Sure, "
+        # The session closes llm_node on barge-in
+        await replay.aclose()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert closed == [True]
+
+    asyncio.run(run())
+
+
+def test_failed_speculation_falls_back_to_a_normal_reply():
+    async def upstream(text):
+        raise ConnectionError("LLM unavailable")
+        yield
+
+    async def run():
+        speculator = Speculator(upstream)
+        _speculate(speculator)
+        await asyncio.sleep(0.01)
+        return speculator.take("flights to Paris on Tuesday"), speculator.stats()
+
+    stream, stats = asyncio.run(run())
+    assert stream is None
+    assert stats["committed"] == 0 and stats["discarded"] == 1
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("livekit.api")
+
+from token_service import TokenService
+
+
+def claims(token: str) -> dict:
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+
+def test_mint_grants_a_fresh_identity_the_room_and_ttl() -> None:
+    service = TokenService("key", "secret" * 8, room="default-room", ttl=timedelta(minutes=10))
+
+    first = service.mint(room="travel-1")
+    second = service.mint()
+
+    body = claims(first["token"])
+    assert body["sub"] == first["identity"]
+    assert body["iss"] == "key"
+    assert body["video"]["room"] == "travel-1"
+    assert body["video"]["roomJoin"] is True
+    assert body["exp"] - body["nbf"] == 600
+    assert first["room"] == "travel-1"
+
+    assert claims(second["token"])["video"]["room"] == "default-room"
+    assert second["identity"] != first["identity"]
+    assert service.stats() == {"minted": 2}
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from travel_tools import CachedTool
+
+
+def test_lookups_coalesce_per_event_loop_and_share_results():
+    calls = []
+    release = threading.Event()
+
+    async def lookup(city):
+        calls.append(city)
+        while not release.is_set():
+            await asyncio.sleep(0.001)
+        return {"city": city}
+
+    tool = CachedTool("weather", lookup, ttl=60, timeout=5)
+    results = []
+    started = threading.Barrier(2)
+
+    def job():
+        # A job run as a thread (AGENT_JOB_EXECUTOR=thread) has its own loop
+        async def run():
+            first = asyncio.ensure_future(tool(city="Paris"))
+            second = asyncio.ensure_future(tool(city="paris"))
+            await asyncio.sleep(0.01)
+            started.wait()
+            release.set()
+            return await asyncio.gather(first, second)
+
+        results.append(asyncio.run(run()))
+
+    threads = [threading.Thread(target=job) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == [[{"city": "Paris"}] * 2] * 2
+    # One lookup per loop; the second call on each loop joined it
+    assert len(calls) == 2 and tool.coalesced == 2
+
+    assert asyncio.run(tool(city="Paris")) == {"city": "Paris"}
+    assert tool.hits == 1
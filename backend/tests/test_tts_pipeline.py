@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+from tts_pipeline import SentenceChunker, TTSPipeline
+
+
+def test_chunker_splits_on_sentences_once_long_enough():
+    chunker = SentenceChunker(min_chars=10)
+    assert chunker.push("Hi. Your flight to Paris ") == []
+    assert chunker.push("leaves at 9. The hotel") == ["Hi. Your flight to Paris leaves at 9."]
+    assert chunker.flush() == ["The hotel"]
+
+
+def test_chunker_skips_abbreviations():
+    chunker = SentenceChunker(min_chars=5)
+    assert chunker.push("Meet Dr. Smith at the airport. ") == ["Meet Dr. Smith at the airport."]
+
+
+def test_chunker_breaks_long_sentences_at_clauses():
+    chunker = SentenceChunker(min_chars=10, clause_chars=40)
+    chunks = chunker.push("The first option is a morning flight, the second one leaves at noon")
+    assert chunks == ["The first option is a morning flight,"]
+
+
+class FakeSynth:
+    def __init__(self) -> None:
+        self.texts = []
+
+    def __call__(self, text):
+        self.texts.append(text)
+        return _Stream(text)
+
+
+class _Stream:
+    def __init__(self, text):
+        self.text = text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def __aiter__(self):
+        # Later chunks render faster, so ordering is the pipeline's job
+        await asyncio.sleep(0.01 if self.text.startswith("First") else 0)
+        for word in self.text.split():
+            yield SimpleNamespace(frame=word)
+
+
+async def _text(*parts):
+    for part in parts:
+        yield part
+
+
+def test_pipeline_plays_chunks_in_order():
+    async def run():
+        synth = FakeSynth()
+        pipeline = TTSPipeline(synth, max_concurrency=3, min_chars=5)
+        frames = [frame async for frame in pipeline.run(_text("First sentence here. ", "Second one follows."))]
+        return synth.texts, frames, pipeline.stats.to_dict()
+
+    texts, frames, stats = asyncio.run(run())
+    assert texts == ["First sentence here.", "Second one follows."]
+    assert frames == ["First", "sentence", "here.", "Second", "one", "follows."]
+    assert stats["chunks"] == 2
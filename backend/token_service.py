@@ -0,0 +1,74 @@
+"""
+LiveKit access token issuance.
+
+Credentials are read once per process and every token is built with
+``livekit.api.AccessToken``. Identities are always generated here, never
+taken from the caller, so a request cannot mint a token for (and kick out)
+someone else's participant.
+"""
+
+import logging
+import os
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOM = "business-travel-room"
+DEFAULT_TTL = timedelta(hours=6)
+
+
+class TokenService:
+    """Mints LiveKit join tokens for server-generated identities"""
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        room: str = DEFAULT_ROOM,
+        ttl: timedelta = DEFAULT_TTL,
+    ) -> None:
+        from livekit.api import AccessToken, VideoGrants
+
+        self._access_token = AccessToken
+        self._grants = VideoGrants
+        self.api_key = api_key
+        self._api_secret = api_secret
+        self.room = room
+        self.ttl = ttl
+        self.minted = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["TokenService"]:
+        """Build from ``LIVEKIT_API_KEY``/``LIVEKIT_API_SECRET``; None when unset"""
+        api_key = os.getenv("LIVEKIT_API_KEY")
+        api_secret = os.getenv("LIVEKIT_API_SECRET")
+        if not api_key or not api_secret:
+            return None
+        return cls(api_key, api_secret, room=os.getenv("LIVEKIT_ROOM", DEFAULT_ROOM))
+
+    def mint(self, room: Optional[str] = None) -> Dict[str, str]:
+        identity = f"user_{uuid.uuid4().hex}"
+        room = room or self.room
+        token = self._access_token(api_key=self.api_key, api_secret=self._api_secret) \
+            .with_identity(identity) \
+            .with_ttl(self.ttl) \
+            .with_grants(self._grants(room_join=True, room=room)) \
+            .to_jwt()
+        self.minted += 1
+        return {"token": token, "room": room, "identity": identity}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"minted": self.minted}
+
+
+_service: Optional[TokenService] = None
+
+
+def get_token_service() -> Optional[TokenService]:
+    """Process-wide service, built on first use; None until credentials exist"""
+    global _service
+    if _service is None:
+        _service = TokenService.from_env()
+    return _service
@@ -0,0 +1,316 @@
+"""
+Travel lookups exposed to the voice agent as function tools.
+
+Providers implement ``TravelProvider``; ``StubTravelProvider`` answers from
+deterministic local data (real IANA time zones, fixed FX rates, generated
+flights/hotels/weather) so the agent and its tools run offline.
+``TRAVEL_TOOLS_PROVIDER`` selects the implementation.
+
+Every tool goes through ``CachedTool``, which gives it:
+
+- a TTL + LRU cache of results keyed on its normalized arguments
+- request coalescing: identical calls already in flight share one result
+  (per event loop: jobs run as threads, ``AGENT_JOB_EXECUTOR=thread``, each
+  have their own loop, and a task can only be awaited on the loop it runs on)
+- a timeout, so a slow provider fails the lookup instead of the turn
+
+The tools are plain coroutines, so lookups the LLM requests in one response
+run concurrently; ``travel_briefing`` additionally fans out weather,
+currency and local time for a city in a single tool call.
+"""
+
+import asyncio
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+TOOL_INSTRUCTIONS = """\
+Use your tools for flights, hotels, weather, exchange rates and local times
+instead of guessing. Today is {today}; pass dates as YYYY-MM-DD. When a
+question needs several facts about one destination, use travel_briefing."""
+
+
+def tool_instructions() -> str:
+    """Prompt addendum for agents that have the travel tools"""
+    return TOOL_INSTRUCTIONS.format(today=datetime.date.today().isoformat())
+
+
+class ToolTimeoutError(Exception):
+    """A provider did not answer within the tool's timeout"""
+
+
+class UnknownCityError(ValueError):
+    """The provider has no data for the requested city"""
+
+
+# City -> (IANA zone, ISO currency, typical daytime temperature in C)
+CITIES: Dict[str, Tuple[str, str, int]] = {
+    "new york": ("America/New_York", "USD", 14),
+    "san francisco": ("America/Los_Angeles", "USD", 17),
+    "chicago": ("America/Chicago", "USD", 11),
+    "toronto": ("America/Toronto", "CAD", 9),
+    "london": ("Europe/London", "GBP", 12),
+    "paris": ("Europe/Paris", "EUR", 14),
+    "frankfurt": ("Europe/Berlin", "EUR", 12),
+    "berlin": ("Europe/Berlin", "EUR", 11),
+    "munich": ("Europe/Berlin", "EUR", 11),
+    "zurich": ("Europe/Zurich", "CHF", 10),
+    "amsterdam": ("Europe/Amsterdam", "EUR", 11),
+    "dubai": ("Asia/Dubai", "AED", 30),
+    "mumbai": ("Asia/Kolkata", "INR", 31),
+    "singapore": ("Asia/Singapore", "SGD", 31),
+    "hong kong": ("Asia/Hong_Kong", "HKD", 25),
+    "shanghai": ("Asia/Shanghai", "CNY", 18),
+    "tokyo": ("Asia/Tokyo", "JPY", 17),
+    "seoul": ("Asia/Seoul", "KRW", 14),
+    "sydney": ("Australia/Sydney", "AUD", 20),
+    "sao paulo": ("America/Sao_Paulo", "BRL", 22),
+}
+
+# Units of each currency per US dollar
+USD_RATES: Dict[str, float] = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "CHF": 0.88, "CAD": 1.36, "AUD": 1.52,
+    "JPY": 151.0, "CNY": 7.23, "HKD": 7.82, "SGD": 1.35, "KRW": 1370.0,
+    "INR": 83.4, "AED": 3.67, "BRL": 5.05,
+}
+
+
+def _city(name: str) -> Tuple[str, Tuple[str, str, int]]:
+    key = " ".join(name.lower().replace(",", " ").split())
+    if key not in CITIES:
+        raise UnknownCityError(f"No travel data for {name}")
+    return key, CITIES[key]
+
+
+def _seed(*parts: str) -> int:
+    return int.from_bytes(hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class TravelProvider:
+    """Interface every travel data provider implements"""
+
+    name = "base"
+
+    async def search_flights(self, origin: str, destination: str, date: str) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def search_hotels(self, city: str, check_in: str, nights: int) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def weather(self, city: str, date: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def local_time(self, city: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class StubTravelProvider(TravelProvider):
+    """Deterministic offline provider with an optional simulated latency"""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def search_flights(self, origin: str, destination: str, date: str) -> List[Dict[str, Any]]:
+        await self._wait()
+        (src, _), (dst, _) = _city(origin), _city(destination)
+        seed = _seed(src, dst, date)
+        flights = []
+        for index, hour in enumerate((7, 12, 18)):
+            duration = 60 + seed % 600
+            flights.append({
+                "flight": f"TA{100 + (seed + index * 37) % 900}",
+                "from": origin.title(), "to": destination.title(), "date": date,
+                "departure": f"{hour:02d}:{(seed >> index) % 4 * 15:02d}",
+                "duration_minutes": duration,
+                "business_fare_usd": 900 + (seed >> (index + 3)) % 2400,
+            })
+        return flights
+
+    async def search_hotels(self, city: str, check_in: str, nights: int) -> List[Dict[str, Any]]:
+        await self._wait()
+        key, _ = _city(city)
+        seed = _seed(key, check_in)
+        names = ("Grand Business Hotel", "Executive Suites", "Central Plaza", "Airport Conference Inn")
+        return [{
+            "name": f"{name} {city.title()}", "check_in": check_in, "nights": nights,
+            "rate_usd": 160 + (seed >> index) % 280, "distance_to_center_km": round(0.4 + index * 1.7, 1),
+            "meeting_rooms": index != 3,
+        } for index, name in enumerate(names)]
+
+    async def weather(self, city: str, date: str) -> Dict[str, Any]:
+        await self._wait()
+        key, (_, _, base) = _city(city)
+        seed = _seed(key, date)
+        conditions = ("sunny", "partly cloudy", "cloudy", "light rain", "showers")
+        return {"city": city.title(), "date": date, "condition": conditions[seed % len(conditions)],
+                "high_c": base + seed % 6, "low_c": base - 4 - seed % 4}
+
+    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
+        await self._wait()
+        src, dst = from_currency.upper(), to_currency.upper()
+        if src not in USD_RATES or dst not in USD_RATES:
+            raise ValueError(f"Unsupported currency pair {src}/{dst}")
+        rate = USD_RATES[dst] / USD_RATES[src]
+        return {"amount": amount, "from": src, "to": dst, "rate": round(rate, 6),
+                "converted": round(amount * rate, 2)}
+
+    async def local_time(self, city: str) -> Dict[str, Any]:
+        await self._wait()
+        _, (zone, currency, _) = _city(city)
+        now = datetime.datetime.now(ZoneInfo(zone))
+        offset = now.utcoffset().total_seconds() / 3600
+        return {"city": city.title(), "time_zone": zone, "utc_offset_hours": offset,
+                "local_time": now.strftime("%Y-%m-%d %H:%M"), "currency": currency}
+
+
+class CachedTool:
+    """TTL cache, in-flight coalescing and a timeout around one tool"""
+
+    def __init__(self, name: str, fn: Callable[..., Awaitable[Any]], ttl: float,
+                 timeout: float, max_entries: int = 1024,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.fn = fn
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.clock = clock
+        self._cache: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # Jobs running as threads share the results, so the LRU is locked
+        self._cache_lock = threading.Lock()
+        # Event loop -> lookups in flight on it
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, asyncio.Task]]" = \
+            weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(kwargs: Dict[str, Any]) -> Tuple:
+        return tuple(sorted(
+            (name, " ".join(value.lower().split()) if isinstance(value, str) else value)
+            for name, value in kwargs.items()
+        ))
+
+    async def _call(self, key: Tuple, kwargs: Dict[str, Any]) -> Any:
+        try:
+            result = await asyncio.wait_for(self.fn(**kwargs), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ToolTimeoutError(f"{self.name} did not answer within {self.timeout:.1f}s") from None
+        except Exception:
+            self.errors += 1
+            raise
+        with self._cache_lock:
+            self._cache[key] = (self.clock() + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _cached(self, key: Tuple) -> Tuple[bool, Any]:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= self.clock():
+                del self._cache[key]
+                return False, None
+            self._cache.move_to_end(key)
+            return True, entry[1]
+
+    async def __call__(self, **kwargs: Any) -> Any:
+        key = self._key(kwargs)
+        hit, result = self._cached(key)
+        if hit:
+            self.hits += 1
+            return result
+
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._call(key, kwargs))
+            inflight[key] = task
+            task.add_done_callback(lambda _: inflight.pop(key, None))
+        # Shielded so one caller being cancelled does not cancel the shared lookup
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "coalesced": self.coalesced, "timeouts": self.timeouts, "errors": self.errors}
+
+
+class TravelTools:
+    """The agent's travel lookups, each with its own cache and timeout"""
+
+    def __init__(self, provider: TravelProvider, timeout: float = 3.0) -> None:
+        self.provider = provider
+        self.flights = CachedTool("search_flights", provider.search_flights, ttl=120, timeout=timeout)
+        self.hotels = CachedTool("search_hotels", provider.search_hotels, ttl=300, timeout=timeout)
+        self.weather = CachedTool("weather", provider.weather, ttl=600, timeout=timeout)
+        self.currency = CachedTool("convert_currency", provider.convert_currency, ttl=60, timeout=timeout)
+        self.local_time = CachedTool("local_time", provider.local_time, ttl=30, timeout=timeout)
+
+    @property
+    def tools(self) -> List[CachedTool]:
+        return [self.flights, self.hotels, self.weather, self.currency, self.local_time]
+
+    async def briefing(self, city: str, date: str, amount: float = 100.0,
+                       home_currency: str = "USD") -> Dict[str, Any]:
+        """Weather, currency and local time for a city, looked up in parallel"""
+        _, (_, currency, _) = _city(city)
+        results = await asyncio.gather(
+            self.weather(city=city, date=date),
+            self.currency(amount=amount, from_currency=home_currency, to_currency=currency),
+            self.local_time(city=city),
+            return_exceptions=True,
+        )
+        briefing: Dict[str, Any] = {"city": city.title(), "date": date}
+        for name, result in zip(("weather", "currency", "local_time"), results):
+            # One failed lookup should not hide the others
+            briefing[name] = {"error": str(result)} if isinstance(result, Exception) else result
+        return briefing
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": self.provider.name, **{tool.name: tool.stats() for tool in self.tools}}
+
+
+def travel_tools_from_env() -> Optional[TravelTools]:
+    """Tools for the configured provider, or None when ``TRAVEL_TOOLS_PROVIDER`` is unset
+
+    The stub answers with made-up flights, hotels and weather, so it is only
+    used when asked for by name; it is never a fallback.
+    """
+    name = os.getenv("TRAVEL_TOOLS_PROVIDER", "").lower()
+    if not name:
+        logger.warning("TRAVEL_TOOLS_PROVIDER not set; the agent runs without travel tools")
+        return None
+    if name != "stub":
+        raise ValueError(f"Unknown TRAVEL_TOOLS_PROVIDER '{name}' (supported: stub)")
+    provider = StubTravelProvider(latency=float(os.getenv("TRAVEL_TOOLS_STUB_LATENCY", "0")))
+    return TravelTools(provider, timeout=float(os.getenv("TRAVEL_TOOLS_TIMEOUT", "3.0")))
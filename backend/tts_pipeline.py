@@ -0,0 +1,207 @@
+"""
+Sentence-chunked, parallel TTS synthesis for the voice agent.
+
+The LLM reply is split at sentence (and, for long runs, clause) boundaries as
+tokens arrive. Each chunk is synthesized as its own TTS request, with up to
+``max_concurrency`` requests in flight, while frames are still played out
+strictly in chunk order: the first sentence plays while the next ones render.
+
+When the agent is interrupted the framework closes the ``tts_node``
+generator; every chunk still pending or rendering is cancelled at that point.
+
+``PipelineStats`` records time to first audio (first LLM text -> first frame)
+and the gap between consecutive chunks (end of one chunk's audio -> first
+frame of the next) in the same histograms used for turn latency.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Callable, List, Optional
+
+from latency_metrics import Histogram, summarize
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s")
+_CLAUSE_END = re.compile(r"[,;:—]\s")
+_ABBREVIATIONS = frozenset("mr mrs ms dr st e.g i.e etc vs approx no".split())
+
+
+class SentenceChunker:
+    """Incrementally splits streamed text into speakable chunks"""
+
+    def __init__(self, min_chars: int = 24, clause_chars: int = 120) -> None:
+        self.min_chars = min_chars
+        self.clause_chars = clause_chars
+        self._buffer = ""
+
+    def _split_at(self, text: str) -> Optional[int]:
+        for match in _SENTENCE_END.finditer(text):
+            end = match.end()
+            if end < self.min_chars:
+                continue
+            last_word = text[:match.start()].rsplit(None, 1)[-1].lower() if text[:match.start()].strip() else ""
+            if last_word.rstrip(".") in _ABBREVIATIONS:
+                continue
+            return end
+        if len(text) >= self.clause_chars:
+            # Long sentence without a full stop: break at the last clause boundary
+            matches = [m for m in _CLAUSE_END.finditer(text) if m.end() >= self.min_chars]
+            if matches:
+                return matches[-1].end()
+        return None
+
+    def push(self, text: str) -> List[str]:
+        """Add streamed text; return chunks that are now complete"""
+        self._buffer += text
+        chunks = []
+        while True:
+            end = self._split_at(self._buffer)
+            if end is None:
+                break
+            chunk, self._buffer = self._buffer[:end].strip(), self._buffer[end:]
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> List[str]:
+        chunk, self._buffer = self._buffer.strip(), ""
+        return [chunk] if chunk else []
+
+
+class PipelineStats:
+    """Time-to-first-audio and inter-chunk gap across a session's replies"""
+
+    def __init__(self) -> None:
+        self.first_audio = Histogram()
+        self.chunk_gap = Histogram()
+        self.replies = 0
+        self.chunks = 0
+        self.interrupted = 0
+        self.cancelled_chunks = 0
+        self.failed_chunks = 0
+
+    def to_dict(self):
+        return {
+            "replies": self.replies,
+            "chunks": self.chunks,
+            "interrupted": self.interrupted,
+            "cancelled_chunks": self.cancelled_chunks,
+            "failed_chunks": self.failed_chunks,
+            **summarize({"first_audio": self.first_audio, "chunk_gap": self.chunk_gap}),
+        }
+
+
+class _Chunk:
+    __slots__ = ("text", "frames", "task")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.frames: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+
+class TTSPipeline:
+    """Renders chunks concurrently and yields their frames in order"""
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], Any],
+        max_concurrency: int = 3,
+        stats: Optional[PipelineStats] = None,
+        min_chars: int = 24,
+    ) -> None:
+        self.synthesize = synthesize
+        self.max_concurrency = max(1, max_concurrency)
+        self.stats = stats or PipelineStats()
+        self.min_chars = min_chars
+
+    @classmethod
+    def from_env(cls, synthesize: Callable[[str], Any], stats: Optional[PipelineStats] = None) -> "TTSPipeline":
+        return cls(
+            synthesize,
+            max_concurrency=int(os.getenv("TTS_PIPELINE_CONCURRENCY", "3")),
+            stats=stats,
+            min_chars=int(os.getenv("TTS_CHUNK_MIN_CHARS", "24")),
+        )
+
+    async def _render(self, chunk: _Chunk, slots: asyncio.Semaphore) -> None:
+        try:
+            async with slots:
+                async with self.synthesize(chunk.text) as stream:
+                    async for event in stream:
+                        chunk.frames.put_nowait(event.frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Skip the chunk rather than drop the rest of the reply
+            self.stats.failed_chunks += 1
+            logger.warning(f"TTS failed for chunk {chunk.text[:40]!r}: {e}")
+        finally:
+            chunk.frames.put_nowait(None)
+
+    async def run(self, text: AsyncIterable[str]) -> AsyncIterator[Any]:
+        """Yield audio frames for streamed text, one sentence chunk at a time"""
+        chunker = SentenceChunker(min_chars=self.min_chars)
+        slots = asyncio.Semaphore(self.max_concurrency)
+        order: asyncio.Queue = asyncio.Queue()
+        chunks: List[_Chunk] = []
+        first_text_at: List[float] = []
+
+        def schedule(sentence: str) -> None:
+            chunk = _Chunk(sentence)
+            chunk.task = asyncio.create_task(self._render(chunk, slots))
+            chunks.append(chunk)
+            order.put_nowait(chunk)
+
+        async def split() -> None:
+            try:
+                async for delta in text:
+                    if not first_text_at:
+                        first_text_at.append(time.perf_counter())
+                    for sentence in chunker.push(delta):
+                        schedule(sentence)
+                for sentence in chunker.flush():
+                    schedule(sentence)
+            finally:
+                order.put_nowait(None)
+
+        splitter = asyncio.create_task(split())
+        self.stats.replies += 1
+        played = 0
+        try:
+            previous_end: Optional[float] = None
+            while True:
+                chunk = await order.get()
+                if chunk is None:
+                    break
+                first_frame = True
+                while True:
+                    frame = await chunk.frames.get()
+                    if frame is None:
+                        break
+                    if first_frame:
+                        now = time.perf_counter()
+                        if previous_end is None:
+                            self.stats.first_audio.observe(now - first_text_at[0])
+                        else:
+                            self.stats.chunk_gap.observe(now - previous_end)
+                        first_frame = False
+                    yield frame
+                previous_end = time.perf_counter()
+                played += 1
+            # Surface errors from the LLM text stream
+            await splitter
+        finally:
+            self.stats.chunks += played
+            interrupted = len(chunks) > played or not splitter.done()
+            splitter.cancel()
+            for chunk in chunks[played:]:
+                chunk.task.cancel()
+            if interrupted:
+                # Closed before every chunk played out: barge-in
+                self.stats.interrupted += 1
+                self.stats.cancelled_chunks += len(chunks) - played
@@ -5,9 +5,11 @@ This script runs the LiveKit voice agent that handles real-time voice processing
 """
 
 import asyncio
+import contextlib
 import logging
 import os
 import sys
+import time
 from dotenv import load_dotenv
 import argparse
 
@@ -19,47 +21,260 @@ load_dotenv(".env")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+from agent_registry import travel_assistant
+
 # Import LiveKit components
 try:
     from livekit import agents
-    from livekit.agents import AutoSubscribe, JobContext, WorkerOptions
-    from livekit.plugins import cartesia, deepgram, silero, google
+    from livekit.agents import AutoSubscribe, JobContext, RunContext, ToolError, WorkerOptions, function_tool
+    from livekit.plugins import cartesia, deepgram, google
     
-    # Only import turn detector if available
-    try:
-        from livekit.plugins.turn_detector.multilingual import MultilingualModel
-        TURN_DETECTOR_AVAILABLE = True
-    except ImportError:
-        TURN_DETECTOR_AVAILABLE = False
+    # VAD and turn detector are loaded once per process by the model pool
+    from model_pool import import_plugins, pool_for, prewarm as prewarm_models
+    # Plugins must register on the main process before the worker starts
+    TURN_DETECTOR_AVAILABLE = import_plugins()
+    if not TURN_DETECTOR_AVAILABLE:
         logger.warning("Turn detector not available, using default settings")
+    from greeting_cache import GREETING_TEXT, get_greeting_cache, play_greeting
+    from response_cache import agent_turn_cacheable, last_user_text, response_cache_from_env
+    from worker_load import WorkerLoadMonitor, clear_job_stats, publish_job_stats
+    from latency_metrics import WORKER_ID_ENV, LatencyTotals, TurnTracer
+    from speculative import Speculator, chunk_text
+    from context_window import SUMMARY_INSTRUCTIONS, ContextWindow
+    from travel_tools import ToolTimeoutError, tool_instructions, travel_tools_from_env
+    from tts_pipeline import PipelineStats, TTSPipeline
+    from phrase_cache import CachedTTS, get_phrase_cache
+    from audio_ingest import AudioIngest
+    from inference_batcher import get_batch_scheduler
+    from loop_monitor import monitor_running_loop
+    from job_lifecycle import JobLifetime, SessionTotals, close_providers, get_session_tracker
         
     LIVEKIT_AVAILABLE = True
 except ImportError as e:
     logger.error(f"LiveKit import error: {e}")
     LIVEKIT_AVAILABLE = False
 
-class BusinessTravelAssistant:
-    def __init__(self) -> None:
-        self.instructions = """You are a professional business travel assistant. 
-        Your role is to help business travelers with:
-        1. Flight bookings and itinerary management
-        2. Hotel reservations and recommendations
-        3. Transportation arrangements (taxis, rideshares, car rentals)
-        4. Travel expense tracking and reporting
-        5. Visa and documentation guidance
-        6. Weather updates for destinations
-        7. Currency conversion and payment methods
-        8. Business meeting scheduling across time zones
-        9. Local business services and facilities
-        10. Emergency assistance during travel
-        
-        Always be concise, professional, and helpful. 
-        Ask clarifying questions when needed.
-        Focus on business travel needs specifically."""
-
-async def entrypoint(ctx: JobContext):
+# Prompt and provider settings shared with main.py, built once per process
+AGENT_DEFINITION = travel_assistant()
+TTS_MODEL = AGENT_DEFINITION.tts_model
+TTS_VOICE = AGENT_DEFINITION.tts_voice
+
+# Answers to a session's opening question are shared by every session in this
+# process; matched exactly, since a paraphrase match can flip the answer
+LLM_CACHE_MIN_WORDS = int(os.getenv("LLM_CACHE_MIN_WORDS", "4"))
+llm_response_cache = response_cache_from_env(semantic=False) if LIVEKIT_AVAILABLE else None
+
+# Start the LLM on stable interim transcripts instead of waiting for end of turn
+SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "1") == "1"
+
+# Travel lookups (and their caches) are shared by every session in this process
+travel_tools = travel_tools_from_env() if LIVEKIT_AVAILABLE else None
+
+# Keep the last turns verbatim and summarize older ones to bound prompt size
+CONTEXT_WINDOW = os.getenv("CONTEXT_WINDOW", "1") == "1"
+
+# Synthesize the reply sentence by sentence, a few sentences ahead of playout
+TTS_PIPELINE = os.getenv("TTS_PIPELINE", "1") == "1"
+
+# Resample caller audio once per frame for both the VAD and the STT
+AUDIO_INGEST = os.getenv("AUDIO_INGEST", "1") == "1"
+
+# Batched VAD (INFERENCE_BATCHING=1) only batches across jobs that share a process:
+# "thread" runs this worker's jobs as threads of one process instead of one process each
+AGENT_JOB_EXECUTOR = os.getenv("AGENT_JOB_EXECUTOR", "process")
+
+async def lookup(tool, **kwargs):
+    """Run a cached travel tool, reporting provider failures to the LLM"""
+    try:
+        return await tool(**kwargs)
+    except (ToolTimeoutError, ValueError) as e:
+        raise ToolError(str(e))
+
+# The agent subclasses LiveKit types, so it only exists when LiveKit imported;
+# main() reports the missing install instead of this module failing to load
+if LIVEKIT_AVAILABLE:
+    class BusinessTravelAssistant(agents.Agent):
+        def __init__(self, ingest: "AudioIngest | None" = None, instructions: str = AGENT_DEFINITION.instructions,
+                     tracer: "TurnTracer | None" = None) -> None:
+            super().__init__(instructions=instructions)
+            self.ingest = ingest
+            self.tracer = tracer
+            self.speculator = Speculator.from_env(self._speculate) if SPECULATIVE_LLM else None
+            self.tts_stats = PipelineStats()
+            self.context_window = ContextWindow.from_env(self._summarize) if CONTEXT_WINDOW else None
+
+        def _trim(self, chat_ctx):
+            return self.context_window.prepare(chat_ctx) if self.context_window is not None else chat_ctx
+
+        async def _summarize(self, previous: str, transcript: str) -> str:
+            """Fold turns that left the context window into the running summary"""
+            chat_ctx = agents.llm.ChatContext()
+            chat_ctx.add_message(role="system", content=SUMMARY_INSTRUCTIONS)
+            chat_ctx.add_message(role="user", content=f"Summary so far: {previous or '(none)'}\n\nNew turns:\n{transcript}")
+            parts = []
+            async for chunk in self._untraced(self.session.llm.chat(chat_ctx=chat_ctx)):
+                parts.append(chunk_text(chunk))
+            return "".join(parts)
+
+        def _speculate(self, hypothesis: str):
+            """Start an LLM request as if the interim hypothesis were the final turn"""
+            chat_ctx = self.chat_ctx.copy()
+            chat_ctx.add_message(role="user", content=hypothesis)
+            return self._untraced(self.session.llm.chat(chat_ctx=self._trim(chat_ctx), tools=self.tools))
+
+        async def _untraced(self, stream):
+            """Chunks of an LLM request that is not a turn's reply, kept out of ``llm_ttft``"""
+            async with stream:
+                async for chunk in stream:
+                    if self.tracer is not None:
+                        self.tracer.ignore_llm_request(getattr(chunk, "id", None))
+                    yield chunk
+
+        def on_interim_transcript(self, text: str) -> None:
+            if self.speculator is not None:
+                self.speculator.on_interim(text)
+
+        async def llm_node(self, chat_ctx, tools, model_settings):
+            """Serve cached or speculative replies before falling back to the LLM"""
+            query = last_user_text(chat_ctx)
+            # Later turns ("and on Tuesday?", "the second one") depend on what was said
+            # before, so only opening questions are shared; answers built from live
+            # lookups must not outlive the tools' own TTLs
+            cacheable = agent_turn_cacheable(chat_ctx, LLM_CACHE_MIN_WORDS)
+            if cacheable:
+                cached = llm_response_cache.get(query)
+                if cached is not None:
+                    logger.info("LLM response served from cache")
+                    if self.speculator is not None:
+                        self.speculator.cancel()
+                    yield cached
+                    return
+
+            stream = self.speculator.take(query) if self.speculator is not None else None
+            if stream is None:
+                stream = agents.Agent.default.llm_node(self, self._trim(chat_ctx), tools, model_settings)
+
+            parts = []
+            # Closing this node (barge-in) closes the stream and so the LLM request
+            async with contextlib.aclosing(stream) as chunks:
+                async for chunk in chunks:
+                    if isinstance(chunk, str):
+                        parts.append(chunk)
+                    elif chunk.delta is not None:
+                        if chunk.delta.tool_calls:
+                            cacheable = False
+                        if chunk.delta.content:
+                            parts.append(chunk.delta.content)
+                    yield chunk
+
+            if cacheable and parts:
+                llm_response_cache.put(query, "".join(parts))
+
+        async def stt_node(self, audio, model_settings):
+            """Feed the STT the frames the session's ingest already converted for the VAD"""
+            if self.ingest is not None:
+                audio = self.ingest.frames_from(audio)
+            async for event in agents.Agent.default.stt_node(self, audio, model_settings):
+                yield event
+
+        async def tts_node(self, text, model_settings):
+            """Render sentence chunks in parallel and play them out in order"""
+            if not TTS_PIPELINE:
+                async for frame in agents.Agent.default.tts_node(self, text, model_settings):
+                    yield frame
+                return
+
+            # Phrases the agent has already spoken are replayed from the phrase cache
+            tts = CachedTTS(self.session.tts, get_phrase_cache(), TTS_MODEL, TTS_VOICE)
+            pipeline = TTSPipeline.from_env(tts.synthesize, self.tts_stats)
+            # Closing the pipeline on interruption cancels the chunks still rendering
+            async with contextlib.aclosing(pipeline.run(text)) as frames:
+                async for frame in frames:
+                    yield frame
+
+    # LiveKit registers every function_tool method of the class, so the tools
+    # live on a subclass that is only used when a provider is configured
+    class ToolTravelAssistant(BusinessTravelAssistant):
+        def __init__(self, ingest: "AudioIngest | None" = None, tracer: "TurnTracer | None" = None) -> None:
+            super().__init__(ingest, instructions=f"{AGENT_DEFINITION.instructions}\n\n{tool_instructions()}",
+                             tracer=tracer)
+
+        @function_tool()
+        async def search_flights(self, context: RunContext, origin: str, destination: str, date: str):
+            """Find business flights between two cities.
+
+            Args:
+                origin: Departure city, e.g. "London"
+                destination: Arrival city, e.g. "Frankfurt"
+                date: Travel date as YYYY-MM-DD
+            """
+            return await lookup(travel_tools.flights, origin=origin, destination=destination, date=date)
+
+        @function_tool()
+        async def search_hotels(self, context: RunContext, city: str, check_in: str, nights: int = 1):
+            """Find business hotels in a city.
+
+            Args:
+                city: City to stay in
+                check_in: Check-in date as YYYY-MM-DD
+                nights: Number of nights
+            """
+            return await lookup(travel_tools.hotels, city=city, check_in=check_in, nights=nights)
+
+        @function_tool()
+        async def get_weather(self, context: RunContext, city: str, date: str):
+            """Weather forecast for a city on a date.
+
+            Args:
+                city: City name
+                date: Date as YYYY-MM-DD
+            """
+            return await lookup(travel_tools.weather, city=city, date=date)
+
+        @function_tool()
+        async def convert_currency(self, context: RunContext, amount: float, from_currency: str, to_currency: str):
+            """Convert an amount between currencies.
+
+            Args:
+                amount: Amount to convert
+                from_currency: ISO currency code, e.g. "USD"
+                to_currency: ISO currency code, e.g. "JPY"
+            """
+            return await lookup(travel_tools.currency, amount=amount,
+                                from_currency=from_currency, to_currency=to_currency)
+
+        @function_tool()
+        async def get_local_time(self, context: RunContext, city: str):
+            """Current local time, time zone and UTC offset of a city.
+
+            Args:
+                city: City name
+            """
+            return await lookup(travel_tools.local_time, city=city)
+
+        @function_tool()
+        async def travel_briefing(self, context: RunContext, city: str, date: str,
+                                  amount: float = 100.0, home_currency: str = "USD"):
+            """Weather, exchange rate and local time for a destination in one call.
+
+            Args:
+                city: Destination city
+                date: Travel date as YYYY-MM-DD
+                amount: Amount in the home currency to convert
+                home_currency: Traveler's ISO currency code
+            """
+            try:
+                return await travel_tools.briefing(city, date, amount, home_currency)
+            except ValueError as e:
+                raise ToolError(str(e))
+
+async def entrypoint(ctx: "JobContext"):
     """Entrypoint for the LiveKit voice agent"""
-    logger.info("Starting Business Travel Assistant voice agent")
+    logger.info(f"Starting Business Travel Assistant voice agent (prompt v{AGENT_DEFINITION.prompt.version})")
+    job_started = time.perf_counter()
+    # Lag, stall stacks and on-demand profiles for the loop this job runs on
+    loop_monitor = monitor_running_loop()
+    sessions = get_session_tracker()
     
     try:
         # Connect to the room first
@@ -69,61 +284,138 @@ async def entrypoint(ctx: JobContext):
         
         # Initialize components with error handling
         logger.info("Initializing STT component...")
-        stt = deepgram.STT(model="nova-3", language="multi")
+        stt = deepgram.STT(model=AGENT_DEFINITION.stt_model, language=AGENT_DEFINITION.stt_language)
         
         logger.info("Initializing LLM component...")
-        llm_agent = google.LLM(model="gemini-2.0-flash-exp")
+        llm_agent = google.LLM(model=AGENT_DEFINITION.llm_model)
         
         logger.info("Initializing TTS component...")
-        tts = cartesia.TTS(model="sonic-2", voice="f786b574-daa5-4673-aa0c-cbe3e8534c02")
+        tts = cartesia.TTS(model=TTS_MODEL, voice=TTS_VOICE)
         
-        logger.info("Loading VAD component...")
-        vad = silero.VAD.load()
+        # VAD and turn detection come from the prewarmed, process-wide pool
+        pool = pool_for(ctx)
         
         # Create the agent session with all components
         session_args = {
             "stt": stt,
             "llm": llm_agent,
             "tts": tts,
-            "vad": vad,
         }
+        session_args.update(pool.session_components())
+        
+        # The shared VAD sees this session's audio through its ingest stage
+        ingest = AudioIngest.from_env() if AUDIO_INGEST else None
+        if ingest is not None:
+            session_args["vad"] = ingest.wrap_vad(session_args["vad"])
         
-        # Add turn detection if available
-        if TURN_DETECTOR_AVAILABLE:
-            logger.info("Initializing turn detection...")
-            session_args["turn_detection"] = MultilingualModel()
-        else:
+        if "turn_detection" not in session_args:
             logger.warning("Running without turn detection")
         
         logger.info("Creating agent session...")
         session = agents.AgentSession(**session_args)
         
+        # Per-turn STT -> LLM -> TTS latency spans for this session
+        tracer = TurnTracer(ctx.room.name, job_id=ctx.job.id).attach(session)
+        assistant = (ToolTravelAssistant if travel_tools is not None else BusinessTravelAssistant)(ingest, tracer=tracer)
+        
+        @session.on("user_input_transcribed")
+        def _on_user_input_transcribed(ev):
+            if not ev.is_final:
+                assistant.on_interim_transcript(ev.transcript)
+        
+        @session.on("agent_state_changed")
+        def _on_agent_state_changed(ev):
+            # First transition to speaking marks the greeting reaching the caller
+            nonlocal job_started
+            if job_started is not None and ev.new_state == "speaking":
+                pool.record_first_greeting(time.perf_counter() - job_started)
+                job_started = None
+        
+        # Lifecycle is driven by room and session events from here on
+        lifetime = JobLifetime.from_env(ctx.room, session).start()
+        
         # Start the session
         logger.info("Starting session...")
         await session.start(
             room=ctx.room,
-            agent=BusinessTravelAssistant(),
+            agent=assistant,
         )
         
-        # Generate initial reply
-        logger.info("Generating initial reply...")
-        await session.generate_reply(
-            instructions="Welcome to your business travel assistant. How can I help with your travel plans today?"
-        )
+        # Play the pre-synthesized greeting instead of an LLM + TTS round-trip
+        logger.info("Playing cached greeting...")
+        await play_greeting(session, get_greeting_cache(), tts, TTS_MODEL, TTS_VOICE)
         
         logger.info("Business Travel Assistant voice agent started successfully")
         
-        # Keep the agent running
-        try:
+        async def publish_stats():
+            """Gauges for the worker load function, refreshed until the session ends"""
+            ticks = 0
             while True:
+                extra = {"room": ctx.room.name}
+                if assistant.speculator is not None:
+                    extra["speculation"] = assistant.speculator.stats()
+                extra["tts_pipeline"] = assistant.tts_stats.to_dict()
+                if travel_tools is not None:
+                    extra["travel_tools"] = travel_tools.stats()
+                if assistant.context_window is not None:
+                    extra["context_window"] = assistant.context_window.stats()
+                extra["phrase_cache"] = get_phrase_cache().stats()
+                if ingest is not None:
+                    extra["audio_ingest"] = ingest.stats()
+                if pool.batch_inference:
+                    extra["inference_batching"] = get_batch_scheduler().stats()
+                extra["event_loop"] = loop_monitor.stats()
+                publish_job_stats(ctx.job.id, extra)
+                if ticks % 5 == 0:
+                    tracer.publish()
+                ticks += 1
                 await asyncio.sleep(1)
+        
+        # Run until the caller leaves, the room or session closes, or the call goes idle
+        sessions.started(ctx.job.id)
+        stats_task = asyncio.create_task(publish_stats())
+        reason = "cancelled"
+        try:
+            reason = await lifetime.wait()
+            logger.info(f"Ending voice agent session: {reason}")
         except asyncio.CancelledError:
             logger.info("Voice agent shutting down...")
-            await session.aclose()
+        finally:
+            sessions.ending(ctx.job.id, reason)
+            stats_task.cancel()
+            # Clear the gauges first so the worker counts the slot as free right away
+            clear_job_stats(ctx.job.id)
+            if assistant.speculator is not None:
+                assistant.speculator.cancel()
+                logger.info(f"Speculative LLM stats: {assistant.speculator.stats()}")
+            try:
+                await session.aclose()
+                if assistant.context_window is not None:
+                    await assistant.context_window.aclose()
+            finally:
+                # Provider websockets are closed now rather than when the job process exits
+                closed = await close_providers(stt, llm_agent, tts)
+                sessions.closed(ctx.job.id, session)
+                tracer.publish(final=True)
+                tracer.dump_trace()
+                logger.info(f"Session closed ({reason}); closed {closed} provider clients")
+        if reason != "cancelled":
+            # End the job now instead of waiting for LiveKit to notice the room is done
+            ctx.shutdown(reason=reason)
         
     except Exception as e:
         logger.error(f"Error starting voice agent: {e}", exc_info=True)
         raise
+    finally:
+        # Stops the watchdog with the job, before its thread id can be reused
+        loop_monitor.stop()
+
+def prewarm(proc):
+    """Load shared models and any persisted greeting and phrase audio before taking jobs"""
+    prewarm_models(proc)
+    get_greeting_cache().preload(GREETING_TEXT, TTS_MODEL, TTS_VOICE)
+    phrases = get_phrase_cache().preload()
+    logger.info(f"Mapped {phrases} cached phrases into memory")
 
 def main():
     """Main entry point"""
@@ -141,10 +433,20 @@ def main():
         sys.exit(1)
     
     try:
-        # Run the agent with simplified options
-        logger.info("Starting LiveKit worker...")
+        # Refuse new jobs before VAD / turn detection saturate this box
+        load_monitor = WorkerLoadMonitor.from_env()
+        # Jobs label their metrics with this worker; it keeps their running totals
+        os.environ[WORKER_ID_ENV] = load_monitor.worker_name
+        load_monitor.add_collector(LatencyTotals(load_monitor.worker_name).fold)
+        load_monitor.add_collector(SessionTotals.from_env(load_monitor.worker_name).fold)
+        logger.info(f"Starting LiveKit worker (load threshold {load_monitor.load_threshold}, "
+                    f"{AGENT_JOB_EXECUTOR} jobs)...")
         agents.cli.run_app(WorkerOptions(
-            entrypoint_fnc=entrypoint
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            load_fnc=load_monitor,
+            load_threshold=load_monitor.load_threshold,
+            job_executor_type=agents.JobExecutorType(AGENT_JOB_EXECUTOR),
         ))
     except Exception as e:
         logger.error(f"Failed to start voice agent: {e}", exc_info=True)
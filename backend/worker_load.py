@@ -0,0 +1,231 @@
+"""
+Agent worker load reporting and admission control.
+
+``WorkerLoadMonitor`` is passed to ``WorkerOptions`` as ``load_fnc``. Load is
+the most saturated of three signals, each scaled to 0..1:
+
+- active jobs relative to ``AGENT_MAX_SESSIONS``
+- CPU utilisation of the box
+- VAD inference queue depth relative to ``AGENT_MAX_QUEUE_DEPTH``: windows
+  waiting for the batch scheduler, or audio the per-session silero streams
+  have not processed yet
+
+Once load reaches ``AGENT_LOAD_THRESHOLD`` LiveKit stops dispatching new jobs
+to the worker, so existing calls keep their latency.
+
+Jobs run in their own processes, so per-job gauges (inference queue depth)
+are published as small JSON files in ``AGENT_STATS_DIR``. The worker sums
+them per process (jobs run as threads report the same process-wide depth),
+and the API process reads the same directory for ``/api/agent/stats``.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATS_DIR = os.getenv(
+    "AGENT_STATS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "agent_stats"),
+)
+STALE_AFTER = 10.0
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+def write_json_atomic(path: str, payload: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def read_stats_dir(stats_dir: str = STATS_DIR, prefix: str = "",
+                   max_age: float = STALE_AFTER) -> List[Dict[str, Any]]:
+    """Load every stats file in the directory written within ``max_age`` seconds"""
+    entries = []
+    if not os.path.isdir(stats_dir):
+        return entries
+    now = time.time()
+    for name in sorted(os.listdir(stats_dir)):
+        if not name.endswith(".json") or not name.startswith(prefix):
+            continue
+        try:
+            with open(os.path.join(stats_dir, name), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - entry.get("ts", 0) <= max_age:
+            entries.append(entry)
+    return entries
+
+
+def prune_stats_dir(stats_dir: str, prefix: str, max_age: float) -> int:
+    """Delete stats files with the prefix not modified within ``max_age`` seconds"""
+    removed = 0
+    if not os.path.isdir(stats_dir):
+        return removed
+    cutoff = time.time() - max_age
+    for name in os.listdir(stats_dir):
+        path = os.path.join(stats_dir, name)
+        try:
+            if name.startswith(prefix) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+# Job-process side ------------------------------------------------------
+
+_queue_sources: List[Callable[[], int]] = []
+
+
+def register_queue_source(source: Callable[[], int]) -> None:
+    """Register a callable returning this process's pending VAD windows"""
+    _queue_sources.append(source)
+
+
+def inference_queue_depth() -> int:
+    return sum(source() for source in _queue_sources)
+
+
+def publish_job_stats(job_id: str, extra: Optional[Dict[str, Any]] = None,
+                      stats_dir: str = STATS_DIR) -> None:
+    """Publish this job process's gauges for the worker's load function"""
+    payload = {"job_id": job_id, "pid": os.getpid(), "ts": time.time(),
+               "inference_queue_depth": inference_queue_depth()}
+    if extra:
+        payload.update(extra)
+    try:
+        write_json_atomic(os.path.join(stats_dir, f"job-{job_id}.json"), payload)
+    except OSError as e:
+        logger.debug(f"Could not publish job stats: {e}")
+
+
+def clear_job_stats(job_id: str, stats_dir: str = STATS_DIR) -> None:
+    try:
+        os.remove(os.path.join(stats_dir, f"job-{job_id}.json"))
+    except OSError:
+        pass
+
+
+# Worker-process side ---------------------------------------------------
+
+class WorkerLoadMonitor:
+    """``load_fnc`` combining active jobs, CPU and inference queue depth"""
+
+    def __init__(
+        self,
+        max_sessions: int = 25,
+        max_queue_depth: int = 32,
+        load_threshold: float = 0.75,
+        stats_dir: str = STATS_DIR,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.max_queue_depth = max_queue_depth
+        self.load_threshold = load_threshold
+        self.stats_dir = stats_dir
+        self.worker_name = f"worker-{os.getpid()}"
+        self.last: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Any]] = []
+        if PSUTIL_AVAILABLE:
+            # Prime the counter so the first non-blocking reading is meaningful
+            psutil.cpu_percent(interval=None)
+
+    @classmethod
+    def from_env(cls) -> "WorkerLoadMonitor":
+        return cls(
+            max_sessions=int(os.getenv("AGENT_MAX_SESSIONS", "25")),
+            max_queue_depth=int(os.getenv("AGENT_MAX_QUEUE_DEPTH", "32")),
+            load_threshold=float(os.getenv("AGENT_LOAD_THRESHOLD", "0.75")),
+        )
+
+    def add_collector(self, collector: Callable[[], Any]) -> None:
+        """Run ``collector`` in the worker process every time load is sampled"""
+        self._collectors.append(collector)
+
+    @staticmethod
+    def cpu_load() -> float:
+        if PSUTIL_AVAILABLE:
+            return psutil.cpu_percent(interval=None) / 100.0
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return 0.0
+
+    def __call__(self, worker=None) -> float:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.debug(f"Worker stats collector failed: {e}")
+        jobs = read_stats_dir(self.stats_dir, prefix="job-")
+        # Jobs sharing a process report that process's depth once each
+        depth_by_pid: Dict[Any, int] = {}
+        for job in jobs:
+            pid = job.get("pid")
+            depth_by_pid[pid] = max(depth_by_pid.get(pid, 0), int(job.get("inference_queue_depth", 0)))
+        queue_depth = sum(depth_by_pid.values())
+        # Without a Worker handle (e.g. offline), count jobs that published stats
+        active_jobs = len(worker.active_jobs) if worker is not None else len(jobs)
+
+        components = {
+            "sessions": active_jobs / self.max_sessions if self.max_sessions else 0.0,
+            "cpu": self.cpu_load(),
+            "inference_queue": queue_depth / self.max_queue_depth if self.max_queue_depth else 0.0,
+        }
+        # Admission is limited by whichever resource saturates first
+        load = min(1.0, max(components.values()))
+
+        self.last = {
+            "worker": self.worker_name,
+            "ts": time.time(),
+            "load": round(load, 4),
+            "load_threshold": self.load_threshold,
+            "accepting_jobs": load < self.load_threshold,
+            "active_sessions": active_jobs,
+            "inference_queue_depth": queue_depth,
+            "components": {name: round(value, 4) for name, value in components.items()},
+        }
+        try:
+            write_json_atomic(os.path.join(self.stats_dir, f"{self.worker_name}.json"), self.last)
+        except OSError as e:
+            logger.debug(f"Could not write worker stats: {e}")
+        if not self.last["accepting_jobs"]:
+            logger.warning(f"Worker load {load:.2f} over threshold {self.load_threshold}; refusing new jobs")
+        return load
+
+
+def agent_stats(stats_dir: str = STATS_DIR) -> Dict[str, Any]:
+    """Aggregated worker and job stats for the API's stats endpoint"""
+    workers = read_stats_dir(stats_dir, prefix="worker-")
+    jobs = read_stats_dir(stats_dir, prefix="job-")
+    lifecycle: Dict[str, Any] = {"active": 0, "closing": 0, "lingering": 0, "sessions": 0,
+                                 "lingered": 0, "leaked": 0, "end_reasons": {}}
+    # One file per worker, with totals over the worker's lifetime
+    for worker in read_stats_dir(stats_dir, prefix="lifecycle-"):
+        for name in ("active", "closing", "lingering", "sessions", "lingered", "leaked"):
+            lifecycle[name] += worker.get(name, 0)
+        for reason, count in worker.get("end_reasons", {}).items():
+            lifecycle["end_reasons"][reason] = lifecycle["end_reasons"].get(reason, 0) + count
+    speculation: Dict[str, float] = {}
+    for job in jobs:
+        for name in ("started", "committed", "discarded", "wasted_words", "saved_ms_total"):
+            speculation[name] = speculation.get(name, 0) + job.get("speculation", {}).get(name, 0)
+    return {
+        "workers": workers,
+        "jobs": jobs,
+        "active_sessions": sum(worker.get("active_sessions", 0) for worker in workers),
+        "speculation": speculation,
+        "session_lifecycle": lifecycle,
+    }